@@ -1,28 +1,34 @@
 import pandas as pd
 
+from datos import cargar, guardar, iterar_bloques, resolver_ruta
+from instrumentacion import etapa
+from kpis import ALFA, AgregadorKPI
+
 # -------------------------------------------------
 # OPCIÓN 1: partir de un archivo ya mergeado
 # -------------------------------------------------
-# Si tu archivo se llama distinto, cámbialo aquí:
-RUTA_MERGE = "merge_total.xlsx"
+# Si tu archivo se llama distinto, cámbialo aquí (parquet, feather o xlsx;
+# si el Parquet falta se arma desde merge_total.xlsx):
+RUTA_MERGE = "merge_total.parquet"
 
 def cargar_df_merge(ruta: str = RUTA_MERGE) -> pd.DataFrame:
-    """Carga el archivo ya mergeado."""
-    df = pd.read_excel(ruta)
+    """Carga el archivo ya mergeado (fechas ya como datetime64)."""
+    df = cargar(ruta)
     return df
 
 # -------------------------------------------------
 # ANÁLISIS DE TIEMPOS DE TRÁMITE
 # -------------------------------------------------
 
-def analizar_tiempos_tramite(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Toma el DataFrame ya mergeado y:
-      - asegura que las fechas sean datetime
-      - calcula tiempos entre etapas (en días)
-      - imprime estadísticas descriptivas
-      - devuelve el DataFrame con las nuevas columnas
-    """
+COLUMNAS_TIEMPO = [
+    "tiempo_presentacion_a_registro",
+    "tiempo_registro_a_informacion",
+    "tiempo_informacion_a_email",
+    "tiempo_total",
+]
+
+def calcular_tiempos(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega las columnas COLUMNAS_TIEMPO (días entre etapas), sin imprimir nada."""
 
     # 1. Asegurar tipos datetime en las columnas relevantes
     columnas_fecha = [
@@ -53,37 +59,26 @@ def analizar_tiempos_tramite(df: pd.DataFrame) -> pd.DataFrame:
         df["fecha_email"] - df["fecha_presentacion"]
     ).dt.days
 
-    # 3. Resumen estadístico de los tiempos
-    columnas_tiempo = [
-        "tiempo_presentacion_a_registro",
-        "tiempo_registro_a_informacion",
-        "tiempo_informacion_a_email",
-        "tiempo_total",
-    ]
+    return df
 
-    print("\n=== RESUMEN ESTADÍSTICO DE TIEMPOS (días) ===\n")
-    resumen = df[columnas_tiempo].describe()
-    print(resumen)
 
-    # 4. Algunos indicadores útiles adicionales
-    print("\n=== KPIs RÁPIDOS ===")
+def analizar_tiempos_tramite(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Toma el DataFrame ya mergeado y:
+      - asegura que las fechas sean datetime
+      - calcula tiempos entre etapas (en días)
+      - imprime estadísticas descriptivas
+      - devuelve el DataFrame con las nuevas columnas
+    """
+    with etapa("analisis1_tiempos.calcular_tiempos", filas=len(df)):
+        df = calcular_tiempos(df)
 
-    # Solo casos con tiempo_total válido
-    completadas = df[df["tiempo_total"].notna()]
-
-    if not completadas.empty:
-        prom = completadas["tiempo_total"].mean()
-        mediana = completadas["tiempo_total"].median()
-        maximo = completadas["tiempo_total"].max()
-        minimo = completadas["tiempo_total"].min()
-
-        print(f"\nSolicitudes con trámite completo: {len(completadas)}")
-        print(f"Tiempo total promedio: {prom:.2f} días")
-        print(f"Tiempo total mediano: {mediana:.2f} días")
-        print(f"Tiempo total mínimo: {minimo:.0f} días")
-        print(f"Tiempo total máximo: {maximo:.0f} días")
-    else:
-        print("\nNo hay solicitudes con 'tiempo_total' calculado (todas tienen fechas incompletas).")
+    # 3. Resumen estadístico de los tiempos (mismo agregador que por bloques)
+    columnas_tiempo = COLUMNAS_TIEMPO
+
+    with etapa("analisis1_tiempos.kpis", filas=len(df)):
+        agg = AgregadorKPI(columnas_tiempo).consumir(df)
+    imprimir_kpis(agg)
 
     # 5. Mostrar algunos ejemplos
     print("\n=== EJEMPLOS DE SOLICITUDES CON TIEMPOS CALCULADOS ===\n")
@@ -94,10 +89,65 @@ def analizar_tiempos_tramite(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def imprimir_kpis(agg: AgregadorKPI):
+    """Resumen estadístico y KPIs rápidos a partir del agregador."""
+    print("\n=== RESUMEN ESTADÍSTICO DE TIEMPOS (días) ===\n")
+    print(f"(cuantiles con error relativo <= {agg.alfa:.0%})\n")
+    print(agg.resumen())
+
+    # 4. Algunos indicadores útiles adicionales
+    print("\n=== KPIs RÁPIDOS ===")
+
+    # Solo casos con tiempo_total válido
+    total = agg.momentos["tiempo_total"]
+
+    if total.n:
+        print(f"\nSolicitudes con trámite completo: {total.n}")
+        print(f"Tiempo total promedio: {total.media:.2f} días")
+        print(f"Tiempo total mediano: {agg.cuantil('tiempo_total', 0.5):g} días")
+        print(f"Tiempo total mínimo: {total.minimo:.0f} días")
+        print(f"Tiempo total máximo: {total.maximo:.0f} días")
+    else:
+        print("\nNo hay solicitudes con 'tiempo_total' calculado (todas tienen fechas incompletas).")
+
+
+# -------------------------------------------------
+# OPCIÓN 2: por bloques (historia que no entra en memoria)
+# -------------------------------------------------
+COLUMNAS_LECTURA = ["codigo_solicitud", "fecha_presentacion", "fecha_registro",
+                    "fecha_informacion", "fecha_email"]
+
+def agregar_archivo(ruta: str, alfa: float = ALFA) -> AgregadorKPI:
+    """KPIs de un archivo leído por bloques; solo se leen las fechas necesarias."""
+    agg = AgregadorKPI(COLUMNAS_TIEMPO, alfa)
+    for bloque in iterar_bloques(ruta, columnas=COLUMNAS_LECTURA):
+        agg.consumir(calcular_tiempos(bloque))
+    return agg
+
+def analizar_tiempos_por_bloques(rutas, workers: int = 1, alfa: float = ALFA) -> AgregadorKPI:
+    """
+    Igual que analizar_tiempos_tramite pero sin cargar todo: cada archivo
+    (p. ej. particiones de la historia) se agrega por bloques, en paralelo
+    si workers > 1, y los parciales se combinan en un solo resumen.
+    """
+    rutas = [rutas] if isinstance(rutas, str) else list(rutas)
+    total = AgregadorKPI(COLUMNAS_TIEMPO, alfa)
+    if workers > 1 and len(rutas) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parciales = list(ex.map(agregar_archivo, rutas, [alfa] * len(rutas)))
+    else:
+        parciales = (agregar_archivo(r, alfa) for r in rutas)
+    for parcial in parciales:
+        total.combinar(parcial)
+    imprimir_kpis(total)
+    return total
+
+
 if __name__ == "__main__":
     # OPCIÓN 1: partir de archivo mergeado
-    df_merge = cargar_df_merge(RUTA_MERGE)
+    df_merge = cargar_df_merge(resolver_ruta(RUTA_MERGE))
     df_con_tiempos = analizar_tiempos_tramite(df_merge)
 
-    # Si quieres, puedes guardar el resultado:
-    df_con_tiempos.to_excel("merge_con_tiempos.xlsx", index=False)
+    # Si quieres, puedes guardar el resultado (".xlsx" para Excel):
+    guardar(df_con_tiempos, "merge_con_tiempos.parquet")
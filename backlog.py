@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Series de backlog / WIP por etapa (barrido de eventos)
+
+Cada fecha de etapa es un evento: el expediente entra a la cola de la
+etapa siguiente (+1) y sale de la actual (-1). Con los eventos agrupados
+por período (minuto, hora o día) y una suma acumulada se obtienen, para
+cada etapa y período:
+  - llegadas:  expedientes que entraron a la cola
+  - salidas:   expedientes atendidos (throughput)
+  - en_cola:   expedientes esperando al cierre del período
+en O(n + períodos), sin filtrar el DataFrame día por día.
+
+Las etapas son las fases abiertas de cortes.py (en_evaluacion, en_registro,
+en_informacion, en_email); un no_cumple sale de evaluación y no entra a
+registro. La cadena de eventos es la de cortes.matriz_eventos.
+
+Uso:
+    serie = backlog(df_merge, resolucion="D")
+    print(resumen_backlog(serie))
+"""
+
+import numpy as np
+import pandas as pd
+
+from cortes import EVENTOS, FASES_CORTE, codigos_fase, matriz_eventos
+from datos import cargar, guardar, resolver_ruta
+
+RUTA_ENTRADA = "merge_total.parquet"
+RUTA_SALIDA = "backlog_diario.parquet"
+
+ETAPAS_COLA = ["en_evaluacion", "en_registro", "en_informacion", "en_email"]
+_CODIGOS_COLA = np.array([FASES_CORTE.index(e) for e in ETAPAS_COLA])
+
+RESOLUCIONES = {"min": "m", "h": "h", "D": "D"}
+
+_INF = np.iinfo(np.int64).max
+
+
+def backlog(df: pd.DataFrame, resolucion: str = "D", desde=None, hasta=None) -> pd.DataFrame:
+    """
+    Serie larga (período x etapa) con llegadas, salidas y en_cola.
+    resolucion: "min", "h" o "D". desde/hasta acotan los períodos
+    reportados (la cola arrastra igual lo ocurrido antes de desde).
+    """
+    if resolucion not in RESOLUCIONES:
+        raise ValueError(f"Resolución no soportada: {resolucion} (use {', '.join(RESOLUCIONES)})")
+    unidad = RESOLUCIONES[resolucion]
+
+    E = matriz_eventos(df)
+    codigos = codigos_fase(df)
+    # período de cada evento (entero en la unidad pedida)
+    ocurrio = E != _INF
+    periodo = np.where(ocurrio, E, 0).astype("datetime64[ns]").astype(f"datetime64[{unidad}]").astype(np.int64)
+
+    validos = periodo[ocurrio]
+    if len(validos) == 0:
+        return pd.DataFrame(columns=["periodo", "etapa", "llegadas", "salidas", "en_cola"])
+    p0 = int(validos.min()) if desde is None else _a_periodo(desde, unidad)
+    p1 = int(validos.max()) if hasta is None else _a_periodo(hasta, unidad)
+    n_per = max(p1 - p0 + 1, 0)
+
+    # ranura de la etapa (0..3) o -1 si la fase no es una cola
+    ranura = np.full(len(FASES_CORTE), -1)
+    ranura[_CODIGOS_COLA] = np.arange(len(ETAPAS_COLA))
+    S = len(ETAPAS_COLA)
+
+    llegadas = np.zeros((n_per + 1) * S)
+    salidas = np.zeros((n_per + 1) * S)
+    previas = np.zeros(S)  # saldo de eventos anteriores a p0
+    for j in range(len(EVENTOS)):
+        ok = ocurrio[:, j] & (periodo[:, j] <= p1)
+        rel = periodo[ok, j] - p0
+        antes = rel < 0
+        for destino, codigo in ((llegadas, codigos[ok, j + 1]), (salidas, codigos[ok, j])):
+            r = ranura[codigo]
+            es_cola = r >= 0
+            signo = 1 if destino is llegadas else -1
+            previas += signo * np.bincount(r[es_cola & antes], minlength=S)
+            pos = rel[es_cola & ~antes] * S + r[es_cola & ~antes]
+            destino += np.bincount(pos, minlength=(n_per + 1) * S)
+    llegadas = llegadas.reshape(n_per + 1, S)[:n_per]
+    salidas = salidas.reshape(n_per + 1, S)[:n_per]
+    en_cola = previas + np.cumsum(llegadas - salidas, axis=0)
+
+    periodos = (np.arange(p0, p0 + n_per).astype(f"datetime64[{unidad}]")).astype("datetime64[ns]")
+    return pd.DataFrame({
+        "periodo": np.repeat(periodos, S),
+        "etapa": pd.Categorical.from_codes(np.tile(np.arange(S), n_per), categories=ETAPAS_COLA),
+        "llegadas": llegadas.ravel().astype(np.int64),
+        "salidas": salidas.ravel().astype(np.int64),
+        "en_cola": np.rint(en_cola.ravel()).astype(np.int64),
+    })
+
+def _a_periodo(valor, unidad: str) -> int:
+    return int(np.datetime64(pd.Timestamp(valor).to_datetime64(), unidad).astype(np.int64))
+
+
+def resumen_backlog(serie: pd.DataFrame) -> pd.DataFrame:
+    """
+    Por etapa: llegadas y salidas totales y por período, cola media y
+    máxima (y cuándo), y espera media estimada por la ley de Little
+    (cola media / salidas por período), en períodos. Las etapas con mayor
+    espera son los cuellos de botella / tiempos muertos.
+    """
+    g = serie.groupby("etapa", observed=True)
+    resumen = pd.DataFrame({
+        "llegadas": g["llegadas"].sum(),
+        "salidas": g["salidas"].sum(),
+        "llegadas_por_periodo": g["llegadas"].mean(),
+        "salidas_por_periodo": g["salidas"].mean(),
+        "cola_media": g["en_cola"].mean(),
+        "cola_maxima": g["en_cola"].max(),
+        "periodo_cola_maxima": serie.loc[g["en_cola"].idxmax(), "periodo"].to_numpy(),
+    })
+    with np.errstate(divide="ignore", invalid="ignore"):
+        resumen["espera_media_periodos"] = resumen["cola_media"] / resumen["salidas_por_periodo"]
+    return resumen
+
+
+if __name__ == "__main__":
+    df = cargar(resolver_ruta(RUTA_ENTRADA))
+    serie = backlog(df, resolucion="D")
+
+    print("\n=== BACKLOG POR ETAPA (diario) ===\n")
+    print(serie.pivot(index="periodo", columns="etapa", values="en_cola").tail(10))
+    print("\n=== CUELLOS DE BOTELLA ===\n")
+    print(resumen_backlog(serie))
+    guardar(serie, RUTA_SALIDA)
+    print(f"\nSerie guardada: {RUTA_SALIDA}")
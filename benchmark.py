@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks de las etapas del pipeline sobre datos sintéticos
+
+Cada (etapa, filas) corre en un subproceso propio, así el pico de RSS
+(resource.getrusage) es el de esa etapa y no arrastra lo anterior. Las
+entradas se generan una vez por tamaño con generador.generar_dataset y se
+guardan en Parquet en --datos; la preparación no entra en la medición.
+
+Resultados: JSON con segundos (mínimo de --repeticiones), pico de RSS en MB
+y filas/seg por etapa y tamaño. Con --base se comparan contra una corrida
+guardada y se marca regresión si el tiempo o la memoria empeoran más que
+--tolerancia; en ese caso el proceso sale con código 1.
+
+Uso:
+    python benchmark.py --filas 10000 100000 --salida bench.json
+    python benchmark.py --guardar-base benchmark_base.json
+    python benchmark.py --base benchmark_base.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+
+TAMANOS = [10_000, 100_000, 1_000_000, 10_000_000]
+DIRECTORIO_DATOS = ".bench"
+SEED = 42
+
+# etapa -> máximo de filas (None: sin límite). calcular_estado_total es la
+# referencia fila a fila de prueba.py (df.apply): por encima de 100k tardaría
+# minutos y se omite; clasificar_estado es su versión vectorizada.
+ETAPAS = {
+    "generar_solicitantes": None,
+    "generar_solicitudes": None,
+    "generar_tramite": None,
+    "combinar": None,
+    "calcular_estado_total": 100_000,
+    "clasificar_estado": None,
+    "agregar_fases_tiempo_segundos": None,
+    "analizar_tiempos_tramite": None,
+}
+
+
+# ==============================
+# ENTRADAS SINTÉTICAS
+# ==============================
+def _ruta(directorio: str, filas: int, nombre: str) -> str:
+    return os.path.join(directorio, str(filas), nombre + ".parquet")
+
+def preparar_datos(filas: int, directorio: str = DIRECTORIO_DATOS):
+    """Tablas + merge_total de `filas` solicitudes (la mitad de solicitantes), si no existen."""
+    if os.path.exists(_ruta(directorio, filas, "merge_total")):
+        return
+    from combinador import combinar
+    from datos import HOJAS, guardar, tipar
+    from generador import generar_dataset
+
+    os.makedirs(os.path.join(directorio, str(filas)), exist_ok=True)
+    tablas = generar_dataset(SEED, max(filas // 2, 1), filas, workers=os.cpu_count() or 1)[:3]
+    tablas = [tipar(df) for df in tablas]
+    for hoja, df in zip(HOJAS, tablas):
+        guardar(df, _ruta(directorio, filas, hoja))
+    # merge_total se escribe al final: marca que el tamaño está completo
+    guardar(combinar(*tablas), _ruta(directorio, filas, "merge_total"))
+
+
+# ==============================
+# ETAPAS (en el subproceso)
+# ==============================
+def _cargar(directorio: str, filas: int, nombre: str):
+    from datos import cargar
+    return cargar(_ruta(directorio, filas, nombre))
+
+def preparar_etapa(etapa: str, filas: int, directorio: str):
+    """Devuelve una función sin argumentos que ejecuta la etapa una vez."""
+    import numpy as np
+
+    if etapa == "generar_solicitantes":
+        from generador import generar_solicitantes
+        return lambda: generar_solicitantes(np.random.default_rng(SEED), n=filas)
+
+    if etapa == "generar_solicitudes":
+        from generador import generar_solicitudes
+        sol = _cargar(directorio, filas, "Solicitantes")
+        return lambda: generar_solicitudes(sol, np.random.default_rng(SEED), n=filas)
+
+    if etapa == "generar_tramite":
+        from generador import generar_tramite
+        from calendario import TZ
+        solic = _cargar(directorio, filas, "SolicitudesRecibidas")
+        # el generador trabaja con fechas con tz
+        solic["fecha_presentacion"] = solic["fecha_presentacion"].dt.tz_localize(TZ)
+        return lambda: generar_tramite(solic, np.random.default_rng(SEED))
+
+    if etapa == "combinar":
+        from combinador import combinar
+        tablas = [_cargar(directorio, filas, h)
+                  for h in ("Solicitantes", "SolicitudesRecibidas", "TramiteSolicitudes")]
+        return lambda: combinar(*tablas)
+
+    if etapa == "calcular_estado_total":
+        from prueba import calcular_estado_total
+        tram = _cargar(directorio, filas, "TramiteSolicitudes")
+        return lambda: tram.apply(calcular_estado_total, axis=1)
+
+    if etapa == "clasificar_estado":
+        from estados import clasificar_estado
+        df = _cargar(directorio, filas, "merge_total")
+        return lambda: clasificar_estado(df)
+
+    if etapa == "agregar_fases_tiempo_segundos":
+        from calculador1 import agregar_fases_tiempo_segundos
+        entrada = _ruta(directorio, filas, "merge_total")
+        salida = _ruta(directorio, filas, "bench_fases")
+        return lambda: agregar_fases_tiempo_segundos(entrada, salida)
+
+    if etapa == "analizar_tiempos_tramite":
+        from analisis1_tiempos import analizar_tiempos_tramite
+        df = _cargar(directorio, filas, "merge_total")
+        return lambda: analizar_tiempos_tramite(df.copy(deep=False))
+
+    raise ValueError(f"Etapa desconocida: {etapa}")
+
+def medir_en_proceso(etapa: str, filas: int, directorio: str, repeticiones: int) -> dict:
+    ejecutar = preparar_etapa(etapa, filas, directorio)
+    rss_entrada = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tiempos = []
+    with open(os.devnull, "w") as nulo, redirect_stdout(nulo):
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            ejecutar()
+            tiempos.append(time.perf_counter() - t0)
+    rss_pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    segundos = min(tiempos)
+    return {
+        "etapa": etapa,
+        "filas": filas,
+        "segundos": round(segundos, 4),
+        "filas_por_seg": round(filas / segundos, 1) if segundos > 0 else None,
+        # ru_maxrss está en KB en Linux
+        "rss_pico_mb": round(rss_pico / 1024, 1),
+        "rss_entrada_mb": round(rss_entrada / 1024, 1),
+    }
+
+def medir(etapa: str, filas: int, directorio: str, repeticiones: int) -> dict:
+    """Corre la etapa en un subproceso y devuelve su medición."""
+    cmd = [sys.executable, os.path.abspath(__file__), "--hijo", etapa, str(filas),
+           "--datos", directorio, "--repeticiones", str(repeticiones)]
+    r = subprocess.run(cmd, capture_output=True, text=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+    if r.returncode != 0:
+        return {"etapa": etapa, "filas": filas, "error": r.stderr.strip().splitlines()[-1:]}
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+
+# ==============================
+# COMPARACIÓN CON LA BASE
+# ==============================
+def comparar(resultados, base, tolerancia: float):
+    """Lista de (etapa, filas, métrica, base, actual) que empeoraron más que tolerancia."""
+    previos = {(b["etapa"], b["filas"]): b for b in base["resultados"] if "error" not in b}
+    regresiones = []
+    for r in resultados:
+        b = previos.get((r["etapa"], r["filas"]))
+        if b is None or "error" in r:
+            continue
+        for metrica in ("segundos", "rss_pico_mb"):
+            if r[metrica] > b[metrica] * (1 + tolerancia):
+                regresiones.append((r["etapa"], r["filas"], metrica, b[metrica], r[metrica]))
+    return regresiones
+
+
+# ==============================
+# CLI
+# ==============================
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmarks del pipeline LegalTech PSET")
+    p.add_argument("--filas", type=int, nargs="+", default=TAMANOS)
+    p.add_argument("--etapas", nargs="+", choices=list(ETAPAS), default=list(ETAPAS))
+    p.add_argument("--repeticiones", type=int, default=1)
+    p.add_argument("--datos", default=DIRECTORIO_DATOS, help="carpeta de entradas sintéticas")
+    p.add_argument("--salida", default="benchmark_resultados.json")
+    p.add_argument("--base", default=None, help="JSON de una corrida anterior para comparar")
+    p.add_argument("--guardar-base", default=None, help="guardar también esta corrida como base")
+    p.add_argument("--tolerancia", type=float, default=0.20, help="empeoramiento admitido (0.20 = 20%%)")
+    p.add_argument("--hijo", nargs=2, metavar=("ETAPA", "FILAS"), help=argparse.SUPPRESS)
+    return p.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.hijo:
+        etapa, filas = args.hijo[0], int(args.hijo[1])
+        print(json.dumps(medir_en_proceso(etapa, filas, args.datos, args.repeticiones)))
+        return 0
+
+    args.datos = os.path.abspath(args.datos)  # el subproceso corre en la carpeta del script
+    resultados = []
+    for filas in args.filas:
+        print(f"Preparando datos ({filas:,} filas)...")
+        preparar_datos(filas, args.datos)
+        for etapa in args.etapas:
+            limite = ETAPAS[etapa]
+            if limite is not None and filas > limite:
+                continue
+            r = medir(etapa, filas, args.datos, args.repeticiones)
+            resultados.append(r)
+            if "error" in r:
+                print(f"  {etapa:<32}{filas:>12,}  ERROR {r['error']}")
+            else:
+                print(f"  {etapa:<32}{filas:>12,}  {r['segundos']:>9.3f} s"
+                      f"  {r['filas_por_seg']:>14,.0f} filas/s  {r['rss_pico_mb']:>9.1f} MB")
+
+    informe = {
+        "maquina": {"python": platform.python_version(), "plataforma": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "resultados": resultados,
+    }
+    for ruta in filter(None, (args.salida, args.guardar_base)):
+        with open(ruta, "w") as f:
+            json.dump(informe, f, indent=2)
+    print(f"\nResultados: {args.salida}")
+
+    if args.base:
+        with open(args.base) as f:
+            base = json.load(f)
+        regresiones = comparar(resultados, base, args.tolerancia)
+        if regresiones:
+            print(f"\n=== REGRESIONES (tolerancia {args.tolerancia:.0%}) ===")
+            for etapa, filas, metrica, antes, ahora in regresiones:
+                print(f"  {etapa} [{filas:,}] {metrica}: {antes} -> {ahora}")
+            return 1
+        print(f"\nSin regresiones respecto de {args.base}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,103 +1,136 @@
+from itertools import chain
+
 import pandas as pd
 import numpy as np
 
-# Archivo combinado existente (ya mergeado)
-RUTA_ENTRADA = "merge_total.xlsx"
-RUTA_SALIDA = "merge_con_fases_tiempo_seg.xlsx"
+from calendario import business_seconds
+from datos import cargar, cargar_tablas, guardar, guardar_bloques, iterar_bloques, resolver_ruta
+from esquema import COLUMNAS_EVENTO, categorica
+from instrumentacion import etapa
 
-# Fecha de corte para pendientes
-FECHA_CORTE = pd.Timestamp("2025-01-06 23:59:59")  # 6 de enero de 2025
+# Archivo combinado existente (ya mergeado); parquet, feather o xlsx. Si el
+# Parquet no existe se arma desde merge_total.xlsx (datos.resolver_ruta)
+RUTA_ENTRADA = "merge_total.parquet"
+RUTA_SALIDA = "merge_con_fases_tiempo_seg.parquet"
+RUTA_EXCEL = None  # p. ej. "merge_con_fases_tiempo_seg.xlsx"
 
 
-def agregar_fases_tiempo_segundos(ruta_entrada: str, ruta_salida: str):
-    # 1. Cargar el archivo combinado
-    df = pd.read_excel(ruta_entrada)
+# Columnas de merge_total que usa calcular_fases (para proyectar el join)
+COLUMNAS_FASES = [
+    "codigo_solicitud",
+    "fecha_presentacion",
+    "fecha_evaluacion",
+    "resultado_evaluacion",
+    "fecha_registro",
+    "fecha_informacion",
+    "fecha_email",
+]
+# Fechas de evento entre las que se busca la fecha de corte
+COLUMNAS_CORTE = [c for c in COLUMNAS_FASES if c in COLUMNAS_EVENTO]
+
+
+def fecha_corte_de(tablas) -> pd.Timestamp:
+    """
+    Fecha de corte para los pendientes: la última fecha de evento observada
+    en las tablas o bloques dados (NaT si no hay ninguna). Los bloques de
+    un mismo archivo deben compartirla, así que se calcula sobre todos.
+    """
+    corte = pd.NaT
+    for df in tablas:
+        for col in COLUMNAS_EVENTO:
+            if col in df.columns:
+                maximo = df[col].max()
+                if pd.notna(maximo) and (pd.isna(corte) or maximo > corte):
+                    corte = maximo
+    return corte
 
-    # 2. Asegurar conversión a datetime en columnas de fecha relevantes
-    columnas_fecha = [
-        "fecha_presentacion",
-        "fecha_evaluacion",   # evaluación
-        "fecha_registro",
-        "fecha_informacion",
-        "fecha_email",
-    ]
 
-    for col in columnas_fecha:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors="coerce")
+def calcular_fases(df: pd.DataFrame, fecha_corte: pd.Timestamp = None) -> pd.DataFrame:
+    """
+    Agrega las columnas de fases (en segundos) y estado_cierre al DataFrame
+    combinado. Lo abierto se cuenta hasta fecha_corte; None la deriva de df
+    (fecha_corte_de). Quien procesa por bloques debe pasar la del total.
+    """
+    n = len(df)
+    if fecha_corte is None:
+        fecha_corte = fecha_corte_de([df])
 
     # -------------------------------------------------------------------------
     # 1) Tiempo: presentación → evaluación
     #    - Si hay fecha_evaluacion: evaluacion - presentacion
-    #    - Si no hay fecha_evaluacion: FECHA_CORTE - presentacion
+    #    - Si no hay fecha_evaluacion: fecha_corte - presentacion
     # -------------------------------------------------------------------------
-    df["tiempo_presentacion_a_evaluacion_seg"] = np.where(
-        df["fecha_presentacion"].notna(),
-        np.where(
-            df["fecha_evaluacion"].notna(),
-            (df["fecha_evaluacion"] - df["fecha_presentacion"]).dt.total_seconds(),
-            (FECHA_CORTE - df["fecha_presentacion"]).dt.total_seconds()
-        ),
-        np.nan
-    )
+    with etapa("calculador1.fases.presentacion_a_evaluacion", filas=n):
+        df["tiempo_presentacion_a_evaluacion_seg"] = np.where(
+            df["fecha_presentacion"].notna(),
+            np.where(
+                df["fecha_evaluacion"].notna(),
+                (df["fecha_evaluacion"] - df["fecha_presentacion"]).dt.total_seconds(),
+                (fecha_corte - df["fecha_presentacion"]).dt.total_seconds()
+            ),
+            np.nan
+        )
 
     # -------------------------------------------------------------------------
     # 2) Tiempo: evaluación → registro (solo cuando pasa evaluación)
     #    - Solo aplica si resultado_evaluacion == "sí_cumple" y hay fecha_evaluacion
     #    - Si hay registro: registro - evaluacion
-    #    - Si no hay registro: FECHA_CORTE - evaluacion
+    #    - Si no hay registro: fecha_corte - evaluacion
     # -------------------------------------------------------------------------
-    col_cumple = "resultado_evaluacion"
-    if col_cumple not in df.columns:
-        df[col_cumple] = np.nan  # por si acaso
-
-    mask_eval_pasa = df["fecha_evaluacion"].notna() & (df[col_cumple] == "sí_cumple")
-
-    df["tiempo_evaluacion_a_registro_seg"] = np.where(
-        mask_eval_pasa,
-        np.where(
-            df["fecha_registro"].notna(),
-            (df["fecha_registro"] - df["fecha_evaluacion"]).dt.total_seconds(),
-            (FECHA_CORTE - df["fecha_evaluacion"]).dt.total_seconds()
-        ),
-        np.nan
-    )
+    with etapa("calculador1.fases.evaluacion_a_registro", filas=n):
+        col_cumple = "resultado_evaluacion"
+        if col_cumple not in df.columns:
+            df[col_cumple] = np.nan  # por si acaso
+
+        mask_eval_pasa = df["fecha_evaluacion"].notna() & (df[col_cumple] == "sí_cumple")
+
+        df["tiempo_evaluacion_a_registro_seg"] = np.where(
+            mask_eval_pasa,
+            np.where(
+                df["fecha_registro"].notna(),
+                (df["fecha_registro"] - df["fecha_evaluacion"]).dt.total_seconds(),
+                (fecha_corte - df["fecha_evaluacion"]).dt.total_seconds()
+            ),
+            np.nan
+        )
 
     # -------------------------------------------------------------------------
     # 3) Tiempo: registro → información
     #    - Si hay registro e informacion: informacion - registro
-    #    - Si hay registro pero no informacion: FECHA_CORTE - registro
+    #    - Si hay registro pero no informacion: fecha_corte - registro
     #    - Si no hay registro: NaN
     # -------------------------------------------------------------------------
-    mask_registro = df["fecha_registro"].notna()
-
-    df["tiempo_registro_a_informacion_seg"] = np.where(
-        mask_registro,
-        np.where(
-            df["fecha_informacion"].notna(),
-            (df["fecha_informacion"] - df["fecha_registro"]).dt.total_seconds(),
-            (FECHA_CORTE - df["fecha_registro"]).dt.total_seconds()
-        ),
-        np.nan
-    )
+    with etapa("calculador1.fases.registro_a_informacion", filas=n):
+        mask_registro = df["fecha_registro"].notna()
+
+        df["tiempo_registro_a_informacion_seg"] = np.where(
+            mask_registro,
+            np.where(
+                df["fecha_informacion"].notna(),
+                (df["fecha_informacion"] - df["fecha_registro"]).dt.total_seconds(),
+                (fecha_corte - df["fecha_registro"]).dt.total_seconds()
+            ),
+            np.nan
+        )
 
     # -------------------------------------------------------------------------
     # 4) Tiempo: información → email
     #    - Si hay informacion y email: email - informacion
-    #    - Si hay informacion pero no email: FECHA_CORTE - informacion
+    #    - Si hay informacion pero no email: fecha_corte - informacion
     #    - Si no hay informacion: NaN
     # -------------------------------------------------------------------------
-    mask_info = df["fecha_informacion"].notna()
-
-    df["tiempo_informacion_a_email_seg"] = np.where(
-        mask_info,
-        np.where(
-            df["fecha_email"].notna(),
-            (df["fecha_email"] - df["fecha_informacion"]).dt.total_seconds(),
-            (FECHA_CORTE - df["fecha_informacion"]).dt.total_seconds()
-        ),
-        np.nan
-    )
+    with etapa("calculador1.fases.informacion_a_email", filas=n):
+        mask_info = df["fecha_informacion"].notna()
+
+        df["tiempo_informacion_a_email_seg"] = np.where(
+            mask_info,
+            np.where(
+                df["fecha_email"].notna(),
+                (df["fecha_email"] - df["fecha_informacion"]).dt.total_seconds(),
+                (fecha_corte - df["fecha_informacion"]).dt.total_seconds()
+            ),
+            np.nan
+        )
 
     # -------------------------------------------------------------------------
     # 5) Tiempo: presentación → cierre REAL
@@ -107,58 +140,106 @@ def agregar_fases_tiempo_segundos(ruta_entrada: str, ruta_salida: str):
     #   - Si no cerró en evaluación pero tiene fecha_email: cierra en fecha_email
     #   - Si no tiene ninguna de esas: no ha cerrado (NaT)
     # -------------------------------------------------------------------------
-    cerrado_en_eval = (
-        df["fecha_evaluacion"].notna() & (df[col_cumple] == "no_cumple")
-    )
-
-    cerrado_en_email = df["fecha_email"].notna() & ~cerrado_en_eval
-
-    fecha_cierre_real = np.where(
-        cerrado_en_eval,
-        df["fecha_evaluacion"],
-        np.where(
-            cerrado_en_email,
-            df["fecha_email"],
-            pd.NaT
+    with etapa("calculador1.fases.presentacion_a_cierre_real", filas=n):
+        cerrado_en_eval = (
+            df["fecha_evaluacion"].notna() & (df[col_cumple] == "no_cumple")
         )
-    )
 
-    fecha_cierre_real = pd.to_datetime(fecha_cierre_real, errors="coerce")
-    df["fecha_cierre_real"] = fecha_cierre_real
+        cerrado_en_email = df["fecha_email"].notna() & ~cerrado_en_eval
 
-    df["tiempo_presentacion_a_cierre_real_seg"] = np.where(
-        df["fecha_presentacion"].notna() & df["fecha_cierre_real"].notna(),
-        (df["fecha_cierre_real"] - df["fecha_presentacion"]).dt.total_seconds(),
-        np.nan
-    )
+        fecha_cierre_real = np.where(
+            cerrado_en_eval,
+            df["fecha_evaluacion"],
+            np.where(
+                cerrado_en_email,
+                df["fecha_email"],
+                pd.NaT
+            )
+        )
+
+        fecha_cierre_real = pd.to_datetime(fecha_cierre_real, errors="coerce")
+        df["fecha_cierre_real"] = fecha_cierre_real
+
+        df["tiempo_presentacion_a_cierre_real_seg"] = np.where(
+            df["fecha_presentacion"].notna() & df["fecha_cierre_real"].notna(),
+            (df["fecha_cierre_real"] - df["fecha_presentacion"]).dt.total_seconds(),
+            np.nan
+        )
 
     # -------------------------------------------------------------------------
     # 6) Tiempo total de trámite
     #    - Si ha cerrado (fecha_cierre_real): usa ese cierre
-    #    - Si NO ha cerrado: cuenta hasta FECHA_CORTE
+    #    - Si NO ha cerrado: cuenta hasta fecha_corte
     # -------------------------------------------------------------------------
-    fecha_cierre_total = df["fecha_cierre_real"].copy()
-    fecha_cierre_total = fecha_cierre_total.fillna(FECHA_CORTE)
-
-    df["tiempo_total_tramite_seg"] = np.where(
-        df["fecha_presentacion"].notna(),
-        (fecha_cierre_total - df["fecha_presentacion"]).dt.total_seconds(),
-        np.nan
-    )
-
-    # Marcar estado de cierre
-    df["estado_cierre"] = np.where(
-        cerrado_en_eval,
-        "cerrado_en_evaluacion",
-        np.where(
-            cerrado_en_email,
-            "cerrado_en_email",
-            "pendiente_al_corte"
+    with etapa("calculador1.fases.total_tramite", filas=n):
+        fecha_cierre_total = df["fecha_cierre_real"].copy()
+        fecha_cierre_total = fecha_cierre_total.fillna(fecha_corte)
+
+        df["tiempo_total_tramite_seg"] = np.where(
+            df["fecha_presentacion"].notna(),
+            (fecha_cierre_total - df["fecha_presentacion"]).dt.total_seconds(),
+            np.nan
+        )
+
+    # Marcar estado de cierre (categórica del esquema)
+    with etapa("calculador1.fases.estado_cierre", filas=n):
+        df["estado_cierre"] = categorica(
+            np.where(
+                cerrado_en_eval,
+                0,  # cerrado_en_evaluacion
+                np.where(
+                    cerrado_en_email,
+                    1,  # cerrado_en_email
+                    2   # pendiente_al_corte
+                )
+            ),
+            "estado_cierre"
         )
-    )
 
-    # 7. Guardar archivo nuevo
-    df.to_excel(ruta_salida, index=False)
+    # -------------------------------------------------------------------------
+    # 7) Duraciones hábiles (_habil_seg), en paralelo a cada fase
+    #    Mismos inicios/fines (y fecha_corte para lo abierto), pero contando
+    #    solo la jornada 08:30–17:30 de días hábiles (calendario.business_seconds)
+    # -------------------------------------------------------------------------
+    with etapa("calculador1.fases.habiles", filas=n):
+        fases_habiles = [
+            ("tiempo_presentacion_a_evaluacion_habil_seg", "fecha_presentacion",
+             df["fecha_evaluacion"].fillna(fecha_corte), df["fecha_presentacion"].notna()),
+            ("tiempo_evaluacion_a_registro_habil_seg", "fecha_evaluacion",
+             df["fecha_registro"].fillna(fecha_corte), mask_eval_pasa),
+            ("tiempo_registro_a_informacion_habil_seg", "fecha_registro",
+             df["fecha_informacion"].fillna(fecha_corte), mask_registro),
+            ("tiempo_informacion_a_email_habil_seg", "fecha_informacion",
+             df["fecha_email"].fillna(fecha_corte), mask_info),
+            ("tiempo_presentacion_a_cierre_real_habil_seg", "fecha_presentacion",
+             df["fecha_cierre_real"], df["fecha_presentacion"].notna()),
+            ("tiempo_total_tramite_habil_seg", "fecha_presentacion",
+             fecha_cierre_total, df["fecha_presentacion"].notna()),
+        ]
+        for col, inicio, fin, mask in fases_habiles:
+            df[col] = np.where(
+                np.asarray(mask, dtype=bool),
+                business_seconds(df[inicio].to_numpy(), fin.to_numpy()),
+                np.nan
+            )
+
+    return df
+
+
+def _mostrar_y_guardar(bloques, ruta_salida: str, vacio):
+    """
+    Escribe los bloques a medida que salen (datos.guardar_bloques), sin
+    juntarlos en memoria. vacio() arma el resultado vacío (con sus
+    columnas) cuando la entrada no trae filas.
+    """
+    bloques = iter(bloques)
+    primero = next(bloques, None)
+    if primero is None:
+        primero = vacio()
+    # 7. Guardar archivo nuevo (Excel opcional)
+    guardar_bloques(chain([primero], bloques), ruta_salida)
+    if RUTA_EXCEL:
+        guardar(cargar(ruta_salida), RUTA_EXCEL)
 
     print(f"\nArchivo actualizado con fases de tiempo en segundos: {ruta_salida}\n")
     cols_demo = [
@@ -170,12 +251,51 @@ def agregar_fases_tiempo_segundos(ruta_entrada: str, ruta_salida: str):
         "tiempo_informacion_a_email_seg",
         "tiempo_presentacion_a_cierre_real_seg",
         "tiempo_total_tramite_seg",
+        "tiempo_total_tramite_habil_seg",
     ]
-    cols_demo = [c for c in cols_demo if c in df.columns]
-    print(df[cols_demo].head())
+    cols_demo = [c for c in cols_demo if c in primero.columns]
+    print(primero[cols_demo].head())
+
+
+def _fases_por_bloque(bloques, fecha_corte):
+    for bloque in bloques:
+        with etapa("calculador1.calcular_fases", filas=len(bloque)):
+            yield calcular_fases(bloque, fecha_corte)
+
+
+def agregar_fases_tiempo_segundos(ruta_entrada: str, ruta_salida: str, fecha_corte: pd.Timestamp = None):
+    # 1. Leer el archivo combinado por bloques (la capa de datos ya entrega
+    #    las fechas como datetime64 y los estados como categóricas). Las
+    #    fases son por fila: cada bloque se calcula apenas llega (xlsx en
+    #    streaming, parquet por lotes) y se escribe sin esperar al resto.
+    #    Sin fecha_corte, una primera pasada solo por las fechas la deriva.
+    if fecha_corte is None:
+        fecha_corte = fecha_corte_de(iterar_bloques(ruta_entrada, columnas=COLUMNAS_CORTE))
+    print(f"Fecha de corte: {fecha_corte}")
+    _mostrar_y_guardar(_fases_por_bloque(iterar_bloques(ruta_entrada), fecha_corte), ruta_salida,
+                       vacio=lambda: calcular_fases(cargar(ruta_entrada), fecha_corte))
+
+
+def agregar_fases_desde_tablas(origen: str, ruta_salida: str, columnas=COLUMNAS_FASES,
+                               fecha_corte: pd.Timestamp = None):
+    """
+    Igual que agregar_fases_tiempo_segundos pero partiendo de las tres
+    tablas (xlsx o carpeta del generador): el join se hace por bloques con
+    combinador.iter_combinado, proyectando solo las columnas necesarias,
+    sin escribir merge_total. Sin fecha_corte se deriva de las tablas.
+    """
+    from combinador import combinar, iter_combinado
+
+    tablas = cargar_tablas(origen)
+    if fecha_corte is None:
+        fecha_corte = fecha_corte_de(tablas.values())
+    print(f"Fecha de corte: {fecha_corte}")
+    partes = (tablas["Solicitantes"], tablas["SolicitudesRecibidas"], tablas["TramiteSolicitudes"])
+    _mostrar_y_guardar(_fases_por_bloque(iter_combinado(*partes, columnas=columnas), fecha_corte), ruta_salida,
+                       vacio=lambda: calcular_fases(combinar(*partes, columnas=columnas), fecha_corte))
 
 
 if __name__ == "__main__":
-    agregar_fases_tiempo_segundos(RUTA_ENTRADA, RUTA_SALIDA)
+    agregar_fases_tiempo_segundos(resolver_ruta(RUTA_ENTRADA), RUTA_SALIDA)
 
 
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Calendario hábil compartido (Perú, America/Lima)
+
+- Jornada: 08:30–17:30
+- Feriados fijos de Perú excluidos
+- BusinessCalendar: días hábiles precalculados para un rango de años,
+  con consultas por ordinal (searchsorted) en vez de recorrer el año
+- business_seconds: duración en segundos hábiles (jornada de días hábiles)
+  entre dos arreglos de fechas, por acumulados
+"""
+
+from datetime import date, time
+from functools import lru_cache
+
+import numpy as np
+import pytz
+
+TZ = pytz.timezone("America/Lima")
+
+BUSINESS_START = time(8,30)
+BUSINESS_END   = time(17,30)
+
+INICIO_JORNADA_SEG = BUSINESS_START.hour * 3600 + BUSINESS_START.minute * 60
+JORNADA_SEG = BUSINESS_END.hour * 3600 + BUSINESS_END.minute * 60 - INICIO_JORNADA_SEG  # 32400
+
+
+def fixed_holidays_peru(year:int):
+    """
+    Feriados fijos de Perú. Tuplas (día, mes).
+    Parche aplicado: crear date(year, month, day) en el orden correcto.
+    """
+    base = [
+        (1, 1),   # Año Nuevo
+        (1, 5),   # Día del Trabajo
+        (29, 6),  # San Pedro y San Pablo
+        (28, 7),  # Independencia
+        (29, 7),  # Fiestas Patrias
+        (30, 8),  # Santa Rosa de Lima
+        (8, 10),  # Combate de Angamos
+        (1, 11),  # Todos los Santos
+        (8, 12),  # Inmaculada Concepción
+        (25, 12)  # Navidad
+    ]
+    return {date(year, month, day) for (day, month) in base}
+
+
+class BusinessCalendar:
+    """
+    Días hábiles de first_year..last_year (inclusive) como arreglo ordenado
+    datetime64[D]. El ordinal de una fecha d es la cantidad de días hábiles
+    <= d, así que "N-ésimo hábil posterior a d" es days[ordinal(d) + N - 1].
+    """
+
+    def __init__(self, first_year:int, last_year:int = None):
+        if last_year is None:
+            last_year = first_year
+        if last_year < first_year:
+            raise ValueError(f"Rango de años inválido: {first_year}..{last_year}")
+        self.first_year = first_year
+        self.last_year = last_year
+
+        todos = np.arange(
+            np.datetime64(f"{first_year:04d}-01-01"),
+            np.datetime64(f"{last_year + 1:04d}-01-01"),
+            dtype="datetime64[D]"
+        )
+        # 1970-01-01 fue jueves -> lunes = 0
+        weekday = (todos.astype(np.int64) + 3) % 7
+        feriados = np.array(
+            sorted(h for y in range(first_year, last_year + 1) for h in fixed_holidays_peru(y)),
+            dtype="datetime64[D]"
+        )
+        habil = (weekday < 5) & ~np.isin(todos, feriados)
+        self.days = todos[habil]
+        # por día del rango: ¿es hábil? y cuántos hábiles hay antes (para acumulados O(1))
+        self._primer_dia = todos[0]
+        self._es_habil = habil
+        self._habiles_antes = np.concatenate([[0], np.cumsum(habil)[:-1]])
+
+    def __len__(self):
+        return len(self.days)
+
+    def ordinal(self, d):
+        """Cantidad de días hábiles <= d (escalar o arreglo)."""
+        return np.searchsorted(self.days, np.asarray(d, dtype="datetime64[D]"), side="right")
+
+    def available_after(self, d):
+        """Cantidad de días hábiles estrictamente posteriores a d dentro del calendario."""
+        return len(self.days) - self.ordinal(d)
+
+    def nth_after(self, d, n):
+        """
+        Versión vectorizada: N-ésimo día hábil estrictamente posterior a d
+        (n=1 -> primer hábil posterior). Devuelve datetime64[D]; NaT donde
+        el resultado cae fuera del calendario.
+        """
+        idx = self.ordinal(d) + np.asarray(n, dtype=np.int64) - 1
+        fuera = (idx < 0) | (idx >= len(self.days))
+        out = self.days[np.clip(idx, 0, max(len(self.days) - 1, 0))]
+        return np.where(fuera, np.datetime64("NaT", "D"), out)
+
+    def days_between(self, start:date, end:date):
+        """Días hábiles en [start, end] como arreglo datetime64[D]."""
+        ini = np.searchsorted(self.days, np.datetime64(start, "D"), side="left")
+        fin = np.searchsorted(self.days, np.datetime64(end, "D"), side="right")
+        return self.days[ini:fin]
+
+    def day_index(self, d):
+        """
+        ordinal(d) y si d es hábil, por tabla del día (sin searchsorted).
+        d: arreglo datetime64; NaT o fuera del calendario -> (-1, False).
+        """
+        dia = np.asarray(d, dtype="datetime64[D]")
+        idx = dia.view(np.int64) - self._primer_dia.astype(np.int64)  # NaT -> muy negativo
+        dentro = (idx >= 0) & (idx < len(self._es_habil))
+        idx = np.where(dentro, idx, 0)
+        es_habil = self._es_habil[idx] & dentro
+        return np.where(dentro, self._habiles_antes[idx] + es_habil, -1), es_habil
+
+    def business_seconds_until(self, t):
+        """
+        Segundos hábiles acumulados desde el inicio del calendario hasta t
+        (arreglo datetime64, hora local sin tz): jornadas completas de los
+        días hábiles anteriores + lo transcurrido de la jornada de t.
+        """
+        t = np.asarray(t, dtype="datetime64[s]")
+        dia = t.astype("datetime64[D]")
+        idx = (dia - self._primer_dia).astype(np.int64)
+        fuera_antes, fuera_despues = idx < 0, idx >= len(self._es_habil)
+        idx = np.clip(idx, 0, len(self._es_habil) - 1)
+        es_habil = self._es_habil[idx] & ~fuera_antes & ~fuera_despues
+        previos = np.where(fuera_despues, len(self.days), np.where(fuera_antes, 0, self._habiles_antes[idx]))
+        segundo = (t - dia).astype(np.int64)
+        en_jornada = np.clip(segundo - INICIO_JORNADA_SEG, 0, JORNADA_SEG)
+        return previos * JORNADA_SEG + np.where(es_habil, en_jornada, 0)
+
+    def business_seconds(self, inicio, fin):
+        """
+        Segundos hábiles entre inicio y fin (arreglos datetime64 locales):
+        diferencia de acumulados, sin bucles por fila. NaN donde alguno es
+        NaT; negativo si fin < inicio.
+        """
+        inicio = np.asarray(inicio, dtype="datetime64[s]")
+        fin = np.asarray(fin, dtype="datetime64[s]")
+        dur = (self.business_seconds_until(fin) - self.business_seconds_until(inicio)).astype(np.float64)
+        dur[np.isnat(inicio) | np.isnat(fin)] = np.nan
+        return dur
+
+
+def business_seconds(inicio, fin):
+    """
+    BusinessCalendar.business_seconds con un calendario que cubre los años
+    presentes en inicio/fin (fechas locales sin tz; NaT se ignora).
+    """
+    inicio = np.asarray(inicio, dtype="datetime64[s]")
+    fin = np.asarray(fin, dtype="datetime64[s]")
+    # NaT es el mínimo int64: el máximo lo ignora solo y el mínimo se filtra con where
+    nat, tope = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+    enteros = [a.reshape(-1).view(np.int64) for a in (inicio, fin)]
+    mayor = max(int(e.max(initial=nat)) for e in enteros)
+    if mayor == nat:
+        return np.full(np.broadcast(inicio, fin).shape, np.nan)
+    menor = min(int(e.min(initial=tope, where=e != nat)) for e in enteros)
+    anios = np.array([menor, mayor], dtype="datetime64[s]").astype("datetime64[Y]").astype(np.int64) + 1970
+    return get_calendar(int(anios[0]), int(anios[1])).business_seconds(inicio, fin)
+
+
+@lru_cache(maxsize=None)
+def get_calendar(first_year:int, last_year:int = None) -> BusinessCalendar:
+    """Calendario compartido: se construye una sola vez por rango de años."""
+    return BusinessCalendar(first_year, last_year)
@@ -1,26 +1,154 @@
+import numpy as np
 import pandas as pd
 
-# Cargar el archivo
+from datos import cargar_tablas, guardar
+from esquema import codigos_a_int
+from instrumentacion import etapa
+
+# Cargar el archivo (xlsx del generador o carpeta con parquet/csv)
 file_path = "legaltech_pset_solicitudes.xlsx"
 
-solicitantes = pd.read_excel(file_path, sheet_name="Solicitantes")
-solicitudes = pd.read_excel(file_path, sheet_name="SolicitudesRecibidas")
-tramite = pd.read_excel(file_path, sheet_name="TramiteSolicitudes")
-
-# Merge 1: solicitantes + solicitudes
-df = solicitudes.merge(
-    solicitantes,
-    on="codigo_solicitante",
-    how="left"
-)
-
-# Merge 2: lo anterior + trámite
-df_total = df.merge(
-    tramite,
-    on="codigo_solicitud",
-    how="left"
-)
-
-print(df_total.head())
-# Si quieres guardarlo en un archivo nuevo
-df_total.to_excel("merge_total.xlsx", index=False)
+# Salida en Parquet; Excel solo si se pide
+RUTA_SALIDA = "merge_total.parquet"
+RUTA_EXCEL = None  # p. ej. "merge_total.xlsx"
+
+# Filas de solicitudes por bloque en iter_combinado
+TAM_BLOQUE = 500_000
+
+
+# -------------------------------------------------
+# ÍNDICE POSICIONAL
+# -------------------------------------------------
+# Los códigos S####/P#### son enteros densos (1..n), así que cada join es
+# un "take" por posición: clave -> fila sin hashing ni copia de la tabla
+# izquierda. Si las claves no fueran densas se cae a pd.Index.get_indexer.
+
+def _claves_tabla(claves) -> pd.Series:
+    """Claves de la tabla indexada como enteros; sin nulos ni negativos (no tendrían posición)."""
+    claves = codigos_a_int(pd.Series(claves))
+    if claves.hasnans:
+        raise ValueError("Claves nulas o no numéricas: el join posicional requiere un código por fila")
+    if len(claves) and int(claves.min()) < 0:
+        raise ValueError("Claves negativas: el join posicional requiere códigos >= 0")
+    return claves
+
+def indice_posicional(claves) -> np.ndarray:
+    """
+    Arreglo pos tal que pos[clave] = fila de la tabla (-1 si no existe).
+    Exige claves únicas, igual que un merge many-to-one.
+    """
+    claves = _claves_tabla(claves).to_numpy(dtype=np.int64)
+    pos = np.full(int(claves.max()) + 1 if len(claves) else 1, -1, dtype=np.int64)
+    pos[claves] = np.arange(len(claves))
+    if np.count_nonzero(pos >= 0) != len(claves):
+        raise ValueError("Claves duplicadas: el join posicional requiere una fila por código")
+    return pos
+
+def buscar_posiciones(claves_tabla, claves_buscadas) -> np.ndarray:
+    """Fila de claves_tabla para cada clave buscada (-1 si no está)."""
+    tabla = _claves_tabla(claves_tabla)
+    buscadas = codigos_a_int(pd.Series(claves_buscadas))
+    if len(tabla) == 0:
+        return np.full(len(buscadas), -1, dtype=np.int64)
+    maximo = int(tabla.max())
+    if maximo <= 4 * len(tabla) + 1024 and not buscadas.hasnans:
+        pos = indice_posicional(tabla)
+        b = buscadas.to_numpy(dtype=np.int64)
+        fuera = (b < 0) | (b >= len(pos))
+        return np.where(fuera, -1, pos[np.clip(b, 0, len(pos) - 1)])
+    idx = pd.Index(tabla)
+    if not idx.is_unique:
+        raise ValueError("Claves duplicadas: el join posicional requiere una fila por código")
+    return idx.get_indexer(buscadas)
+
+def tomar(df: pd.DataFrame, posiciones: np.ndarray, columnas) -> dict:
+    """Columnas de df reordenadas por posición; -1 queda nulo (NaN/NaT/NA)."""
+    return {
+        col: pd.api.extensions.take(df[col].array, posiciones, allow_fill=True)
+        for col in columnas
+    }
+
+
+# -------------------------------------------------
+# JOIN
+# -------------------------------------------------
+def columnas_combinadas(solicitantes, solicitudes, tramite) -> list:
+    """Orden de columnas del merge clásico: solicitudes, solicitante, trámite."""
+    return (list(solicitudes.columns)
+            + [c for c in solicitantes.columns if c != "codigo_solicitante"]
+            + [c for c in tramite.columns if c != "codigo_solicitud"])
+
+def _repartir(solicitantes, solicitudes, tramite, columnas):
+    """Columnas de salida por tabla de origen (solicitudes gana ante nombres repetidos)."""
+    cols_solicitud = [c for c in columnas if c in solicitudes.columns]
+    cols_solicitante = [c for c in columnas if c in solicitantes.columns and c not in cols_solicitud]
+    cols_tramite = [c for c in columnas
+                    if c in tramite.columns and c not in cols_solicitud and c not in cols_solicitante]
+    return cols_solicitud, cols_solicitante, cols_tramite
+
+def _posiciones(solicitantes, solicitudes, tramite, cols_solicitante, cols_tramite):
+    """
+    Fila de solicitante y de trámite de cada solicitud (None si no se pide
+    ninguna columna de esa tabla). Se calculan una vez para todas las
+    solicitudes; los bloques de iter_combinado toman su tramo.
+    """
+    pos_solicitante = pos_tramite = None
+    if cols_solicitante:
+        with etapa("combinador.join_solicitantes", filas=len(solicitudes)):
+            pos_solicitante = buscar_posiciones(solicitantes["codigo_solicitante"],
+                                                solicitudes["codigo_solicitante"])
+    if cols_tramite:
+        with etapa("combinador.join_tramite", filas=len(solicitudes)):
+            pos_tramite = buscar_posiciones(tramite["codigo_solicitud"], solicitudes["codigo_solicitud"])
+    return pos_solicitante, pos_tramite
+
+def _combinar_filas(solicitantes, solicitudes, tramite, columnas, posiciones,
+                    filas=slice(None)) -> pd.DataFrame:
+    cols_solicitud, cols_solicitante, cols_tramite = _repartir(solicitantes, solicitudes, tramite, columnas)
+    pos_solicitante, pos_tramite = posiciones
+    datos = {c: solicitudes[c].array[filas] for c in cols_solicitud}
+    if cols_solicitante:
+        datos.update(tomar(solicitantes, pos_solicitante[filas], cols_solicitante))
+    if cols_tramite:
+        datos.update(tomar(tramite, pos_tramite[filas], cols_tramite))
+    return pd.DataFrame({c: datos[c] for c in columnas if c in datos})
+
+def combinar(solicitantes: pd.DataFrame, solicitudes: pd.DataFrame, tramite: pd.DataFrame,
+             columnas=None) -> pd.DataFrame:
+    """
+    Equivalente a solicitudes ⟕ solicitantes ⟕ trámite (left joins por
+    código), resuelto con índices posicionales. columnas proyecta la
+    salida: solo se leen y copian esas columnas.
+    """
+    if columnas is None:
+        columnas = columnas_combinadas(solicitantes, solicitudes, tramite)
+    _, cols_solicitante, cols_tramite = _repartir(solicitantes, solicitudes, tramite, columnas)
+    posiciones = _posiciones(solicitantes, solicitudes, tramite, cols_solicitante, cols_tramite)
+    return _combinar_filas(solicitantes, solicitudes, tramite, columnas, posiciones)
+
+def iter_combinado(solicitantes: pd.DataFrame, solicitudes: pd.DataFrame, tramite: pd.DataFrame,
+                   columnas=None, tam_bloque: int = TAM_BLOQUE):
+    """
+    Vista combinada por bloques de filas de solicitudes, sin armar ni
+    escribir merge_total: cada bloque es un DataFrame listo para consumir
+    (p. ej. calculador1.calcular_fases). Las posiciones del join se
+    calculan una sola vez; cada bloque solo toma su tramo.
+    """
+    if columnas is None:
+        columnas = columnas_combinadas(solicitantes, solicitudes, tramite)
+    _, cols_solicitante, cols_tramite = _repartir(solicitantes, solicitudes, tramite, columnas)
+    posiciones = _posiciones(solicitantes, solicitudes, tramite, cols_solicitante, cols_tramite)
+    for ini in range(0, len(solicitudes), tam_bloque):
+        yield _combinar_filas(solicitantes, solicitudes, tramite, columnas, posiciones,
+                              slice(ini, min(ini + tam_bloque, len(solicitudes))))
+
+if __name__ == "__main__":
+    tablas = cargar_tablas(file_path)
+    with etapa("combinador.combinar", filas=len(tablas["SolicitudesRecibidas"])):
+        df_total = combinar(tablas["Solicitantes"], tablas["SolicitudesRecibidas"], tablas["TramiteSolicitudes"])
+
+    print(df_total.head())
+    guardar(df_total, RUTA_SALIDA)
+    # Si quieres guardarlo también en Excel
+    if RUTA_EXCEL:
+        guardar(df_total, RUTA_EXCEL)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Fase y antigüedad de cada expediente en varias fechas de corte a la vez
+
+calculador1 evalúa contra una única fecha de corte. Aquí cada expediente es
+una cadena de eventos (presentación, evaluación, registro, información,
+email) y la fase en un corte c es la cantidad de eventos <= c. Con los
+cortes ordenados, np.searchsorted da para cada evento el primer corte en
+que ya ocurrió; con eso:
+  - fases_en_cortes: fase y antigüedad de la fase por expediente y corte
+  - resumen_cortes:  expedientes y antigüedad media por (corte, fase) con
+                     arreglos de diferencias + cumsum, O(filas + cortes)
+Así 52 cortes semanales cuestan prácticamente lo mismo que uno.
+
+Uso:
+    cortes = pd.date_range("2025-01-05 23:59:59", periods=52, freq="7D")
+    resumen = resumen_cortes(df_merge, cortes)
+"""
+
+import numpy as np
+import pandas as pd
+
+from datos import cargar, guardar, resolver_ruta
+
+# Archivo combinado (merge_total) y salida del resumen semanal
+RUTA_ENTRADA = "merge_total.parquet"
+RUTA_SALIDA = "resumen_cortes.parquet"
+
+# Eventos en orden; tras el k-ésimo evento el expediente está en FASES_CORTE[k]
+EVENTOS = ["fecha_presentacion", "fecha_evaluacion", "fecha_registro", "fecha_informacion", "fecha_email"]
+
+FASES_CORTE = [
+    "no_presentada",
+    "en_evaluacion",
+    "en_registro",
+    "en_informacion",
+    "en_email",
+    "cerrado_en_email",
+    "cerrado_en_evaluacion",
+]
+_CERRADO_EVAL = FASES_CORTE.index("cerrado_en_evaluacion")
+
+_INF = np.iinfo(np.int64).max
+
+
+# ==============================
+# EVENTOS
+# ==============================
+def matriz_eventos(df: pd.DataFrame) -> np.ndarray:
+    """
+    Tiempos de los eventos (n x 5, int64 ns). Un evento faltante (o uno
+    posterior a un faltante) queda en +inf. Se toma el máximo acumulado
+    para que "eventos <= c" sea un prefijo: el registro se fecha desde la
+    presentación y puede quedar antes de la evaluación; la fase siguiente
+    empieza recién cuando ocurrieron ambos.
+    """
+    E = np.empty((len(df), len(EVENTOS)), dtype=np.int64)
+    for j, col in enumerate(EVENTOS):
+        v = df[col].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        E[:, j] = np.where(v == np.iinfo(np.int64).min, _INF, v)
+    return np.maximum.accumulate(E, axis=1)
+
+def codigos_fase(df: pd.DataFrame) -> np.ndarray:
+    """Código de fase tras k eventos (n x 6): el 2º evento cierra si no_cumple."""
+    no_cumple = (df["resultado_evaluacion"] == "no_cumple").to_numpy(dtype=bool, na_value=False)
+    codigos = np.tile(np.arange(len(EVENTOS) + 1, dtype=np.int8), (len(df), 1))
+    codigos[no_cumple, 2] = _CERRADO_EVAL
+    return codigos
+
+def _preparar_cortes(cortes):
+    cortes = pd.DatetimeIndex(cortes)
+    if cortes.tz is not None:
+        raise ValueError("Los cortes deben ser fechas locales sin tz (como merge_total)")
+    if not cortes.is_monotonic_increasing:
+        raise ValueError("Los cortes deben venir ordenados de menor a mayor")
+    return cortes, cortes.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+def indices_corte(E: np.ndarray, cortes_ns: np.ndarray) -> np.ndarray:
+    """Para cada evento, índice del primer corte en que ya ocurrió (len(cortes) si nunca)."""
+    return np.searchsorted(cortes_ns, E, side="left").astype(np.int32)
+
+
+# ==============================
+# POR EXPEDIENTE
+# ==============================
+def fases_en_cortes(df: pd.DataFrame, cortes) -> pd.DataFrame:
+    """
+    Tabla larga (expediente x corte): codigo_solicitud, corte, fase
+    (categórica FASES_CORTE) y edad_fase_seg (segundos desde que entró a
+    esa fase; NaN si aún no se presentó).
+    """
+    cortes, cortes_ns = _preparar_cortes(cortes)
+    E = matriz_eventos(df)
+    idx = indices_corte(E, cortes_ns)
+    n, C = len(df), len(cortes)
+
+    # k[i, c] = eventos ocurridos al corte c (el evento j ocurrió si idx_j <= c)
+    k = np.zeros((n, C), dtype=np.int8)
+    rango = np.arange(C, dtype=np.int32)
+    for j in range(len(EVENTOS)):
+        k += idx[:, j, None] <= rango[None, :]
+
+    fase = np.take_along_axis(codigos_fase(df), k.astype(np.intp), axis=1)
+    entrada = np.take_along_axis(E, np.maximum(k.astype(np.intp) - 1, 0), axis=1)
+    edad = ((cortes_ns[None, :] - entrada) / 1e9).astype(np.float64)
+    edad[k == 0] = np.nan
+
+    return pd.DataFrame({
+        "codigo_solicitud": np.repeat(df["codigo_solicitud"].to_numpy(), C),
+        "corte": np.tile(cortes.to_numpy(), n),
+        "fase": pd.Categorical.from_codes(fase.ravel(), categories=FASES_CORTE),
+        "edad_fase_seg": edad.ravel(),
+    })
+
+
+# ==============================
+# AGREGADO POR CORTE
+# ==============================
+def resumen_cortes(df: pd.DataFrame, cortes) -> pd.DataFrame:
+    """
+    Expedientes y antigüedad media de la fase por (corte, fase), sin
+    materializar la tabla larga. Cada evento suma +1 a la fase a la que
+    entra y -1 a la que deja, en el primer corte que lo incluye; lo mismo
+    con los tiempos de entrada. Un cumsum sobre los cortes da el estado en
+    cada uno: antigüedad media = corte - entrada media.
+    """
+    cortes, cortes_ns = _preparar_cortes(cortes)
+    E = matriz_eventos(df)
+    idx = indices_corte(E, cortes_ns)
+    codigos = codigos_fase(df)
+    n, C, P = len(df), len(cortes), len(FASES_CORTE)
+
+    # tiempos en segundos desde el primer corte (float64 exacto para las sumas)
+    origen = cortes_ns[0] if C else 0
+    E_seg = np.where(E == _INF, 0.0, (E - origen) / 1e9)
+
+    cuenta = np.zeros((C + 1) * P)
+    suma = np.zeros((C + 1) * P)
+    for j in range(len(EVENTOS)):
+        pos = idx[:, j].astype(np.int64) * P
+        sale, entra = pos + codigos[:, j], pos + codigos[:, j + 1]
+        cuenta += np.bincount(entra, minlength=(C + 1) * P) - np.bincount(sale, minlength=(C + 1) * P)
+        suma += np.bincount(entra, weights=E_seg[:, j], minlength=(C + 1) * P)
+        if j > 0:
+            suma -= np.bincount(sale, weights=E_seg[:, j - 1], minlength=(C + 1) * P)
+    cuenta = cuenta.reshape(C + 1, P)[:C].cumsum(axis=0)
+    suma = suma.reshape(C + 1, P)[:C].cumsum(axis=0)
+    cuenta[:, 0] += n  # al inicio todas "no_presentada"
+
+    corte_seg = ((cortes_ns - origen) / 1e9)[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        edad_media = np.where(cuenta > 0, corte_seg - suma / cuenta, np.nan)
+    edad_media[:, 0] = np.nan
+
+    return pd.DataFrame({
+        "corte": np.repeat(cortes.to_numpy(), P),
+        "fase": pd.Categorical.from_codes(np.tile(np.arange(P), C), categories=FASES_CORTE),
+        "expedientes": np.rint(cuenta.ravel()).astype(np.int64),
+        "edad_media_fase_seg": edad_media.ravel(),
+    })
+
+
+if __name__ == "__main__":
+    df = cargar(resolver_ruta(RUTA_ENTRADA))
+    # cortes semanales (domingo 23:59:59) sobre el rango de presentación
+    inicio = df["fecha_presentacion"].min().normalize()
+    fin = df["fecha_presentacion"].max().normalize() + pd.Timedelta(days=7)
+    cortes = pd.date_range(inicio, fin, freq="W-SUN") + pd.Timedelta(hours=23, minutes=59, seconds=59)
+    resumen = resumen_cortes(df, cortes)
+
+    tabla = resumen.pivot(index="corte", columns="fase", values="expedientes")
+    print(f"\n=== EXPEDIENTES POR FASE EN {len(cortes)} CORTES SEMANALES ===\n")
+    print(tabla.tail(10))
+    guardar(resumen, RUTA_SALIDA)
+    print(f"\nResumen guardado: {RUTA_SALIDA}")
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+Cubo de KPIs por dimensiones demográficas y de calendario
+
+Dimensiones: sexo, nivel_de_estudios, ocupacion, banda_edad (edad a la
+fecha de presentación), mes y dia_semana de fecha_presentacion. Cada fila
+se codifica con enteros (códigos de las categóricas) y la celda es un
+único entero en base mixta, así que construir el cubo es una sola pasada
+de np.bincount por medida:
+  - conteos: solicitudes, evaluadas, si_cumple, no_cumple
+  - por medida de duración (calculador1): n_<m>, suma_<m>, min_<m> y max_<m>
+  - boceto: histograma de buckets logarítmicos por (celda, medida) con los
+    buckets, el rango y el acotado de kpis, para cuantiles en roll-ups
+
+consulta() agrega las celdas (decenas de miles como mucho) en vez de las
+filas: roll-ups y drill-downs con filtros salen del cubo en milisegundos.
+
+Uso:
+    cubo = CuboKPI.construir(df_fases)        # merge_total + calcular_fases
+    cubo.guardar("cubo_kpi")
+    CuboKPI.cargar("cubo_kpi").consulta(por=["sexo", "mes"], filtros={"ocupacion": "estudiante"})
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from datos import cargar, guardar, resolver_ruta
+from esquema import CATEGORIAS
+from kpis import acotar, gamma_de, indice_bucket, posicion_cuantil, valor_bucket
+
+RUTA_ENTRADA = "merge_con_fases_tiempo_seg.parquet"
+DIRECTORIO_CUBO = "cubo_kpi"
+
+SIN_DATO = "sin_dato"
+
+BANDAS_EDAD = ["<18", "18-21", "22-26", "27-34", "35-49", "50-64", "65+"]
+_LIMITES_EDAD = np.array([18, 22, 27, 35, 50, 65])
+
+DIMENSIONES = {
+    "sexo": CATEGORIAS["sexo"],
+    "nivel_de_estudios": CATEGORIAS["nivel_de_estudios"],
+    "ocupacion": CATEGORIAS["ocupacion"],
+    "banda_edad": BANDAS_EDAD,
+    "mes": list(range(1, 13)),
+    "dia_semana": ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"],
+}
+
+MEDIDAS = [
+    "tiempo_presentacion_a_evaluacion_seg",
+    "tiempo_evaluacion_a_registro_seg",
+    "tiempo_registro_a_informacion_seg",
+    "tiempo_informacion_a_email_seg",
+    "tiempo_presentacion_a_cierre_real_seg",
+    "tiempo_total_tramite_seg",
+]
+CONTEOS = ["solicitudes", "evaluadas", "si_cumple", "no_cumple"]
+
+ALFA_CUBO = 0.02
+_BMIN = -64        # buckets por debajo de gamma^_BMIN se juntan en el primero
+_K = 4096          # rango de códigos de bucket con signo: [-_K/2, _K/2)
+
+
+# ==============================
+# CODIFICACIÓN
+# ==============================
+def _codigos_categoria(serie: pd.Series, categorias) -> np.ndarray:
+    """Código por fila en categorias; nulos y valores no previstos -> SIN_DATO (último)."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        mapa = np.array([categorias.index(c) if c in categorias else len(categorias)
+                         for c in serie.cat.categories] + [len(categorias)], dtype=np.int64)
+        return mapa[serie.cat.codes.to_numpy()]  # código -1 -> último del mapa
+    pos = pd.Index(categorias).get_indexer(serie.astype(object))
+    return np.where(pos < 0, len(categorias), pos)
+
+def codificar(df: pd.DataFrame) -> dict:
+    """Códigos enteros de cada dimensión (0..len(categorías), el último es SIN_DATO)."""
+    pres = df["fecha_presentacion"]
+    cod = {
+        "sexo": _codigos_categoria(df["sexo"], DIMENSIONES["sexo"]),
+        "nivel_de_estudios": _codigos_categoria(df["nivel_de_estudios"], DIMENSIONES["nivel_de_estudios"]),
+        "ocupacion": _codigos_categoria(df["ocupacion"], DIMENSIONES["ocupacion"]),
+    }
+    edad = ((pres - df["fecha_nacimiento"]).dt.days // 365).to_numpy(dtype=np.float64, na_value=np.nan)
+    banda = np.searchsorted(_LIMITES_EDAD, np.nan_to_num(edad, nan=0), side="right")
+    cod["banda_edad"] = np.where(np.isnan(edad), len(BANDAS_EDAD), banda)
+    sin_fecha = pres.isna().to_numpy()
+    cod["mes"] = np.where(sin_fecha, 12, pres.dt.month.to_numpy(dtype=np.float64, na_value=13) - 1).astype(np.int64)
+    cod["dia_semana"] = np.where(sin_fecha, 7, pres.dt.dayofweek.to_numpy(dtype=np.float64, na_value=7)).astype(np.int64)
+    return cod
+
+def _radices():
+    return np.array([len(v) + 1 for v in DIMENSIONES.values()], dtype=np.int64)  # +1: SIN_DATO
+
+def _celda(cod: dict, dims, radices) -> np.ndarray:
+    clave = np.zeros(len(next(iter(cod.values()))), dtype=np.int64)
+    for d, r in zip(dims, radices):
+        clave = clave * r + cod[d]
+    return clave
+
+
+# ==============================
+# BUCKETS (kpis.indice_bucket / valor_bucket)
+# ==============================
+# Aquí solo se empaca el bucket de kpis en un código con signo que cabe en
+# int16: 0 = cero, +k positivos, -k negativos (monótono en x).
+def _buckets(x: np.ndarray, gamma: float) -> np.ndarray:
+    codigo = np.zeros(len(x), dtype=np.int64)
+    ax = np.abs(x)
+    nz = ax > 0
+    b = np.clip(indice_bucket(ax[nz], gamma) - _BMIN + 1, 1, _K // 2 - 1)
+    codigo[nz] = np.where(x[nz] > 0, b, -b)
+    return codigo
+
+def _valor_bucket(codigo: np.ndarray, gamma: float) -> np.ndarray:
+    v = valor_bucket(np.abs(codigo) - 1 + _BMIN, gamma)
+    return np.where(codigo == 0, 0.0, np.sign(codigo) * v)
+
+
+# ==============================
+# CUBO
+# ==============================
+class CuboKPI:
+    def __init__(self, celdas: pd.DataFrame, bocetos: pd.DataFrame, medidas, alfa: float):
+        self.celdas = celdas      # una fila por celda poblada
+        self.bocetos = bocetos    # (celda, medida, bucket, conteo)
+        self.medidas = list(medidas)
+        self.alfa = alfa
+        self.gamma = gamma_de(alfa)
+        # arreglos que usan las consultas, resueltos una vez
+        self._cod = {d: celdas[d].cat.codes.to_numpy().astype(np.int64) for d in DIMENSIONES}
+        self._etiquetas = {d: celdas[d].cat.categories for d in DIMENSIONES}
+        self._col = {c: celdas[c].to_numpy(dtype=np.float64) for c in celdas.columns
+                     if c not in DIMENSIONES and c != "celda"}
+        self._fila_boceto = pd.Index(celdas["celda"].to_numpy()).get_indexer(bocetos["celda"].to_numpy())
+        self._clave_boceto = bocetos["medida"].to_numpy().astype(np.int64) * _K + \
+            bocetos["bucket"].to_numpy().astype(np.int64) + _K // 2
+        self._conteo_boceto = bocetos["conteo"].to_numpy(dtype=np.float64)
+
+    @classmethod
+    def construir(cls, df: pd.DataFrame, medidas=MEDIDAS, alfa: float = ALFA_CUBO) -> "CuboKPI":
+        """Una pasada: bincount por celda para conteos/sumas y np.unique para los buckets."""
+        faltan = [m for m in medidas if m not in df.columns]
+        if faltan:
+            from calculador1 import calcular_fases
+            df = calcular_fases(df.copy(deep=False))
+
+        dims, radices = list(DIMENSIONES), _radices()
+        celda = _celda(codificar(df), dims, radices)
+        pobladas, inversa = np.unique(celda, return_inverse=True)
+        n_celdas = len(pobladas)
+
+        datos = {"celda": pobladas}
+        # decodificar la celda en sus dimensiones (base mixta)
+        resto = pobladas.copy()
+        for d, r in zip(reversed(dims), reversed(radices)):
+            etiquetas = [str(e) for e in DIMENSIONES[d]] + [SIN_DATO]
+            datos[d] = pd.Categorical.from_codes(resto % r, categories=etiquetas)
+            resto //= r
+        datos = {"celda": datos["celda"], **{d: datos[d] for d in dims}}
+
+        estado = df["estado"] if "estado" in df.columns else pd.Series(index=df.index, dtype=object)
+        resultado = df["resultado_evaluacion"]
+        banderas = {
+            "solicitudes": np.ones(len(df), dtype=bool),
+            "evaluadas": (estado == "evaluado").to_numpy(dtype=bool, na_value=False),
+            "si_cumple": (resultado == "sí_cumple").to_numpy(dtype=bool, na_value=False),
+            "no_cumple": (resultado == "no_cumple").to_numpy(dtype=bool, na_value=False),
+        }
+        for nombre, bandera in banderas.items():
+            datos[nombre] = np.bincount(inversa[bandera], minlength=n_celdas).astype(np.int64)
+
+        gamma = gamma_de(alfa)
+        partes = []
+        for i, m in enumerate(medidas):
+            x = df[m].to_numpy(dtype=np.float64, na_value=np.nan)
+            ok = ~np.isnan(x)
+            datos[f"n_{m}"] = np.bincount(inversa[ok], minlength=n_celdas).astype(np.int64)
+            datos[f"suma_{m}"] = np.bincount(inversa[ok], weights=x[ok], minlength=n_celdas)
+            for nombre, ufunc in (("min", np.fmin), ("max", np.fmax)):
+                extremo = np.full(n_celdas, np.nan)
+                ufunc.at(extremo, inversa[ok], x[ok])
+                datos[f"{nombre}_{m}"] = extremo
+            clave = (inversa[ok].astype(np.int64) * _K + _buckets(x[ok], gamma) + _K // 2)
+            unicas, conteo = np.unique(clave, return_counts=True)
+            partes.append(pd.DataFrame({
+                "celda": pobladas[unicas // _K],
+                "medida": np.full(len(unicas), i, dtype=np.int8),
+                "bucket": (unicas % _K - _K // 2).astype(np.int16),
+                "conteo": conteo.astype(np.int64),
+            }))
+        bocetos = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(
+            columns=["celda", "medida", "bucket", "conteo"])
+        return cls(pd.DataFrame(datos), bocetos, medidas, alfa)
+
+    # ------------------------------
+    # CONSULTAS
+    # ------------------------------
+    def _mascara(self, filtros) -> np.ndarray:
+        mask = np.ones(len(self.celdas), dtype=bool)
+        for d, valores in (filtros or {}).items():
+            if d not in DIMENSIONES:
+                raise ValueError(f"Dimensión desconocida: {d}")
+            valores = valores if isinstance(valores, (list, tuple, set)) else [valores]
+            codigos = self._etiquetas[d].get_indexer([str(v) for v in valores])
+            mask &= np.isin(self._cod[d], codigos)
+        return mask
+
+    def consulta(self, por=(), filtros=None, cuantiles=(0.5, 0.9)) -> pd.DataFrame:
+        """
+        Roll-up a las dimensiones `por` (vacío = total) de las celdas que
+        cumplen `filtros` ({dimensión: valor o lista}). Devuelve conteos,
+        tasa_si_cumple (sobre evaluadas), media_<m> y p<q>_<m> por grupo.
+        """
+        por = list(por)
+        mask = self._mascara(filtros)
+        radices = [len(self._etiquetas[d]) for d in por]
+        grupo = np.zeros(len(self.celdas), dtype=np.int64)
+        for d, r in zip(por, radices):
+            grupo = grupo * r + self._cod[d]
+        n_grupos = int(np.prod(radices)) if por else 1
+
+        g = grupo[mask]
+        salida = {}
+        for c in CONTEOS:
+            salida[c] = np.bincount(g, weights=self._col[c][mask], minlength=n_grupos)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            salida["tasa_si_cumple"] = salida["si_cumple"] / salida["evaluadas"]
+            for m in self.medidas:
+                n = np.bincount(g, weights=self._col[f"n_{m}"][mask], minlength=n_grupos)
+                suma = np.bincount(g, weights=self._col[f"suma_{m}"][mask], minlength=n_grupos)
+                salida[f"media_{m}"] = suma / n
+        if cuantiles:
+            salida.update(self._cuantiles(grupo, mask, n_grupos, cuantiles))
+
+        # solo grupos con solicitudes, etiquetados decodificando la base mixta
+        hay = np.flatnonzero(salida["solicitudes"] > 0)
+        columnas, resto = {}, hay
+        for d, r in zip(reversed(por), reversed(radices)):
+            columnas[d] = pd.Categorical.from_codes(resto % r, categories=self._etiquetas[d])
+            resto = resto // r
+        columnas = {d: columnas[d] for d in por}
+        for c, v in salida.items():
+            columnas[c] = v[hay].astype(np.int64) if c in CONTEOS else v[hay]
+        return pd.DataFrame(columnas)
+
+    def _cuantiles(self, grupo, mask, n_grupos, cuantiles) -> dict:
+        """
+        Cuantiles por (grupo, medida) juntando los buckets de las celdas del
+        grupo, acotados al min/max del grupo como en kpis.AgregadorKPI
+        (cubos guardados sin min_<m>/max_<m> quedan sin acotar).
+        """
+        fila = self._fila_boceto
+        sel = mask[fila]
+        M = len(self.medidas)
+        clave = grupo[fila[sel]] * (M * _K) + self._clave_boceto[sel]
+        unicas, inv = np.unique(clave, return_inverse=True)
+        conteo = np.bincount(inv, weights=self._conteo_boceto[sel])
+        gm, codigo = unicas // _K, unicas % _K - _K // 2
+
+        # por (grupo, medida): acumulado global y desplazamiento de inicio
+        acumulado = np.cumsum(conteo)
+        serie, inicio = np.unique(gm, return_index=True)
+        total = np.add.reduceat(conteo, inicio) if len(inicio) else np.zeros(0)
+        base = acumulado[inicio] - conteo[inicio]
+        fin = np.append(inicio[1:], len(conteo)) - 1
+
+        g = grupo[mask]
+        limites = {}
+        for m in self.medidas:
+            if f"min_{m}" in self._col:
+                minimo, maximo = np.full(n_grupos, np.nan), np.full(n_grupos, np.nan)
+                np.fmin.at(minimo, g, self._col[f"min_{m}"][mask])
+                np.fmax.at(maximo, g, self._col[f"max_{m}"][mask])
+                limites[m] = minimo, maximo
+
+        salida = {}
+        for q in cuantiles:
+            k = posicion_cuantil(acumulado, base, total, q, fin)
+            valores = _valor_bucket(codigo[k], self.gamma)
+            for i, m in enumerate(self.medidas):
+                col = np.full(n_grupos, np.nan)
+                es_m = serie % M == i
+                col[serie[es_m] // M] = valores[es_m]
+                salida[f"p{q * 100:g}_{m}"] = acotar(col, *limites[m]) if m in limites else col
+        return salida
+
+    # ------------------------------
+    # PERSISTENCIA
+    # ------------------------------
+    def guardar(self, directorio: str = DIRECTORIO_CUBO) -> str:
+        os.makedirs(directorio, exist_ok=True)
+        guardar(self.celdas, os.path.join(directorio, "celdas.parquet"))
+        guardar(self.bocetos, os.path.join(directorio, "bocetos.parquet"))
+        with open(os.path.join(directorio, "cubo.json"), "w") as f:
+            json.dump({"medidas": self.medidas, "alfa": self.alfa, "dimensiones": list(DIMENSIONES)}, f, indent=2)
+        return directorio
+
+    @classmethod
+    def cargar(cls, directorio: str = DIRECTORIO_CUBO) -> "CuboKPI":
+        with open(os.path.join(directorio, "cubo.json")) as f:
+            meta = json.load(f)
+        return cls(cargar(os.path.join(directorio, "celdas.parquet")),
+                   cargar(os.path.join(directorio, "bocetos.parquet")), meta["medidas"], meta["alfa"])
+
+
+if __name__ == "__main__":
+    df = cargar(resolver_ruta(RUTA_ENTRADA))
+    cubo = CuboKPI.construir(df)
+    cubo.guardar(DIRECTORIO_CUBO)
+    print(f"Cubo guardado en {DIRECTORIO_CUBO}: {len(cubo.celdas)} celdas, {len(cubo.bocetos)} buckets")
+
+    print("\n=== TASA SÍ_CUMPLE Y TIEMPO TOTAL POR NIVEL DE ESTUDIOS ===\n")
+    print(cubo.consulta(por=["nivel_de_estudios"])[
+        ["nivel_de_estudios", "solicitudes", "tasa_si_cumple",
+         "media_tiempo_total_tramite_seg", "p50_tiempo_total_tramite_seg"]])
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Capa común de carga/guardado para los scripts del pipeline
+
+Formato de intercambio: Parquet (o Feather) con el esquema fijo de
+esquema.py (claves int32, estados categóricos, fechas datetime64 locales).
+Excel queda solo como exportación final (o como entrada heredada): al
+guardar en .xlsx las claves vuelven a texto S####/P####. Las hojas .xlsx
+leídas se guardan parseadas en una caché local (.cache_excel/, ver leer_excel);
+las que faltan se parsean en streaming con ingesta_excel.
+
+Uso:
+    from datos import cargar, cargar_tablas, guardar, resolver_ruta
+    df = cargar(resolver_ruta("merge_total.parquet"))  # o desde merge_total.xlsx
+    tablas = cargar_tablas("legaltech_pset_solicitudes.xlsx")
+    guardar(df, "merge_total.parquet")
+"""
+
+import hashlib
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+from instrumentacion import etapa
+from esquema import (ESQUEMA_VERSION, HOJAS, COLUMNAS_FECHA, CLAVES, CATEGORIAS,  # noqa: F401 (re-export)
+                     codigos_a_int, int_a_codigos, tipar, a_texto)
+
+FORMATOS = (".parquet", ".feather", ".xlsx", ".csv")
+
+# Filas por bloque en iterar_bloques
+TAM_BLOQUE_LECTURA = 1_000_000
+
+# Caché de hojas Excel ya parseadas (ver leer_excel)
+CACHE_DIR = os.environ.get("LEGALTECH_CACHE_DIR", ".cache_excel")
+CACHE_MAX_BYTES = int(os.environ.get("LEGALTECH_CACHE_MAX_BYTES", 1 << 30))  # 1 GiB
+
+
+# ==============================
+# CACHÉ DE EXCEL
+# ==============================
+@lru_cache(maxsize=256)
+def _hash_contenido(ruta_abs: str, tamano: int, mtime_ns: int) -> str:
+    """sha256 del archivo; memorizado por (ruta, tamaño, mtime) dentro del proceso."""
+    h = hashlib.sha256()
+    with open(ruta_abs, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+def clave_cache(ruta: str, hoja) -> str:
+    """Clave de la hoja: contenido del archivo + nombre de hoja + versión de esquema."""
+    ruta_abs = os.path.abspath(ruta)
+    st = os.stat(ruta_abs)
+    contenido = _hash_contenido(ruta_abs, st.st_size, st.st_mtime_ns)
+    return hashlib.sha256(f"{contenido}|{hoja}|v{ESQUEMA_VERSION}".encode("utf-8")).hexdigest()
+
+def _podar_cache(cache_dir: str, max_bytes: int):
+    """Borra las entradas menos usadas hasta quedar bajo max_bytes."""
+    entradas = []
+    for nombre in os.listdir(cache_dir):
+        if nombre.endswith(".parquet"):
+            st = os.stat(os.path.join(cache_dir, nombre))
+            entradas.append((st.st_mtime, st.st_size, nombre))
+    total = sum(e[1] for e in entradas)
+    for _, tamano, nombre in sorted(entradas):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, nombre))
+            total -= tamano
+        except FileNotFoundError:
+            pass
+
+def _ruta_cache(ruta: str, hoja, cache_dir: str) -> str:
+    return os.path.join(cache_dir, clave_cache(ruta, hoja) + ".parquet")
+
+def _leer_cache(sidecar: str, ruta: str, hoja):
+    """La hoja desde la caché (y se toca para el LRU); None si no está o no se puede leer."""
+    if not os.path.exists(sidecar):
+        return None
+    try:
+        with etapa("datos.cache_excel", ruta=str(ruta), hoja=str(hoja)) as m:
+            df = pd.read_parquet(sidecar)
+            m.filas = len(df)
+        os.utime(sidecar)
+        return df
+    except Exception:
+        return None  # entrada corrupta o incompleta: se vuelve a parsear
+
+def _escribir_cache(df: pd.DataFrame, sidecar: str, cache_dir: str, max_bytes: int):
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{sidecar}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, sidecar)
+    _podar_cache(cache_dir, max_bytes)
+
+def leer_excel(ruta: str, hoja=0, cache_dir: str = None, max_bytes: int = None) -> pd.DataFrame:
+    """
+    pd.read_excel + tipar con caché: la hoja parseada se guarda como Parquet
+    en cache_dir y, mientras el archivo no cambie, las siguientes lecturas
+    no pasan por openpyxl. cache_dir=False desactiva la caché.
+    Las entradas se tocan al usarse y se podan por tamaño (LRU).
+    """
+    if cache_dir is False:
+        with etapa("datos.read_excel", ruta=str(ruta), hoja=str(hoja)) as m:
+            df = tipar(pd.read_excel(ruta, sheet_name=hoja))
+            m.filas = len(df)
+        return df
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    sidecar = _ruta_cache(ruta, hoja, cache_dir)
+    df = _leer_cache(sidecar, ruta, hoja)
+    if df is not None:
+        return df
+
+    with etapa("datos.read_excel", ruta=str(ruta), hoja=str(hoja)) as m:
+        df = tipar(pd.read_excel(ruta, sheet_name=hoja))
+        m.filas = len(df)
+    _escribir_cache(df, sidecar, cache_dir, max_bytes)
+    return df
+
+def leer_hojas_excel(ruta: str, hojas, workers: int = 1, cache_dir: str = None,
+                     max_bytes: int = None) -> dict:
+    """
+    Varias hojas de un .xlsx con la misma caché que leer_excel. Las que
+    faltan se parsean juntas con ingesta_excel.leer_hojas: el libro se abre
+    una sola vez, en este proceso. workers > 1 (opcional) parsea una hoja
+    por proceso; quien lo pida debe correr bajo `if __name__ == "__main__"`.
+    """
+    from ingesta_excel import leer_hojas
+
+    hojas = list(hojas)
+    usar_cache = cache_dir is not False
+    cache_dir = CACHE_DIR if cache_dir in (None, False) else cache_dir
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    tablas, sidecars = {}, {}
+    for hoja in hojas:
+        if usar_cache:
+            sidecars[hoja] = _ruta_cache(ruta, hoja, cache_dir)
+            df = _leer_cache(sidecars[hoja], ruta, hoja)
+            if df is not None:
+                tablas[hoja] = df
+    faltan = [h for h in hojas if h not in tablas]
+    if faltan:
+        with etapa("datos.ingesta_excel", ruta=str(ruta), hojas=",".join(map(str, faltan))) as m:
+            leidas = leer_hojas(ruta, faltan, workers)
+            m.filas = sum(len(df) for df in leidas.values())
+        for hoja, df in leidas.items():
+            if usar_cache:
+                _escribir_cache(df, sidecars[hoja], cache_dir, max_bytes)
+            tablas[hoja] = df
+    return {h: tablas[h] for h in hojas}
+
+
+# ==============================
+# CARGA / GUARDADO
+# ==============================
+def _extension(ruta: str) -> str:
+    ext = os.path.splitext(str(ruta))[1].lower()
+    if ext not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {ruta} (use {', '.join(FORMATOS)})")
+    return ext
+
+def cargar(ruta: str, hoja: str = None) -> pd.DataFrame:
+    """
+    Carga una tabla tipada. hoja solo aplica a .xlsx (por defecto, la
+    primera); los .xlsx pasan por la caché de leer_excel. Parquet/Feather
+    ya vienen tipados; igual se pasa por tipar para aceptar archivos
+    escritos por otras herramientas.
+    """
+    ext = _extension(ruta)
+    if ext == ".xlsx":
+        return leer_excel(ruta, 0 if hoja is None else hoja)
+    with etapa("datos.cargar", ruta=str(ruta)) as m:
+        if ext == ".parquet":
+            df = pd.read_parquet(ruta)
+        elif ext == ".feather":
+            df = pd.read_feather(ruta)
+        else:
+            df = pd.read_csv(ruta)
+        df = tipar(df)
+        m.filas = len(df)
+    return df
+
+def iterar_bloques(ruta: str, columnas=None, filas: int = TAM_BLOQUE_LECTURA):
+    """
+    La tabla en bloques tipados de hasta `filas` filas, sin cargarla
+    entera: Parquet por lotes (iter_batches), csv con chunksize y xlsx en
+    streaming (ingesta_excel, primera hoja) salvo que ya esté en la caché.
+    Feather no se lee por partes: se carga y se corta.
+    """
+    ext = _extension(ruta)
+    if ext == ".xlsx" and not os.path.exists(_ruta_cache(ruta, 0, CACHE_DIR)):
+        from ingesta_excel import iterar_hoja
+        yield from iterar_hoja(ruta, 0, filas=filas, columnas=columnas)
+    elif ext == ".parquet":
+        import pyarrow.parquet as pq
+        for lote in pq.ParquetFile(ruta).iter_batches(batch_size=filas, columns=columnas):
+            yield tipar(lote.to_pandas())
+    elif ext == ".csv":
+        for df in pd.read_csv(ruta, chunksize=filas, usecols=columnas):
+            yield tipar(df)
+    else:
+        df = cargar(ruta)
+        if columnas is not None:
+            df = df[columnas]
+        for ini in range(0, len(df), filas):
+            yield df.iloc[ini:ini + filas]
+
+def cargar_tablas(origen: str, hojas=HOJAS, workers: int = 1) -> dict:
+    """
+    Las tablas del dataset por nombre de hoja. origen puede ser un .xlsx con
+    varias hojas (se abre una sola vez; con workers > 1, opcional, las hojas
+    se parsean en un pool de procesos) o una carpeta con <Hoja>.parquet/.feather/.csv (salida de
+    generador.py --formato parquet/csv).
+    """
+    if os.path.isdir(origen):
+        tablas = {}
+        for hoja in hojas:
+            for ext in (".parquet", ".feather", ".csv"):
+                ruta = os.path.join(origen, hoja + ext)
+                if os.path.exists(ruta):
+                    tablas[hoja] = cargar(ruta)
+                    break
+            else:
+                carpeta = os.path.join(origen, hoja)
+                if not os.path.isdir(carpeta):
+                    raise FileNotFoundError(f"No se encontró la tabla {hoja} en {origen}")
+                # csv particionado: <Hoja>/part-NNNNN.csv
+                partes = sorted(os.listdir(carpeta))
+                tablas[hoja] = tipar(pd.concat([pd.read_csv(os.path.join(carpeta, p)) for p in partes],
+                                               ignore_index=True))
+        return tablas
+    if _extension(origen) == ".xlsx":
+        return leer_hojas_excel(origen, hojas, workers)
+    # parquet/feather/csv guardan una sola tabla: cargar ignora la hoja
+    raise ValueError(f"{origen} contiene una sola tabla; use un .xlsx con las hojas "
+                     f"{', '.join(hojas)} o una carpeta con un archivo por hoja")
+
+def resolver_ruta(ruta: str, respaldo: str = None) -> str:
+    """
+    ruta si existe. Si falta y es .parquet/.feather, se arma una sola vez
+    desde respaldo (por defecto el .xlsx del mismo nombre, como los
+    merge_*.xlsx del repositorio) y se devuelve ruta; las corridas
+    siguientes ya leen el Parquet.
+    """
+    if os.path.exists(ruta):
+        return ruta
+    if respaldo is None:
+        respaldo = os.path.splitext(ruta)[0] + ".xlsx"
+    if _extension(ruta) in (".parquet", ".feather") and os.path.exists(respaldo):
+        with etapa("datos.resolver_ruta", ruta=str(ruta), respaldo=str(respaldo)):
+            guardar(cargar(respaldo), ruta)
+        return ruta
+    raise FileNotFoundError(f"No existe {ruta} ni {respaldo} para armarlo")
+
+def guardar(df: pd.DataFrame, ruta: str, hoja: str = "Sheet1") -> str:
+    """Guarda según la extensión. En .xlsx las claves y estados se exportan como texto."""
+    ext = _extension(ruta)
+    with etapa("datos.guardar", filas=len(df), ruta=str(ruta)):
+        if ext == ".parquet":
+            tipar(df).to_parquet(ruta, index=False)
+        elif ext == ".feather":
+            tipar(df).reset_index(drop=True).to_feather(ruta)
+        elif ext == ".csv":
+            a_texto(df).to_csv(ruta, index=False)
+        else:
+            a_texto(df).to_excel(ruta, sheet_name=hoja, index=False)
+    return ruta
+
+def _texto_diccionario(df: pd.DataFrame) -> pd.DataFrame:
+    """Categóricas sin categorías fijas (nombre, apellido) a texto: cada bloque trae su diccionario."""
+    cats = [c for c in df.columns
+            if isinstance(df[c].dtype, pd.CategoricalDtype) and c not in CATEGORIAS]
+    return df.assign(**{c: df[c].astype(str) for c in cats}) if cats else df
+
+def guardar_bloques(bloques, ruta: str, hoja: str = "Sheet1") -> int:
+    """
+    Como guardar, pero bloque a bloque: en .parquet un row group por bloque
+    (esquema del primero) y en .csv se agrega al archivo, así que la
+    memoria queda acotada por el bloque. .xlsx y .feather no se escriben
+    por partes: se juntan y se guardan al final. Devuelve las filas escritas.
+    """
+    ext = _extension(ruta)
+    filas, partes, escritor, juntos = 0, 0, None, []
+    with etapa("datos.guardar_bloques", ruta=str(ruta)) as m:
+        try:
+            for df in bloques:
+                if ext == ".parquet":
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                    tabla = pa.Table.from_pandas(_texto_diccionario(tipar(df)), preserve_index=False)
+                    if escritor is None:
+                        escritor = pq.ParquetWriter(ruta, tabla.schema)
+                    elif tabla.schema != escritor.schema:
+                        tabla = tabla.cast(escritor.schema)
+                    escritor.write_table(tabla)
+                elif ext == ".csv":
+                    a_texto(df).to_csv(ruta, mode="a" if partes else "w", header=not partes, index=False)
+                else:
+                    juntos.append(df)
+                filas += len(df)
+                partes += 1
+        finally:
+            if escritor is not None:
+                escritor.close()
+        if juntos:
+            guardar(pd.concat(juntos, ignore_index=True), ruta, hoja)
+        m.filas = filas
+    return filas
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Esquema tipado compartido por el generador y los scripts de análisis
+
+  - claves:  codigo_solicitud S#### / codigo_solicitante P#### como int32
+  - estados: categóricas con categorías fijas (códigos int8 por debajo)
+  - nombre/apellido: categóricas con diccionario libre
+  - fechas:  datetime64 sin tz, hora local de Lima. Los archivos previos
+             al esquema local traen las horas en UTC sin tz; tipar los
+             detecta (utc_heredado) y los pasa a hora de Lima al cargar
+El texto (S####, P####, "" para estados vacíos) solo vuelve en a_texto,
+al exportar a Excel/CSV.
+"""
+
+import numpy as np
+import pandas as pd
+
+from calendario import INICIO_JORNADA_SEG, JORNADA_SEG, TZ
+
+ESQUEMA_VERSION = 3
+
+HOJAS = ["Solicitantes", "SolicitudesRecibidas", "TramiteSolicitudes"]
+
+COLUMNAS_FECHA = [
+    "fecha_nacimiento",
+    "fecha_presentacion",
+    "fecha_evaluacion",
+    "fecha_registro",
+    "fecha_informacion",
+    "fecha_email",
+    "fecha_cierre_real",
+]
+# fechas con hora (eventos del trámite); fecha_nacimiento es solo fecha
+COLUMNAS_EVENTO = [c for c in COLUMNAS_FECHA if c != "fecha_nacimiento"]
+
+# columna clave -> prefijo del código
+CLAVES = {
+    "codigo_solicitud": "S",
+    "codigo_solicitante": "P",
+}
+
+# columna de estado -> categorías fijas (el vacío se guarda como nulo)
+CATEGORIAS = {
+    "estado": ["evaluado", "pendiente"],
+    "resultado_evaluacion": ["sí_cumple", "no_cumple"],
+    "estado_registro": ["registrado", "pendiente"],
+    "estado_informacion": ["recibida", "pendiente"],
+    "estado_email": ["enviado", "pendiente"],
+    "sexo": ["masculino", "femenino", "no_indico"],
+    "nivel_de_estudios": ["sin_estudios", "primaria", "secundaria", "universitaria", "post-grado"],
+    "ocupacion": ["estudiante", "trabajador", "sin_empleo", "jubilado"],
+    "estado_cierre": ["cerrado_en_evaluacion", "cerrado_en_email", "pendiente_al_corte"],
+}
+
+# texto repetitivo: categórica sin categorías fijas
+COLUMNAS_DICCIONARIO = ["nombre", "apellido"]
+
+
+def codigos_a_int(serie: pd.Series) -> pd.Series:
+    """
+    S0001 / P0001 -> 1 (int32; Int32 si hay nulos). Idempotente. Una
+    columna ya numérica (p. ej. float por tener vacíos) se castea directo;
+    con valores no enteros es un error.
+    """
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        return serie.astype("Int32" if serie.hasnans else np.int32)
+    if pd.api.types.is_float_dtype(serie.dtype):
+        valores = serie.dropna()
+        if not (np.isfinite(valores) & (valores == np.floor(valores))).all():
+            raise ValueError(f"Columna {serie.name}: códigos numéricos no enteros")
+        return serie.astype("Int32" if serie.hasnans else np.int32)
+    num = pd.to_numeric(serie.astype("string").str.slice(1), errors="coerce")
+    if num.isna().any():
+        return num.astype("Int32")
+    return num.astype(np.int32)
+
+def int_a_codigos(serie: pd.Series, prefijo: str) -> pd.Series:
+    """1 -> S0001 (al menos 4 dígitos). Nulos quedan nulos."""
+    if not pd.api.types.is_integer_dtype(serie.dtype):
+        return serie
+    out = pd.Series(pd.NA, index=serie.index, dtype=object)
+    ok = serie.notna()
+    out[ok] = [f"{prefijo}{i:04d}" for i in serie[ok].astype(np.int64).tolist()]
+    return out
+
+def _fecha_local(serie: pd.Series) -> pd.Series:
+    """datetime64 sin tz en hora de Lima (las fechas con tz se convierten, no se truncan)."""
+    if isinstance(serie.dtype, pd.DatetimeTZDtype):
+        return serie.dt.tz_convert(TZ).dt.tz_localize(None)
+    if pd.api.types.is_datetime64_dtype(serie.dtype):
+        return serie  # ya tipada: to_datetime volvería a recorrerla
+    return pd.to_datetime(serie, errors="coerce")
+
+def _segundos_del_dia(serie: pd.Series) -> np.ndarray:
+    """Segundo del día de cada fecha no nula (en la unidad propia de la columna, sin convertirla)."""
+    v = serie.to_numpy()
+    por_segundo = np.timedelta64(1, "s") // np.timedelta64(1, np.datetime_data(v.dtype)[0])
+    v = v.view(np.int64)
+    return v[v != np.iinfo(np.int64).min] // por_segundo % 86_400
+
+def utc_heredado(df: pd.DataFrame) -> bool:
+    """
+    ¿Fechas de evento sin tz pero en UTC (archivos anteriores al esquema
+    local)? Los eventos ocurren en la jornada 08:30–17:30 de Lima (UTC-5):
+    en UTC ninguna hora cae antes de las 13:30 y parte pasa de las 17:30,
+    lo que en hora local es imposible. Ya convertidas, las horas vuelven a
+    empezar a las 08:30, así que tipar no convierte dos veces.
+    """
+    segundos = [_segundos_del_dia(df[c]) for c in COLUMNAS_EVENTO
+                if c in df.columns and pd.api.types.is_datetime64_dtype(df[c].dtype)]
+    segundos = [s for s in segundos if len(s)]
+    if not segundos:
+        return False
+    desfase = 5 * 3600  # America/Lima no tiene horario de verano
+    minimo = min(int(s.min()) for s in segundos)
+    maximo = max(int(s.max()) for s in segundos)
+    return minimo >= INICIO_JORNADA_SEG + desfase and maximo > INICIO_JORNADA_SEG + JORNADA_SEG
+
+def _utc_a_local(serie: pd.Series) -> pd.Series:
+    return serie.dt.tz_localize("UTC").dt.tz_convert(TZ).dt.tz_localize(None)
+
+def _categorica(serie: pd.Series, fijas) -> pd.Series:
+    """Categórica con las categorías fijas (más cualquier valor no previsto, al final). Vacío -> nulo."""
+    valores = serie.astype(object).where(serie.notna() & (serie.astype(object) != ""), None)
+    extra = sorted(set(valores.dropna().unique()) - set(fijas))
+    return pd.Series(pd.Categorical(valores, categories=list(fijas) + extra), index=serie.index)
+
+def categorica(valores, col: str) -> pd.Categorical:
+    """Códigos enteros (-1 = vacío) -> categórica con las categorías fijas de col."""
+    return pd.Categorical.from_codes(np.asarray(valores, dtype=np.int8), categories=CATEGORIAS[col])
+
+def tipar(df: pd.DataFrame, utc: bool = None) -> pd.DataFrame:
+    """
+    Aplica el esquema fijo a las columnas conocidas; el resto queda igual.
+    utc: las fechas de evento sin tz vienen en UTC (se pasan a hora de
+    Lima). None lo detecta con utc_heredado; quien tipa por bloques decide
+    con el primero y lo fija para los demás.
+    """
+    out = df.copy()
+    for col in out.columns:
+        if col in COLUMNAS_FECHA:
+            out[col] = _fecha_local(out[col])
+        elif col in CLAVES:
+            out[col] = codigos_a_int(out[col])
+        elif col in CATEGORIAS:
+            if not (isinstance(out[col].dtype, pd.CategoricalDtype)
+                    and list(out[col].cat.categories[:len(CATEGORIAS[col])]) == CATEGORIAS[col]):
+                out[col] = _categorica(out[col], CATEGORIAS[col])
+        elif col in COLUMNAS_DICCIONARIO and not isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype("category")
+    if utc is None:
+        utc = utc_heredado(out)
+    if utc:
+        for col in COLUMNAS_EVENTO:
+            if col in out.columns and pd.api.types.is_datetime64_dtype(out[col].dtype):
+                out[col] = _utc_a_local(out[col])
+    return out
+
+def a_texto(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Inversa de tipar para exportar: claves a S####/P####, categóricas a
+    texto y fechas sin hora (fecha_nacimiento) como date, para que Excel
+    las escriba con formato de fecha y no con un 00:00.
+    """
+    out = df.copy()
+    for col in out.columns:
+        if col in COLUMNAS_FECHA and col not in COLUMNAS_EVENTO:
+            fechas = _fecha_local(out[col])
+            out[col] = fechas.dt.date.astype(object).where(fechas.notna(), None)
+        elif col in CLAVES:
+            out[col] = int_a_codigos(out[col], CLAVES[col])
+        elif isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(object).where(out[col].notna(), "")
+        elif isinstance(out[col].dtype, pd.DatetimeTZDtype):
+            out[col] = _fecha_local(out[col])
+    return out
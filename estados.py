@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Clasificador vectorizado del estado de proceso de cada solicitud
+
+Cascada (primera condición que se cumple):
+  1. estado == "pendiente"                   -> "pendiente de evaluación"
+  2. resultado_evaluacion == "no_cumple"     -> "rechazado"
+  3. estado_registro == "pendiente"          -> "en proceso en registro"
+  4. estado_informacion == "pendiente"       -> "en proceso en información"
+  5. estado_email == "pendiente"             -> "en proceso en email"
+  6. en otro caso                            -> "finalizado"
+
+Las reglas 1–2 solo aplican si la tabla trae las columnas de
+SolicitudesRecibidas (p. ej. merge_total); sobre TramiteSolicitudes sola
+equivale a prueba.calcular_estado_total. Todo se evalúa con un único
+np.select sobre los códigos de las categóricas, sin objetos por fila.
+"""
+
+import numpy as np
+import pandas as pd
+
+ESTADOS_PROCESO = [
+    "pendiente de evaluación",
+    "rechazado",
+    "en proceso en registro",
+    "en proceso en información",
+    "en proceso en email",
+    "finalizado",
+]
+
+# (columna, valor) -> estado, en orden de prioridad
+REGLAS = [
+    ("estado", "pendiente", "pendiente de evaluación"),
+    ("resultado_evaluacion", "no_cumple", "rechazado"),
+    ("estado_registro", "pendiente", "en proceso en registro"),
+    ("estado_informacion", "pendiente", "en proceso en información"),
+    ("estado_email", "pendiente", "en proceso en email"),
+]
+
+
+def es_valor(serie: pd.Series, valor: str) -> np.ndarray:
+    """serie == valor como arreglo bool; en categóricas compara códigos enteros."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        cats = serie.cat.categories
+        if valor not in cats:
+            return np.zeros(len(serie), dtype=bool)
+        return serie.cat.codes.to_numpy() == cats.get_loc(valor)
+    return (serie == valor).to_numpy(dtype=bool, na_value=False)
+
+
+def clasificar_estado(df: pd.DataFrame) -> pd.Categorical:
+    """Estado de proceso por fila como categórica (categorías ESTADOS_PROCESO)."""
+    condiciones, codigos = [], []
+    for col, valor, estado in REGLAS:
+        if col in df.columns:
+            condiciones.append(es_valor(df[col], valor))
+            codigos.append(ESTADOS_PROCESO.index(estado))
+    resultado = np.select(condiciones, codigos, default=ESTADOS_PROCESO.index("finalizado"))
+    return pd.Categorical.from_codes(resultado.astype(np.int8), categories=ESTADOS_PROCESO)
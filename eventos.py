@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Log de eventos para minería de procesos y grafo de seguimiento directo
+
+Convierte SolicitudesRecibidas + TramiteSolicitudes (fechas en columnas
+anchas) en un log largo caso / actividad / timestamp, con la actividad
+como código entero (categórica ACTIVIDADES). Sobre el log:
+  - grafo_directo: arcos a -> b (b sigue directamente a a en el mismo
+    caso) con frecuencia y tiempo de transición medio y percentiles,
+    incluyendo los nodos inicio y fin; en_modelo marca los arcos del
+    flujo del README (Recibir -> Evaluar -> Rechazar / Registrar ->
+    Recabar -> Email)
+  - variantes: secuencias de actividades distintas y cuántos casos siguen
+    cada una, agrupadas por un hash de la secuencia
+
+Todo es por arreglos: el log se ordena una sola vez (cada fila tiene a lo
+sumo 6 eventos, así que ordenar dentro del caso es lineal) y el grafo y
+las variantes salen de comparar cada evento con el siguiente.
+
+Rechazar no tiene fecha propia: ocurre con la evaluación no_cumple y se
+fecha igual (va después de evaluar por el orden de ACTIVIDADES). El email
+de rechazo del README no se registra en los datos.
+
+Uso:
+    log = log_eventos(tablas["SolicitudesRecibidas"], tablas["TramiteSolicitudes"])
+    print(grafo_directo(log)); print(variantes(log).head())
+"""
+
+import numpy as np
+import pandas as pd
+
+from combinador import buscar_posiciones
+from datos import cargar_tablas, guardar
+from instrumentacion import etapa
+
+RUTA_ENTRADA = "legaltech_pset_solicitudes.xlsx"
+RUTA_SALIDA = "log_eventos.parquet"
+
+# actividad -> columna con su fecha (el orden desempata eventos simultáneos)
+ACTIVIDADES = {
+    "recibir": "fecha_presentacion",
+    "evaluar": "fecha_evaluacion",
+    "rechazar": "fecha_evaluacion",
+    "registrar": "fecha_registro",
+    "recabar_informacion": "fecha_informacion",
+    "enviar_email": "fecha_email",
+}
+NOMBRES = list(ACTIVIDADES)
+NODOS = NOMBRES + ["inicio", "fin"]
+_RECHAZAR = NOMBRES.index("rechazar")
+_INICIO, _FIN = NODOS.index("inicio"), NODOS.index("fin")
+
+# Arcos del flujo levantado en el README (sin el email de rechazo, que no se registra)
+MODELO = {
+    ("inicio", "recibir"), ("recibir", "evaluar"),
+    ("evaluar", "rechazar"), ("rechazar", "fin"),
+    ("evaluar", "registrar"), ("registrar", "recabar_informacion"),
+    ("recabar_informacion", "enviar_email"), ("enviar_email", "fin"),
+}
+
+PERCENTILES = (50, 90)
+
+_INF = np.iinfo(np.int64).max
+_NAT = np.iinfo(np.int64).min
+
+
+# ==============================
+# LOG DE EVENTOS
+# ==============================
+def _fecha_ns(valores) -> np.ndarray:
+    v = np.asarray(valores, dtype="datetime64[ns]").view(np.int64)
+    return np.where(v == _NAT, _INF, v)
+
+def log_eventos(solicitudes: pd.DataFrame, tramite: pd.DataFrame) -> pd.DataFrame:
+    """
+    Log largo ordenado por (caso, timestamp, actividad): caso =
+    codigo_solicitud (int32), actividad categórica (códigos int8 en el
+    orden de ACTIVIDADES), timestamp datetime64 local.
+    """
+    n = len(solicitudes)
+    with etapa("eventos.log_eventos", filas=n) as m:
+        pos = buscar_posiciones(tramite["codigo_solicitud"], solicitudes["codigo_solicitud"])
+        con_tramite = pos >= 0
+
+        # matriz caso x actividad (INF = no ocurrió); el trámite se toma por posición
+        E = np.full((n, len(NOMBRES)), _INF, dtype=np.int64)
+        for j, col in enumerate(ACTIVIDADES.values()):
+            if col in solicitudes.columns:
+                E[:, j] = _fecha_ns(solicitudes[col])
+            elif col in tramite.columns and len(tramite):
+                E[:, j] = np.where(con_tramite, _fecha_ns(tramite[col])[np.maximum(pos, 0)], _INF)
+        no_cumple = (solicitudes["resultado_evaluacion"] == "no_cumple").to_numpy(dtype=bool, na_value=False)
+        E[~no_cumple, _RECHAZAR] = _INF
+
+        casos = solicitudes["codigo_solicitud"].to_numpy()
+        if not (np.diff(casos) > 0).all():  # el generador ya los da en orden
+            orden_casos = np.argsort(casos, kind="stable")
+            E, casos = E[orden_casos], casos[orden_casos]
+
+        # orden dentro de cada caso: 6 columnas, estable -> empata por actividad
+        orden = np.argsort(E, axis=1, kind="stable")
+        E = np.take_along_axis(E, orden, axis=1)
+        ocurrio = E != _INF
+        log = pd.DataFrame({
+            "caso": np.repeat(casos, ocurrio.sum(axis=1)),
+            "actividad": pd.Categorical.from_codes(orden[ocurrio].astype(np.int8), categories=NOMBRES),
+            "timestamp": E[ocurrio].view("datetime64[ns]"),
+        })
+        m.filas = len(log)
+    return log
+
+
+def _limites_casos(caso: np.ndarray):
+    """Máscaras de primer y último evento de cada caso (log ordenado por caso)."""
+    cambia = caso[1:] != caso[:-1]
+    return np.concatenate([[True], cambia]), np.concatenate([cambia, [True]])
+
+
+# ==============================
+# GRAFO DE SEGUIMIENTO DIRECTO
+# ==============================
+def grafo_directo(log: pd.DataFrame, percentiles=PERCENTILES) -> pd.DataFrame:
+    """
+    Un arco por par (origen, destino) observado: frecuencia y tiempo de
+    transición en segundos (media y percentiles; NaN en los arcos desde
+    inicio y hacia fin). Los percentiles son exactos: los tiempos se
+    agrupan por arco con un orden estable de enteros chicos (radix) y cada
+    grupo usa np.percentile (selección, lineal).
+    """
+    with etapa("eventos.grafo_directo", filas=len(log)):
+        caso = log["caso"].to_numpy()
+        act = log["actividad"].cat.codes.to_numpy().astype(np.int64)
+        ts = log["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        N = len(NODOS)
+        primero, ultimo = _limites_casos(caso) if len(caso) else (np.zeros(0, bool), np.zeros(0, bool))
+
+        # transiciones dentro del caso: evento i -> i+1 cuando i no es el último
+        i = np.flatnonzero(~ultimo[:-1])
+        arco_int = act[i] * N + act[i + 1]
+        dt = (ts[i + 1] - ts[i]) / 1e9
+        arcos = np.concatenate([arco_int, _INICIO * N + act[primero], act[ultimo] * N + _FIN])
+
+        frecuencia = np.bincount(arcos, minlength=N * N)
+        n_int = np.bincount(arco_int, minlength=N * N)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media = np.bincount(arco_int, weights=dt, minlength=N * N) / n_int
+
+        pct = np.full((N * N, len(percentiles)), np.nan)
+        orden = np.argsort(arco_int.astype(np.int16), kind="stable")
+        dt_orden = dt[orden]
+        limites = np.concatenate([[0], np.cumsum(n_int)])
+        for a in np.flatnonzero(n_int):
+            pct[a] = np.percentile(dt_orden[limites[a]:limites[a + 1]], percentiles)
+
+        obs = np.flatnonzero(frecuencia)
+        grafo = pd.DataFrame({
+            "origen": pd.Categorical.from_codes(obs // N, categories=NODOS),
+            "destino": pd.Categorical.from_codes(obs % N, categories=NODOS),
+            "frecuencia": frecuencia[obs],
+            "media_seg": media[obs],
+        })
+        for k, p in enumerate(percentiles):
+            grafo[f"p{p:g}_seg"] = pct[obs, k]
+        grafo["en_modelo"] = [(o, d) in MODELO for o, d in zip(grafo["origen"], grafo["destino"])]
+    return grafo.sort_values("frecuencia", ascending=False, ignore_index=True)
+
+
+# ==============================
+# VARIANTES
+# ==============================
+def hash_trazas(log: pd.DataFrame):
+    """
+    (casos, hash uint64 de la secuencia de actividades de cada caso,
+    posición del primer evento). El hash es la secuencia en base
+    len(ACTIVIDADES)+1: inyectivo para trazas de hasta 22 eventos y un
+    hash polinomial (mod 2^64) para las más largas.
+    """
+    caso = log["caso"].to_numpy()
+    act = log["actividad"].cat.codes.to_numpy().astype(np.uint64)
+    if len(caso) == 0:
+        return caso, np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+    primero, _ = _limites_casos(caso)
+    inicio = np.flatnonzero(primero)
+    largo = np.diff(np.append(inicio, len(caso)))
+    # evento en la posición k de una traza de largo L aporta (a+1)·base^(L-1-k)
+    potencias = np.uint64(len(NOMBRES) + 1) ** np.arange(int(largo.max()), dtype=np.uint64)
+    exponente = np.repeat(inicio + largo - 1, largo) - np.arange(len(caso))
+    h = np.add.reduceat((act + np.uint64(1)) * potencias[exponente], inicio)
+    return caso[inicio], h, inicio
+
+def variantes(log: pd.DataFrame) -> pd.DataFrame:
+    """Variantes de traza: hash, secuencia legible, casos y proporción (de mayor a menor)."""
+    with etapa("eventos.variantes", filas=len(log)):
+        _, h, inicio = hash_trazas(log)
+        codigos, unicos = pd.factorize(h)
+        casos = np.bincount(codigos, minlength=len(unicos))
+        # primer caso de cada variante, para leer su secuencia
+        primero = np.empty(len(unicos), dtype=np.int64)
+        primero[codigos[::-1]] = np.arange(len(codigos) - 1, -1, -1)
+        act = log["actividad"].cat.codes.to_numpy()
+        fin = np.append(inicio[1:], len(log))
+        secuencias = [" → ".join(NOMBRES[a] for a in act[inicio[i]:fin[i]]) for i in primero]
+        res = pd.DataFrame({
+            "variante": np.asarray(unicos, dtype=np.uint64),
+            "secuencia": secuencias,
+            "casos": casos,
+            "proporcion": casos / max(len(h), 1),
+        })
+    return res.sort_values("casos", ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    tablas = cargar_tablas(RUTA_ENTRADA)
+    log = log_eventos(tablas["SolicitudesRecibidas"], tablas["TramiteSolicitudes"])
+    guardar(log, RUTA_SALIDA)
+    print(f"Log de eventos: {len(log)} eventos de {log['caso'].nunique()} casos -> {RUTA_SALIDA}")
+
+    with pd.option_context("display.width", 200, "display.max_colwidth", 120):
+        print("\n=== GRAFO DE SEGUIMIENTO DIRECTO ===\n")
+        print(grafo_directo(log).to_string(index=False))
+        print("\n=== VARIANTES MÁS FRECUENTES ===\n")
+        print(variantes(log).head(10).to_string(index=False))
@@ -13,45 +13,57 @@ Reglas clave:
 - Jornada: 08:30–17:30, con ligera campana centrada ~11:00
 - Feriados fijos (Perú) excluidos
 - Meses pico (2) aleatorios
-- Última semana de diciembre (desde 25/12): solicitudes quedan "pendiente"
+- Rango de fechas configurable (por defecto, el año anterior completo);
+  feriados de cada año del rango
+- Última semana del rango (desde 25/12 si termina el 31/12): solicitudes quedan "pendiente"
 - Gaps:
    * fecha_evaluacion = presentacion + [1..3] días hábiles
    * fecha_registro   = presentacion + [1..5] días hábiles
    * fecha_informacion= registro    + [3..10] días hábiles
    * fecha_email      = informacion + [7..15] días hábiles
+   * los gaps pueden cruzar al año siguiente (calendario.BusinessCalendar)
 - Porcentajes objetivo (respetados en lo posible sin violar calendario):
    * evaluado: 75%–90% del total
    * registrado: 90%–95% de sí_cumple
    * info recibida: 70%–90% de registrados
    * email enviado: 75%–90% de info recibida
 - Cobertura: todo solicitante aparece al menos una vez en SolicitudesRecibidas
-- Códigos: P####, S#### (4 dígitos)
+- Códigos: P####, S#### (4 dígitos); en memoria y en Parquet son int32
+  (ver esquema.py) y vuelven a texto solo al exportar a Excel/CSV
 
-Salida: legaltech_pset_solicitudes.xlsx
-Requiere: pandas, numpy, pytz, xlsxwriter
+Salida: legaltech_pset_solicitudes.xlsx (o CSV/Parquet, ver --formato; estos
+se escriben bloque a bloque sin juntar el dataset en memoria)
+Requiere: pandas, numpy, pytz, xlsxwriter (pyarrow para Parquet)
 
-SEED=42 para reproducibilidad.
+SEED=42 para reproducibilidad (--seed para otro valor).
+
+Uso:
+  python generador.py
+  python generador.py --solicitantes 50000 --solicitudes 200000 \
+      --desde 2022-01-01 --hasta 2024-12-31 --seed 7 --formato parquet --salida dataset_200k
+  python generador.py --solicitudes 50000000 --workers 8 --formato parquet --salida dataset_50m
 """
 
+import argparse
+import os
 import pandas as pd
 import numpy as np
-import random
-from datetime import datetime, date, timedelta, time
-import pytz
-from collections import Counter
+from datetime import datetime, date, timedelta
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from pandas.api.types import union_categoricals
+
+from calendario import TZ, BUSINESS_START, BUSINESS_END, get_calendar
+from esquema import CATEGORIAS, categorica, codigos_a_int, a_texto
+from instrumentacion import etapa
 
 # ==============================
 # CONFIGURACIÓN GENERAL
 # ==============================
 SEED = 42
-random.seed(SEED)
-np.random.seed(SEED)
 
-TZ = pytz.timezone("America/Lima")
 OUTPUT_PATH = "legaltech_pset_solicitudes.xlsx"
-
-BUSINESS_START = time(8,30)
-BUSINESS_END   = time(17,30)
+EXCEL_MAX_ROWS = 1_048_575  # filas de datos por hoja (sin encabezado)
 
 # ==============================
 # UTILIDADES DE FECHAS
@@ -59,88 +71,85 @@ BUSINESS_END   = time(17,30)
 def previous_year() -> int:
     return datetime.now(TZ).date().year - 1
 
-def fixed_holidays_peru(year:int):
+def default_span():
+    """Rango por defecto: el año anterior completo."""
+    y = previous_year()
+    return date(y,1,1), date(y,12,31)
+
+def random_business_seconds(n:int, rng=None) -> np.ndarray:
     """
-    Feriados fijos de Perú. Tuplas (día, mes).
-    Parche aplicado: crear date(year, month, day) en el orden correcto.
+    n horas del día como segundos desde medianoche (int64), 08:30–17:30 con
+    campana centrada ~11:00 (sd ~1.5h). Campana truncada por rechazo en bloque:
+    se sortea de más y se descartan las colas, sin bucle por valor.
     """
-    base = [
-        (1, 1),   # Año Nuevo
-        (1, 5),   # Día del Trabajo
-        (29, 6),  # San Pedro y San Pablo
-        (28, 7),  # Independencia
-        (29, 7),  # Fiestas Patrias
-        (30, 8),  # Santa Rosa de Lima
-        (8, 10),  # Combate de Angamos
-        (1, 11),  # Todos los Santos
-        (8, 12),  # Inmaculada Concepción
-        (25, 12)  # Navidad
-    ]
-    return {date(year, month, day) for (day, month) in base}
-
-def business_days_of_year(year:int):
-    start = date(year,1,1)
-    end   = date(year,12,31)
-    holidays = fixed_holidays_peru(year)
-    days = []
-    d = start
-    while d <= end:
-        if d.weekday() < 5 and d not in holidays:
-            days.append(d)
-        d += timedelta(days=1)
-    return days
-
-def business_days_after(base_date:date, year:int):
-    """Días hábiles estrictamente posteriores a base_date dentro del año."""
-    return [d for d in business_days_of_year(year) if d > base_date]
-
-def random_business_time_campana() -> time:
-    """Hora 08:30–17:30 con campana centrada ~11:00 (sd ~1.5h), siempre dentro del rango."""
+    rng = np.random if rng is None else rng
     start_seconds = BUSINESS_START.hour*3600 + BUSINESS_START.minute*60
     end_seconds   = BUSINESS_END.hour*3600   + BUSINESS_END.minute*60
     mu = 11*3600
     sigma = int(1.5 * 3600)
-    for _ in range(1000):
-        s = int(np.random.normal(mu, sigma))
-        if start_seconds <= s <= end_seconds:
-            h = s//3600; m=(s%3600)//60; st=s%60
-            return time(h,m,st)
-    # fallback uniforme si la campana falla
-    s = random.randint(start_seconds, end_seconds)
-    h = s//3600; m=(s%3600)//60; st=s%60
-    return time(h,m,st)
-
-def combine_local(d:date, t:time):
-    return TZ.localize(datetime(d.year,d.month,d.day,t.hour,t.minute,t.second))
-
-def pick_business_dt_within_gap(base_dt:datetime, min_days:int, max_days:int):
+    out = np.empty(n, dtype=np.int64)
+    llenos = 0
+    while llenos < n:
+        faltan = n - llenos
+        s = rng.normal(mu, sigma, size=int(faltan*1.1) + 16).astype(np.int64)
+        s = s[(s >= start_seconds) & (s <= end_seconds)][:faltan]
+        out[llenos:llenos+len(s)] = s
+        llenos += len(s)
+    return out
+
+def local_datetimes(days, segundos) -> pd.DatetimeIndex:
+    """Días (datetime64[D]) + segundos del día -> DatetimeIndex America/Lima (NaT se conserva)."""
+    naive = np.asarray(days, dtype="datetime64[D]").astype("datetime64[s]") + np.asarray(segundos).astype("timedelta64[s]")
+    return pd.DatetimeIndex(naive).tz_localize(TZ)
+
+def pick_business_dts_within_gap(base, min_days:int, max_days:int, rng=None) -> pd.DatetimeIndex:
     """
-    Devuelve datetime hábil posterior respetando el gap [min..max] días hábiles.
-    Si no hay suficientes días hábiles disponibles dentro del año, devuelve None.
+    Datetime hábil posterior a cada base (arreglo de datetimes con tz)
+    respetando el gap [min..max] días hábiles: gaps sorteados como arreglo y
+    resueltos por ordinal en el calendario hábil, que cubre también el año
+    siguiente (los gaps que cruzan a enero no se pierden). NaT donde la base
+    es NaT o no hay min_days hábiles.
     """
-    y = base_dt.astimezone(TZ).date().year
-    base_date = base_dt.astimezone(TZ).date()
-    after = business_days_after(base_date, y)
-    if not after or len(after) < min_days:
-        return None
-    hi = min(max_days, len(after))
-    gap = random.randint(min_days, hi)
-    target_date = after[gap-1]  # gap=1 -> primer hábil posterior
-    return combine_local(target_date, random_business_time_campana())
-
-def strip_tz(df: pd.DataFrame) -> pd.DataFrame:
-    """Quita tz para exportar a Excel sin que pandas/xlsxwriter se queje."""
-    from pandas.api.types import is_datetime64_any_dtype
-    out = df.copy()
-    for col in out.columns:
-        if is_datetime64_any_dtype(out[col]):
-            try:
-                if getattr(out[col].dtype, "tz", None) is not None:
-                    out[col] = out[col].dt.tz_convert(None)
-                out[col] = out[col].dt.tz_localize(None)
-            except Exception:
-                out[col] = pd.to_datetime(out[col], errors="coerce").dt.tz_localize(None)
-    return out
+    rng = np.random if rng is None else rng
+    base_local = pd.DatetimeIndex(base).tz_convert(TZ).tz_localize(None)
+    n = len(base_local)
+    if n == 0:
+        return pd.DatetimeIndex([], dtype=f"datetime64[s, {TZ.zone}]")
+    base_days = base_local.values.astype("datetime64[D]")
+    years = base_local.year[base_local.notna()]
+    if len(years) == 0:
+        return pd.DatetimeIndex(np.full(n, np.datetime64("NaT", "s"))).tz_localize(TZ)
+    cal = get_calendar(int(years.min()), int(years.max()) + 1)
+
+    disponibles = cal.available_after(base_days)
+    viable = ~np.isnat(base_days) & (disponibles >= min_days)
+    hi = np.minimum(max_days, disponibles)
+    gap = min_days + np.floor(rng.random(n) * np.maximum(hi - min_days + 1, 1)).astype(np.int64)
+    target = cal.nth_after(base_days, gap)  # gap=1 -> primer hábil posterior
+    target[~viable] = np.datetime64("NaT", "D")
+    return local_datetimes(target, random_business_seconds(n, rng))
+
+def choose_mask(viable, p_obj:float, total:int, rng=None) -> np.ndarray:
+    """Marca round(p_obj*total) posiciones al azar entre las viables (o todas las viables si son menos)."""
+    rng = np.random if rng is None else rng
+    viable = np.asarray(viable, dtype=bool)
+    candidatos = np.flatnonzero(viable)
+    k = min(int(round(p_obj*total)), len(candidatos))
+    mask = np.zeros(len(viable), dtype=bool)
+    if k > 0:
+        mask[rng.choice(candidatos, size=k, replace=False)] = True
+    return mask
+
+def span_business_days(desde:date = None, hasta:date = None):
+    """Valida el rango (por defecto, año anterior) y devuelve (desde, hasta, días hábiles)."""
+    if desde is None or hasta is None:
+        desde, hasta = default_span()
+    if hasta < desde:
+        raise ValueError(f"Rango de fechas inválido: {desde} > {hasta}")
+    dias = get_calendar(desde.year, hasta.year + 1).days_between(desde, hasta)
+    if len(dias) == 0:
+        raise ValueError(f"No hay días hábiles entre {desde} y {hasta}")
+    return desde, hasta, dias
 
 # ==============================
 # LISTAS EMBEBIDAS (nombres/apellidos)
@@ -188,312 +197,598 @@ apellidos = [
 # ==============================
 # GENERADOR DE SOLICITANTES
 # ==============================
-def generar_solicitantes():
-    n = random.randint(4000, 8000)
-    codigos = [f"P{str(i).zfill(4)}" for i in range(1, n+1)]
-    sexos = np.random.choice(["masculino","femenino","no_indico"], size=n, p=[0.49,0.49,0.02])
-
-    hoy = datetime.now(TZ).date()
-    min_birth = date(hoy.year-70, hoy.month, hoy.day)
-    max_birth = date(hoy.year-18, hoy.month, hoy.day)
+SEXOS = CATEGORIAS["sexo"]
+NIVELES_ESTUDIOS = CATEGORIAS["nivel_de_estudios"]
+OCUPACIONES = CATEGORIAS["ocupacion"]
+
+# vocabulario único de nombres y fuentes por sexo como índices sobre él
+VOCAB_NOMBRES = nombres_m + nombres_f + nombres_neutros
+_IDX_M = np.arange(len(nombres_m))
+_IDX_F = len(nombres_m) + np.arange(len(nombres_f))
+_IDX_N = len(nombres_m) + len(nombres_f) + np.arange(len(nombres_neutros))
+FUENTES_NOMBRE = {
+    "masculino": np.concatenate([_IDX_M, _IDX_N]),
+    "femenino":  np.concatenate([_IDX_F, _IDX_N]),
+    "no_indico": np.concatenate([_IDX_N, _IDX_M[:30], _IDX_F[:30]]),
+}
+
+def distinct_pairs(n:int, size:int, rng=None):
+    """n pares de índices distintos en [0, size): el segundo sale de size-1 opciones y se desplaza."""
+    rng = np.random if rng is None else rng
+    a = rng.choice(size, size=n)
+    b = rng.choice(size - 1, size=n)
+    return a, b + (b >= a)
+
+def encode_pairs(a, b, vocab, sep=" ") -> pd.Categorical:
+    """
+    Codifica pares (a, b) de índices sobre vocab como categórica "a b";
+    b = -1 significa palabra única. El texto se arma solo para las
+    combinaciones distintas, no por fila.
+    """
+    claves = np.asarray(a, dtype=np.int64) * (len(vocab) + 1) + (np.asarray(b, dtype=np.int64) + 1)
+    unicas, codigos = np.unique(claves, return_inverse=True)
+    ua, ub = unicas // (len(vocab) + 1), unicas % (len(vocab) + 1) - 1
+    categorias = [vocab[x] if y < 0 else f"{vocab[x]}{sep}{vocab[y]}" for x, y in zip(ua, ub)]
+    # dos pares distintos pueden dar el mismo texto; se deduplica sobre las categorías
+    cat_unicas, remap = np.unique(np.array(categorias, dtype=object), return_inverse=True)
+    return pd.Categorical.from_codes(remap[codigos], categories=cat_unicas)
+
+def choice_by_group(n:int, grupos, rng=None) -> np.ndarray:
+    """
+    grupos: lista de (mask, códigos, probs). Sortea un código por fila con
+    una llamada a choice por grupo. Filas sin grupo quedan en -1.
+    """
+    rng = np.random if rng is None else rng
+    out = np.full(n, -1, dtype=np.int8)
+    for mask, codigos, probs in grupos:
+        m = int(np.count_nonzero(mask))
+        if m:
+            p = np.asarray(probs, dtype=float)
+            out[mask] = rng.choice(np.asarray(codigos, dtype=np.int8), size=m, p=p/p.sum())
+    return out
+
+def generar_solicitantes(rng=None, n:int = None, hoy:date = None, primer_codigo:int = 1):
+    """
+    Solicitantes vectorizados con el esquema tipado (esquema.py): clave int32,
+    nombres, apellidos y columnas de texto como categóricas hasta la exportación.
+    n: cantidad (por defecto 4000–8000 al azar).
+    hoy: fecha de referencia para edades (por defecto, la fecha actual).
+    primer_codigo: número del primer P#### (para generar por bloques).
+    """
+    rng = np.random if rng is None else rng
+    if n is None:
+        n = int(rng.uniform(4000, 8001))
+    codigos = np.arange(primer_codigo, primer_codigo + n, dtype=np.int32)
+    sexo_cod = rng.choice(len(SEXOS), size=n, p=[0.49,0.49,0.02])
+
+    if hoy is None:
+        hoy = datetime.now(TZ).date()
+    dia = min(hoy.day, 28) if hoy.month == 2 else hoy.day  # 29/02 no existe en todos los años
+    min_birth = date(hoy.year-70, hoy.month, dia)
+    max_birth = date(hoy.year-18, hoy.month, dia)
     delta_days = (max_birth - min_birth).days
-    fechas_nac = [min_birth + timedelta(days=int(random.random()*delta_days)) for _ in range(n)]
-    edades = np.array([(hoy - f).days // 365 for f in fechas_nac])
+    offsets = np.floor(rng.random(n)*delta_days).astype(np.int64)
+    fechas_nac = np.datetime64(min_birth, "D") + offsets
+    edades = (np.datetime64(hoy, "D") - fechas_nac).astype(np.int64) // 365
 
     # nombres: 1 o 2 palabras; si 2, distintas y compatibles con sexo/neutro
-    nombres_final = []
-    for s in sexos:
-        if s == "masculino":
-            fuente = nombres_m + nombres_neutros
-        elif s == "femenino":
-            fuente = nombres_f + nombres_neutros
-        else:
-            fuente = nombres_neutros + nombres_m[:30] + nombres_f[:30]
-        if random.random() < 0.3:
-            a, b = np.random.choice(fuente, size=2, replace=False)
-            while a == b:
-                a, b = np.random.choice(fuente, size=2, replace=False)
-            nombres_final.append(f"{a} {b}")
-        else:
-            nombres_final.append(np.random.choice(fuente))
+    nom_a = np.empty(n, dtype=np.int64)
+    nom_b = np.full(n, -1, dtype=np.int64)
+    for k, s in enumerate(SEXOS):
+        mask = sexo_cod == k
+        m = int(mask.sum())
+        if not m:
+            continue
+        fuente = FUENTES_NOMBRE[s]
+        a, b = distinct_pairs(m, len(fuente), rng)
+        dos = rng.random(m) < 0.3
+        nom_a[mask] = fuente[a]
+        nom_b[mask] = np.where(dos, fuente[b], -1)
 
     # apellidos: 2 palabras distintas
-    apes = []
-    for _ in range(n):
-        a, b = np.random.choice(apellidos, size=2, replace=False)
-        apes.append(f"{a} {b}")
+    ape_a, ape_b = distinct_pairs(n, len(apellidos), rng)
 
     # nivel de estudios con casos marginales
-    def nivel_estudios(e):
-        if e <= 21:
-            base = ["sin_estudios","primaria","secundaria"]
-            if random.random() < 0.05:  # marginal
-                base = base + ["universitaria"]
-            probs = [0.05,0.35,0.60] if len(base)==3 else [0.05,0.33,0.57,0.05]
-        elif 22 <= e <= 26:
-            base = ["primaria","secundaria","universitaria"]
-            if random.random() < 0.05:
-                base = base + ["post-grado"]
-            probs = [0.15,0.50,0.35] if len(base)==3 else [0.14,0.48,0.35,0.03]
-        else:
-            base = ["primaria","secundaria","universitaria","post-grado"]
-            probs = [0.10,0.30,0.45,0.15]
-        return np.random.choice(base, p=np.array(probs)/np.sum(probs))
-
-    niveles = [nivel_estudios(e) for e in edades]
+    N = {v: i for i, v in enumerate(NIVELES_ESTUDIOS)}
+    joven = edades <= 21
+    medio = (edades >= 22) & (edades <= 26)
+    mayor = edades >= 27
+    marginal = rng.random(n) < 0.05
+    niveles = choice_by_group(n, [
+        (joven & ~marginal, [N["sin_estudios"],N["primaria"],N["secundaria"]], [0.05,0.35,0.60]),
+        (joven & marginal,  [N["sin_estudios"],N["primaria"],N["secundaria"],N["universitaria"]], [0.05,0.33,0.57,0.05]),
+        (medio & ~marginal, [N["primaria"],N["secundaria"],N["universitaria"]], [0.15,0.50,0.35]),
+        (medio & marginal,  [N["primaria"],N["secundaria"],N["universitaria"],N["post-grado"]], [0.14,0.48,0.35,0.03]),
+        (mayor,             [N["primaria"],N["secundaria"],N["universitaria"],N["post-grado"]], [0.10,0.30,0.45,0.15]),
+    ], rng)
 
     # ocupación
-    ocupaciones = []
-    for e in edades:
-        if e <= 20:
-            opciones = ["estudiante","trabajador","sin_empleo"]
-            probs = [0.70,0.20,0.10]
-        elif 21 <= e < 65:
-            opciones = ["trabajador","sin_empleo"]
-            probs = [0.82,0.18]
-            if random.random() < 0.02:  # marginal estudiante >20
-                opciones.append("estudiante"); probs.append(0.02)
-        else:
-            opciones = ["jubilado","trabajador","sin_empleo"]  # jubilado habilitado, otros baja prob.
-            probs = [0.80,0.15,0.05]
-        ocupaciones.append(np.random.choice(opciones, p=np.array(probs)/np.sum(probs)))
+    O = {v: i for i, v in enumerate(OCUPACIONES)}
+    menor = edades <= 20
+    activo = (edades >= 21) & (edades < 65)
+    adulto_mayor = edades >= 65
+    marginal = rng.random(n) < 0.02  # marginal estudiante >20
+    ocupaciones = choice_by_group(n, [
+        (menor,               [O["estudiante"],O["trabajador"],O["sin_empleo"]], [0.70,0.20,0.10]),
+        (activo & ~marginal,  [O["trabajador"],O["sin_empleo"]], [0.82,0.18]),
+        (activo & marginal,   [O["trabajador"],O["sin_empleo"],O["estudiante"]], [0.82,0.18,0.02]),
+        (adulto_mayor,        [O["jubilado"],O["trabajador"],O["sin_empleo"]], [0.80,0.15,0.05]),
+    ], rng)
 
     return pd.DataFrame({
         "codigo_solicitante": codigos,
-        "nombre": nombres_final,
-        "apellido": apes,
-        "sexo": sexos,
-        "fecha_nacimiento": fechas_nac,
-        "nivel_de_estudios": niveles,
-        "ocupacion": ocupaciones
+        "nombre": encode_pairs(nom_a, nom_b, VOCAB_NOMBRES),
+        "apellido": encode_pairs(ape_a, ape_b, apellidos),
+        "sexo": categorica(sexo_cod, "sexo"),
+        "fecha_nacimiento": pd.to_datetime(fechas_nac),
+        "nivel_de_estudios": categorica(niveles, "nivel_de_estudios"),
+        "ocupacion": categorica(ocupaciones, "ocupacion")
     })
 
 # ==============================
 # GENERADOR DE SOLICITUDES
 # ==============================
-def generar_solicitudes(df_solicitantes: pd.DataFrame):
-    year = previous_year()
-    n = max(random.randint(8000, 9999), len(df_solicitantes))
+def peak_weights(dias, rng=None):
+    """Pesos por día hábil con 2 meses pico (x2.5). Devuelve (pesos, meses_pico)."""
+    rng = np.random if rng is None else rng
+    meses_dia = dias.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    pico1, pico2 = rng.choice(np.arange(1, 13), size=2, replace=False)
+    pesos = np.where(np.isin(meses_dia, (pico1, pico2)), 2.5, 1.0)
+    return pesos / pesos.sum(), (int(pico1), int(pico2))
+
+def armar_solicitudes(dias, counts, asignados, last_week, p_eval:float, p_si:float,
+                      rng=None, primer_codigo:int = 1) -> pd.DataFrame:
+    """
+    Bloque de solicitudes a partir de conteos por día ya sorteados y
+    solicitantes ya asignados: presentación, evaluación y resultado.
+    Los códigos S#### (int32) empiezan en primer_codigo, en orden temporal;
+    asignados son claves de solicitante (int o P####).
+    """
+    rng = np.random if rng is None else rng
+    n = int(np.sum(counts))
+    dias_pres = np.repeat(dias, counts)
+    horas = random_business_seconds(n, rng)
+    orden = np.lexsort((horas, dias_pres))
+    fechas = local_datetimes(dias_pres[orden], horas[orden])
+
+    # Códigos en estricto orden temporal
+    df = pd.DataFrame({
+        "codigo_solicitud": np.arange(primer_codigo, primer_codigo + n, dtype=np.int32),
+        "codigo_solicitante": codigos_a_int(pd.Series(asignados)).to_numpy(),
+        "fecha_presentacion": fechas
+    })
 
-    # Códigos
-    codigos = [f"S{str(i).zfill(4)}" for i in range(1, n+1)]
+    # Regla: última semana del rango => pendiente
+    in_last_week = (fechas >= last_week)
 
-    # Asignar solicitantes: garantizar cobertura 1 vez cada uno, resto aleatorio
-    todos = df_solicitantes["codigo_solicitante"].tolist()
-    asignados = todos + list(np.random.choice(todos, size=n - len(todos), replace=True))
-    random.shuffle(asignados)
+    # Viabilidad y fecha de evaluación (1..3 días hábiles después) en una pasada
+    fevals = pick_business_dts_within_gap(fechas, 1, 3, rng)
+    viable = fevals.notna() & ~in_last_week
 
-    # Fechas de presentación con 2 meses pico
-    dias = business_days_of_year(year)
-    meses = list(range(1,13))
-    pico1, pico2 = np.random.choice(meses, size=2, replace=False)
-    pesos = np.array([2.5 if d.month in (pico1,pico2) else 1.0 for d in dias], dtype=float)
-    pesos = pesos / pesos.sum()
-    counts = np.random.multinomial(n, pesos)
-    fechas = []
-    for d, c in zip(dias, counts):
-        for _ in range(c):
-            fechas.append(combine_local(d, random_business_time_campana()))
-    fechas = sorted(fechas)[:n]
+    evaluado = choose_mask(viable, p_eval, n, rng)
+    si = choose_mask(evaluado, p_si, int(evaluado.sum()), rng)
 
-    df = pd.DataFrame({
-        "codigo_solicitud": codigos,
-        "codigo_solicitante": asignados,
-        "fecha_presentacion": fechas
-    }).sort_values("fecha_presentacion").reset_index(drop=True)
+    # estados como códigos de las categorías fijas (-1 = vacío)
+    df["estado"] = categorica(np.where(evaluado, 0, 1), "estado")
+    df["fecha_evaluacion"] = fevals.where(evaluado)
+    df["resultado_evaluacion"] = categorica(np.select([si, evaluado], [0, 1], -1), "resultado_evaluacion")
+    return df
 
-    # Reenumerar códigos en estricto orden temporal
-    df["codigo_solicitud"] = [f"S{str(i).zfill(4)}" for i in range(1, len(df)+1)]
+def generar_solicitudes(df_solicitantes: pd.DataFrame, rng=None, n:int = None,
+                        desde:date = None, hasta:date = None):
+    """
+    Solicitudes como arreglos: conteos multinomiales por día expandidos con
+    np.repeat, hora del día en bloque y un único tz_localize. La fecha de
+    evaluación se sortea una sola vez y define también la viabilidad.
+    n: cantidad (por defecto 8000–9999); nunca menos que los solicitantes.
+    desde/hasta: rango de presentación (por defecto, el año anterior).
+    """
+    rng = np.random if rng is None else rng
+    desde, hasta, dias = span_business_days(desde, hasta)
+    if n is None:
+        n = int(rng.uniform(8000, 10000))
+    n = max(n, len(df_solicitantes))
 
-    # Regla: última semana de diciembre => pendiente
-    last_week = pd.Timestamp(year, 12, 25, tz=TZ)
-    in_last_week = df["fecha_presentacion"] >= last_week
+    # Asignar solicitantes: garantizar cobertura 1 vez cada uno, resto aleatorio
+    todos = codigos_a_int(df_solicitantes["codigo_solicitante"]).to_numpy()
+    asignados = np.concatenate([todos, rng.choice(todos, size=n - len(todos), replace=True)])
+    rng.shuffle(asignados)
 
-    # Viabilidad para evaluación (1..3 días hábiles después)
-    viable_idx = []
-    for i, row in df.iterrows():
-        if in_last_week.iat[i]:
-            continue
-        if pick_business_dt_within_gap(row["fecha_presentacion"], 1, 3) is not None:
-            viable_idx.append(i)
-
-    # Objetivo evaluado 75–90%
-    p_eval_obj = random.uniform(0.75, 0.90)
-    n_eval_obj = int(round(p_eval_obj * len(df)))
-    n_eval = min(n_eval_obj, len(viable_idx))
-
-    estados = np.array(["pendiente"]*len(df), dtype=object)
-    if n_eval > 0:
-        chosen = np.random.choice(viable_idx, size=n_eval, replace=False)
-        estados[chosen] = "evaluado"
-    # forzar pendientes en última semana
-    estados[in_last_week.values] = "pendiente"
-    df["estado"] = estados
-
-    # Fechas de evaluación y resultados
-    fevals = [pd.NaT]*len(df)
-    evaluados_idx = df.index[df["estado"]=="evaluado"].tolist()
-    # sí_cumple 45–75% de evaluadas
-    p_si = random.uniform(0.45, 0.75)
-    n_si = int(round(p_si * len(evaluados_idx)))
-    si_idx = set(np.random.choice(evaluados_idx, size=n_si, replace=False)) if n_si>0 else set()
-
-    resultados = [""]*len(df)
-    for i in evaluados_idx:
-        fe = pick_business_dt_within_gap(df.at[i,"fecha_presentacion"], 1, 3)
-        if fe is None:
-            # seguridad extra: si ya no hay días hábiles, cae a pendiente
-            df.at[i,"estado"] = "pendiente"
-            resultados[i] = ""
-            fevals[i] = pd.NaT
-        else:
-            fevals[i] = fe
-            resultados[i] = "sí_cumple" if i in si_idx else "no_cumple"
-
-    df["fecha_evaluacion"] = fevals
-    df["resultado_evaluacion"] = resultados
-
-    # Limpiar pendientes por si se degradó alguno
-    pend_mask = df["estado"]=="pendiente"
-    df.loc[pend_mask, "fecha_evaluacion"] = pd.NaT
-    df.loc[pend_mask, "resultado_evaluacion"] = ""
-
-    # Reordenar por fecha y reenumerar códigos
-    df = df.sort_values("fecha_presentacion").reset_index(drop=True)
-    df["codigo_solicitud"] = [f"S{str(i).zfill(4)}" for i in range(1, len(df)+1)]
-
-    meses_pico = (pico1, pico2)
+    # Fechas de presentación con 2 meses pico
+    pesos, meses_pico = peak_weights(dias, rng)
+    counts = rng.multinomial(n, pesos)
+
+    # Última semana del rango (desde 25/12 para un año completo) => pendiente
+    last_week = pd.Timestamp(hasta - timedelta(days=6), tz=TZ)
+    # Objetivos: evaluado 75–90%; sí_cumple 45–75% de evaluadas
+    df = armar_solicitudes(dias, counts, asignados, last_week,
+                           rng.uniform(0.75, 0.90), rng.uniform(0.45, 0.75), rng)
     return df, meses_pico
 
 # ==============================
 # GENERADOR DE TRÁMITE (sí_cumple)
 # ==============================
-def generar_tramite(df_solicitudes: pd.DataFrame):
+def draw_tramite_targets(rng=None):
+    """Objetivos (registrado, info recibida, email enviado) del trámite."""
+    rng = np.random if rng is None else rng
+    return rng.uniform(0.90, 0.95), rng.uniform(0.70, 0.90), rng.uniform(0.75, 0.90)
+
+def generar_tramite(df_solicitudes: pd.DataFrame, rng=None, objetivos=None):
+    """
+    Trámite de las solicitudes sí_cumple, por columnas: cada etapa sortea sus
+    gaps como arreglo, marca el objetivo con choose_mask y deriva estados con
+    np.select. Sin trabajo Python por fila.
+    objetivos: (p_reg, p_info, p_email); por defecto se sortean.
+    """
+    rng = np.random if rng is None else rng
+    p_reg, p_info, p_email = draw_tramite_targets(rng) if objetivos is None else objetivos
     base = df_solicitudes[df_solicitudes["resultado_evaluacion"]=="sí_cumple"][["codigo_solicitud","fecha_presentacion"]].reset_index(drop=True)
     n = len(base)
     if n == 0:
         return pd.DataFrame(columns=["codigo_solicitud","estado_registro","fecha_registro","estado_informacion","fecha_informacion","estado_email","fecha_email"])
 
-    # REGISTRO: seleccionar viables, luego aplicar objetivo 90–95%
-    viable_reg = []
-    for i in range(n):
-        dt = pick_business_dt_within_gap(base.loc[i,"fecha_presentacion"], 1, 5)
-        if dt is not None:
-            viable_reg.append((i, dt))
-    p_reg_obj = random.uniform(0.90, 0.95)
-    n_reg_obj = int(round(p_reg_obj*n))
-    n_reg = min(n_reg_obj, len(viable_reg))
-    idx_reg = set()
-    fechas_reg = [pd.NaT]*n
-    if n_reg>0:
-        chosen = np.random.choice(range(len(viable_reg)), size=n_reg, replace=False)
-        for j in chosen:
-            i, dt = viable_reg[j]
-            idx_reg.add(i)
-            fechas_reg[i] = dt
-
-    estado_reg = np.array(["registrado" if i in idx_reg else "pendiente" for i in range(n)], dtype=object)
+    # REGISTRO: viables con 1–5 días; objetivo 90–95% de sí_cumple
+    fechas_reg = pick_business_dts_within_gap(base["fecha_presentacion"], 1, 5, rng)
+    reg = choose_mask(fechas_reg.notna(), p_reg, n, rng)
+    fechas_reg = fechas_reg.where(reg)
 
     # INFORMACIÓN: sobre registrados, viables con 3–10 días; objetivo 70–90%
-    viable_info = []
-    for i in idx_reg:
-        dt = pick_business_dt_within_gap(fechas_reg[i], 3, 10)
-        if dt is not None:
-            viable_info.append((i, dt))
-    p_info_obj = random.uniform(0.70, 0.90)
-    n_info_obj = int(round(p_info_obj*len(idx_reg)))
-    n_info = min(n_info_obj, len(viable_info))
-    idx_info = set()
-    fechas_info = [pd.NaT]*n
-    if n_info>0:
-        chosen = np.random.choice(range(len(viable_info)), size=n_info, replace=False)
-        for j in chosen:
-            i, dt = viable_info[j]
-            idx_info.add(i)
-            fechas_info[i] = dt
-    estado_info = np.array([("recibida" if i in idx_info else ("pendiente" if i in idx_reg else "")) for i in range(n)], dtype=object)
+    fechas_info = pick_business_dts_within_gap(fechas_reg, 3, 10, rng)
+    info = choose_mask(fechas_info.notna() & reg, p_info, int(reg.sum()), rng)
+    fechas_info = fechas_info.where(info)
 
     # EMAIL: sobre info recibida, viables con 7–15 días; objetivo 75–90%
-    viable_email = []
-    for i in idx_info:
-        dt = pick_business_dt_within_gap(fechas_info[i], 7, 15)
-        if dt is not None:
-            viable_email.append((i, dt))
-    p_email_obj = random.uniform(0.75, 0.90)
-    n_email_obj = int(round(p_email_obj*len(idx_info)))
-    n_email = min(n_email_obj, len(viable_email))
-    idx_email = set()
-    fechas_email = [pd.NaT]*n
-    if n_email>0:
-        chosen = np.random.choice(range(len(viable_email)), size=n_email, replace=False)
-        for j in chosen:
-            i, dt = viable_email[j]
-            idx_email.add(i)
-            fechas_email[i] = dt
-    estado_email = np.array([("enviado" if i in idx_email else ("" if i not in idx_info else "pendiente")) for i in range(n)], dtype=object)
+    fechas_email = pick_business_dts_within_gap(fechas_info, 7, 15, rng)
+    email = choose_mask(fechas_email.notna() & info, p_email, int(info.sum()), rng)
+    fechas_email = fechas_email.where(email)
 
     df_tr = pd.DataFrame({
         "codigo_solicitud": base["codigo_solicitud"],
-        "estado_registro": estado_reg,
+        "estado_registro": categorica(np.where(reg, 0, 1), "estado_registro"),
         "fecha_registro": fechas_reg,
-        "estado_informacion": estado_info,
+        "estado_informacion": categorica(np.select([info, reg], [0, 1], -1), "estado_informacion"),
         "fecha_informacion": fechas_info,
-        "estado_email": estado_email,
+        "estado_email": categorica(np.select([email, info], [0, 1], -1), "estado_email"),
         "fecha_email": fechas_email
     })
     return df_tr
 
+# ==============================
+# GENERACIÓN POR BLOQUES (multiproceso)
+# ==============================
+# Los bloques dependen solo de la semilla y de los parámetros, nunca de la
+# cantidad de workers: cada uno tiene su propio SeedSequence con spawn_key
+# fijo, así que el resultado es idéntico con 1 o N procesos.
+BLOQUE_SOLICITANTES = 250_000
+_KEY_PLAN, _KEY_SOLICITANTES, _KEY_SOLICITUDES = 0, 1, 2
+
+def shard_rng(seed:int, *key) -> np.random.Generator:
+    """Generator independiente para (seed, key): mismo flujo en cualquier proceso."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+
+def plan_dataset(seed:int, n_solicitantes:int = None, n_solicitudes:int = None,
+                 desde:date = None, hasta:date = None, bloque_solicitantes:int = BLOQUE_SOLICITANTES,
+                 dias_por_bloque:int = None):
+    """
+    Plan barato (O(días + solicitantes)) que fija todo lo global: tamaños,
+    meses pico, conteos por día, objetivos y cobertura de solicitantes.
+    Solicitantes se parten por rango de código; solicitudes, por mes
+    calendario del rango (o cada dias_por_bloque días hábiles). Cada bloque
+    de solicitudes recibe su tramo de códigos S#### para que sigan en orden
+    temporal entre bloques. El particionado forma parte del resultado: cambiar
+    dias_por_bloque cambia los datos, cambiar workers no.
+    """
+    rng = shard_rng(seed, _KEY_PLAN)
+    desde, hasta, dias = span_business_days(desde, hasta)
+    if n_solicitantes is None:
+        n_solicitantes = int(rng.uniform(4000, 8001))
+    if n_solicitudes is None:
+        n_solicitudes = int(rng.uniform(8000, 10000))
+    n_solicitudes = max(n_solicitudes, n_solicitantes)
+
+    bloques_solicitantes = [
+        {"seed": seed, "key": (_KEY_SOLICITANTES, k), "primer_codigo": ini,
+         "n": min(bloque_solicitantes, n_solicitantes + 1 - ini), "hoy": hasta}
+        for k, ini in enumerate(range(1, n_solicitantes + 1, bloque_solicitantes))
+    ]
+
+    pesos, meses_pico = peak_weights(dias, rng)
+    counts = rng.multinomial(n_solicitudes, pesos)
+    p_eval, p_si = rng.uniform(0.75, 0.90), rng.uniform(0.45, 0.75)
+    objetivos_tramite = draw_tramite_targets(rng)
+    last_week = pd.Timestamp(hasta - timedelta(days=6), tz=TZ)
+
+    # Cobertura: cada solicitante una vez, repartido entre bloques en proporción
+    # a su tamaño (nunca más que las solicitudes del bloque)
+    cobertura = rng.permutation(n_solicitantes).astype(np.int64) + 1
+    if dias_por_bloque is None:
+        mes = dias.astype("datetime64[M]").astype(np.int64)
+        tramos = np.split(np.arange(len(dias)), np.flatnonzero(np.diff(mes)) + 1)
+    else:
+        tramos = np.split(np.arange(len(dias)), np.arange(dias_por_bloque, len(dias), dias_por_bloque))
+    acumulado = np.cumsum([counts[t].sum() for t in tramos])
+    lim_cob = (acumulado * n_solicitantes) // n_solicitudes
+
+    bloques_solicitudes = []
+    primer, cob_ini = 1, 0
+    for k, t in enumerate(tramos):
+        c = counts[t]
+        bloques_solicitudes.append({
+            "seed": seed, "key": (_KEY_SOLICITUDES, k),
+            "dias": dias[t], "counts": c, "primer_codigo": primer,
+            "cobertura": cobertura[cob_ini:lim_cob[k]], "n_solicitantes": n_solicitantes,
+            "last_week": last_week, "p_eval": p_eval, "p_si": p_si,
+            "objetivos_tramite": objetivos_tramite,
+        })
+        primer += int(c.sum())
+        cob_ini = int(lim_cob[k])
+
+    return {"solicitantes": bloques_solicitantes, "solicitudes": bloques_solicitudes,
+            "meses_pico": meses_pico}
+
+def generar_bloque_solicitantes(bloque) -> pd.DataFrame:
+    rng = shard_rng(bloque["seed"], *bloque["key"])
+    with etapa("generador.solicitantes", filas=bloque["n"]):
+        return generar_solicitantes(rng, n=bloque["n"], hoy=bloque["hoy"], primer_codigo=bloque["primer_codigo"])
+
+def generar_bloque_solicitudes(bloque):
+    """Un bloque (mes) de SolicitudesRecibidas y su TramiteSolicitudes."""
+    rng = shard_rng(bloque["seed"], *bloque["key"])
+    n = int(bloque["counts"].sum())
+    cobertura = bloque["cobertura"]
+    resto = rng.integers(1, bloque["n_solicitantes"] + 1, size=n - len(cobertura))
+    asignados = np.concatenate([cobertura, resto])
+    rng.shuffle(asignados)
+    with etapa("generador.solicitudes", filas=n):
+        df = armar_solicitudes(bloque["dias"], bloque["counts"], asignados,
+                               bloque["last_week"], bloque["p_eval"], bloque["p_si"], rng,
+                               primer_codigo=bloque["primer_codigo"])
+    with etapa("generador.tramite", filas=n):
+        df_tr = generar_tramite(df, rng, objetivos=bloque["objetivos_tramite"])
+    return df, df_tr
+
+def _map_ordenado(func, bloques, workers:int):
+    """
+    map en orden de bloque; en el mismo proceso si workers <= 1. Con pool,
+    a lo sumo 2*workers bloques en vuelo para que la memoria no crezca si el
+    consumidor (p. ej. el escritor) va más lento que la generación.
+    """
+    if workers <= 1:
+        yield from map(func, bloques)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pendientes = deque()
+        for bloque in bloques:
+            pendientes.append(ex.submit(func, bloque))
+            if len(pendientes) >= 2*workers:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+
+def concat_bloques(frames) -> pd.DataFrame:
+    """concat que conserva las categóricas aunque cada bloque tenga su propio diccionario."""
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame()
+    out = pd.concat(frames, ignore_index=True)
+    for col in frames[0].columns:
+        if all(isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            out[col] = union_categoricals([f[col] for f in frames])
+    return out
+
+def iter_bloques(plan, workers:int = 1):
+    """
+    Flujo (hoja, bloque) del plan: primero Solicitantes por rango de código,
+    luego SolicitudesRecibidas y TramiteSolicitudes de cada bloque temporal,
+    en orden de fecha_presentacion.
+    """
+    for df in _map_ordenado(generar_bloque_solicitantes, plan["solicitantes"], workers):
+        yield "Solicitantes", df
+    for df, df_tr in _map_ordenado(generar_bloque_solicitudes, plan["solicitudes"], workers):
+        yield "SolicitudesRecibidas", df
+        yield "TramiteSolicitudes", df_tr
+
+def ensamblar(bloques):
+    """Junta un flujo (hoja, bloque) en (df_solicitantes, df_solicitudes, df_tramite)."""
+    partes = {"Solicitantes": [], "SolicitudesRecibidas": [], "TramiteSolicitudes": []}
+    for hoja, df in bloques:
+        partes[hoja].append(df)
+    return tuple(concat_bloques(p) for p in partes.values())
+
+def generar_dataset(seed:int = SEED, n_solicitantes:int = None, n_solicitudes:int = None,
+                    desde:date = None, hasta:date = None, workers:int = 1, dias_por_bloque:int = None):
+    """
+    Las tres tablas generadas por bloques, en paralelo si workers > 1.
+    Devuelve (df_solicitantes, df_solicitudes, df_tramite, meses_pico);
+    idéntico para una misma semilla sin importar workers.
+    """
+    plan = plan_dataset(seed, n_solicitantes, n_solicitudes, desde, hasta, dias_por_bloque=dias_por_bloque)
+    df_solicitantes, df_solicitudes, df_tramite = ensamblar(iter_bloques(plan, workers))
+    return df_solicitantes, df_solicitudes, df_tramite, plan["meses_pico"]
+
 # ==============================
 # RESUMEN
 # ==============================
-def resumen_estadistico(df_sol, df_solic, df_tram, meses_pico):
+def contar_resumen(df_sol=None, df_solic=None, df_tram=None) -> Counter:
+    """Conteos del resumen; sumables con + entre bloques."""
+    c = Counter()
+    if df_sol is not None:
+        c["Solicitantes"] += len(df_sol)
+    if df_solic is not None:
+        c["SolicitudesRecibidas"] += len(df_solic)
+        for k, v in df_solic["estado"].value_counts().items():
+            if v:
+                c[("estado", k)] += int(v)
+        evals = df_solic[df_solic["estado"]=="evaluado"]
+        for k, v in evals["resultado_evaluacion"].value_counts().items():
+            if v:
+                c[("resultado", k)] += int(v)
+        meses = pd.to_datetime(df_solic["fecha_presentacion"]).dt.month.value_counts()
+        for m, v in meses.items():
+            c[("mes", int(m))] += int(v)
+    if df_tram is not None:
+        c["TramiteSolicitudes"] += len(df_tram)
+    return c
+
+def imprimir_resumen(c:Counter, meses_pico):
+    n_solic = c["SolicitudesRecibidas"]
     print("\n========= RESUMEN DEL DATASET =========")
-    print(f"Solicitantes: {len(df_sol)}")
-    print(f"SolicitudesRecibidas: {len(df_solic)}")
-    print(f"TramiteSolicitudes: {len(df_tram)}")
+    print(f"Solicitantes: {c['Solicitantes']}")
+    print(f"SolicitudesRecibidas: {n_solic}")
+    print(f"TramiteSolicitudes: {c['TramiteSolicitudes']}")
     print("--------------------------------------")
 
-    evals = df_solic[df_solic["estado"]=="evaluado"]
-    pendientes = df_solic[df_solic["estado"]=="pendiente"]
-    print(f"Evaluadas: {len(evals)} ({len(evals)/len(df_solic):.2%})")
-    print(f"Pendientes: {len(pendientes)} ({len(pendientes)/len(df_solic):.2%})")
+    n_evals, n_pend = c[("estado", "evaluado")], c[("estado", "pendiente")]
+    print(f"Evaluadas: {n_evals} ({n_evals/n_solic:.2%})")
+    print(f"Pendientes: {n_pend} ({n_pend/n_solic:.2%})")
 
-    res = Counter(evals["resultado_evaluacion"])
-    if res:
-        total = sum(res.values())
-        if total > 0:
-            for k,v in res.items():
-                print(f"  {k}: {v} ({v/total:.2%})")
+    res = {k[1]: v for k, v in c.items() if isinstance(k, tuple) and k[0] == "resultado"}
+    total = sum(res.values())
+    if total > 0:
+        for k,v in res.items():
+            print(f"  {k}: {v} ({v/total:.2%})")
 
     print("--------------------------------------")
     print(f"Meses pico (aleatorios): {sorted(meses_pico)}")
-    meses = pd.to_datetime(df_solic["fecha_presentacion"]).dt.month.value_counts().sort_index()
     print("Distribución mensual de presentaciones:")
-    for m,v in meses.items():
-        print(f"  Mes {m:02d}: {v}")
+    for m in sorted(k[1] for k in c if isinstance(k, tuple) and k[0] == "mes"):
+        print(f"  Mes {m:02d}: {c[('mes', m)]}")
 
     print("--------------------------------------")
-    print(f"Trámites (sí_cumple): {len(df_tram)} ({len(df_tram)/len(df_solic):.2%})")
+    print(f"Trámites (sí_cumple): {c['TramiteSolicitudes']} ({c['TramiteSolicitudes']/n_solic:.2%})")
     print("======================================\n")
 
 # ==============================
 # MAIN
 # ==============================
-def main():
-    print("Generando dataset...")
+def exportar(df_solicitantes, df_solicitudes, df_tramite, formato:str = "xlsx", salida:str = OUTPUT_PATH):
+    """
+    xlsx: un libro con las tres hojas (datetimes sin tz, claves S####/P####).
+    csv/parquet: salida es una carpeta con un archivo por tabla; Parquet
+    conserva el esquema tipado.
+    """
+    tablas = {
+        "Solicitantes": df_solicitantes,
+        "SolicitudesRecibidas": df_solicitudes,
+        "TramiteSolicitudes": df_tramite,
+    }
+    if formato == "xlsx":
+        for hoja, df in tablas.items():
+            if len(df) > EXCEL_MAX_ROWS:
+                raise ValueError(f"{hoja} tiene {len(df)} filas; Excel admite {EXCEL_MAX_ROWS}. Use --formato csv o parquet.")
+        with pd.ExcelWriter(salida, engine="xlsxwriter", datetime_format="yyyy-mm-dd hh:mm",
+                            date_format="yyyy-mm-dd") as writer:
+            for hoja, df in tablas.items():
+                with etapa("generador.to_excel", filas=len(df), hoja=hoja):
+                    a_texto(df).to_excel(writer, sheet_name=hoja, index=False)
+    elif formato in ("csv", "parquet"):
+        os.makedirs(salida, exist_ok=True)
+        for hoja, df in tablas.items():
+            ruta = os.path.join(salida, f"{hoja}.{formato}")
+            with etapa(f"generador.to_{formato}", filas=len(df), hoja=hoja):
+                if formato == "csv":
+                    a_texto(df).to_csv(ruta, index=False)
+                else:
+                    df.to_parquet(ruta, index=False)
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+    return salida
+
+def _descategorizar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Categóricas de diccionario libre (nombre, apellido) a texto: cada bloque
+    trae su propio diccionario y el esquema de salida debe ser fijo. Las de
+    categorías fijas (estados) se escriben tal cual.
+    """
+    cats = [c for c in df.columns
+            if isinstance(df[c].dtype, pd.CategoricalDtype) and c not in CATEGORIAS]
+    if not cats:
+        return df
+    return df.assign(**{c: df[c].astype(str) for c in cats})
 
-    df_solicitantes = generar_solicitantes()
-    df_solicitudes, meses_pico = generar_solicitudes(df_solicitantes)
-    df_tramite = generar_tramite(df_solicitudes)
+def exportar_streaming(bloques, formato:str, salida:str) -> Counter:
+    """
+    Escribe (hoja, bloque) a medida que llegan, sin juntar el dataset:
+      parquet: un archivo por tabla, un row group por bloque
+      csv:     una carpeta por tabla, un part-NNNNN.csv por bloque
+    La memoria queda acotada por el tamaño de bloque. Devuelve los conteos
+    del resumen (ver contar_resumen).
+    """
+    if formato not in ("csv", "parquet"):
+        raise ValueError(f"Formato sin modo streaming: {formato}")
+    os.makedirs(salida, exist_ok=True)
+    conteos = Counter()
+    escritores = {}
+    partes = Counter()
+    try:
+        for hoja, df in bloques:
+            conteos += contar_resumen(**{{"Solicitantes": "df_sol", "SolicitudesRecibidas": "df_solic",
+                                          "TramiteSolicitudes": "df_tram"}[hoja]: df})
+            if df.empty:
+                continue
+            with etapa(f"generador.escribir_{formato}", filas=len(df), hoja=hoja):
+                _escribir_bloque(df, hoja, formato, salida, escritores, partes[hoja])
+            partes[hoja] += 1
+    finally:
+        for w in escritores.values():
+            w.close()
+    return conteos
+
+def _escribir_bloque(df, hoja:str, formato:str, salida:str, escritores:dict, parte:int):
+    """Un bloque de exportar_streaming: part-NNNNN.csv o un row group del ParquetWriter de la hoja."""
+    if formato == "csv":
+        carpeta = os.path.join(salida, hoja)
+        os.makedirs(carpeta, exist_ok=True)
+        a_texto(df).to_csv(os.path.join(carpeta, f"part-{parte:05d}.csv"), index=False)
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        tabla = pa.Table.from_pandas(_descategorizar(df), preserve_index=False)
+        if hoja not in escritores:
+            escritores[hoja] = pq.ParquetWriter(os.path.join(salida, f"{hoja}.parquet"), tabla.schema)
+        w = escritores[hoja]
+        if tabla.schema != w.schema:
+            tabla = tabla.cast(w.schema)
+        w.write_table(tabla)
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Generador de dataset LegalTech PSET - Solicitudes")
+    p.add_argument("--solicitantes", type=int, default=None, help="cantidad de solicitantes (por defecto 4000–8000)")
+    p.add_argument("--solicitudes", type=int, default=None, help="cantidad de solicitudes (por defecto 8000–9999)")
+    p.add_argument("--desde", type=date.fromisoformat, default=None, help="inicio del rango de presentación (YYYY-MM-DD)")
+    p.add_argument("--hasta", type=date.fromisoformat, default=None, help="fin del rango de presentación (YYYY-MM-DD)")
+    p.add_argument("--seed", type=int, default=SEED)
+    p.add_argument("--workers", type=int, default=1, help="procesos para generar por bloques (no cambia el resultado)")
+    p.add_argument("--dias-por-bloque", type=int, default=None,
+                   help="días hábiles por bloque de solicitudes (por defecto, un mes); acota la memoria")
+    p.add_argument("--formato", choices=["xlsx", "csv", "parquet"], default="xlsx")
+    p.add_argument("--salida", default=None, help="archivo .xlsx o carpeta para csv/parquet")
+    args = p.parse_args(argv)
+    if (args.desde is None) != (args.hasta is None):
+        p.error("--desde y --hasta van juntos")
+    if args.desde is None:
+        args.desde, args.hasta = default_span()
+    if args.salida is None:
+        args.salida = OUTPUT_PATH if args.formato == "xlsx" else "legaltech_pset_solicitudes"
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("Generando dataset...")
 
-    # Exportar a Excel (datetimes sin tz)
-    with pd.ExcelWriter(OUTPUT_PATH, engine="xlsxwriter", datetime_format="yyyy-mm-dd hh:mm") as writer:
-        df_solicitantes.to_excel(writer, sheet_name="Solicitantes", index=False)
-        strip_tz(df_solicitudes).to_excel(writer, sheet_name="SolicitudesRecibidas", index=False)
-        strip_tz(df_tramite).to_excel(writer, sheet_name="TramiteSolicitudes", index=False)
+    plan = plan_dataset(args.seed, args.solicitantes, args.solicitudes, args.desde, args.hasta,
+                        dias_por_bloque=args.dias_por_bloque)
+    if args.formato == "xlsx":
+        df_solicitantes, df_solicitudes, df_tramite = ensamblar(iter_bloques(plan, args.workers))
+        salida = exportar(df_solicitantes, df_solicitudes, df_tramite, args.formato, args.salida)
+        conteos = contar_resumen(df_solicitantes, df_solicitudes, df_tramite)
+    else:
+        # csv/parquet: bloque a bloque, sin materializar las tablas completas
+        salida = args.salida
+        conteos = exportar_streaming(iter_bloques(plan, args.workers), args.formato, salida)
 
-    resumen_estadistico(df_solicitantes, df_solicitudes, df_tramite, meses_pico)
-    print(f"Archivo Excel generado correctamente: {OUTPUT_PATH}")
+    imprimir_resumen(conteos, plan["meses_pico"])
+    print(f"Dataset generado correctamente ({args.formato}): {salida}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
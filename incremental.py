@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Modo incremental de fases y tiempos (calculador1 + analisis1_tiempos)
+
+El registro de solicitudes solo crece y un expediente cerrado
+(cerrado_en_evaluacion / cerrado_en_email) ya no cambia: sus duraciones no
+dependen de la fecha de corte. En cada corrida solo se recalculan:
+  - las solicitudes nuevas (fecha_presentacion posterior a la marca)
+  - las que cambiaron de estado (alguna fecha de etapa posterior a la marca
+    de último cambio)
+  - las que quedaron pendiente_al_corte en la corrida anterior
+
+Almacén de resultados (carpeta):
+  cerrados/part-NNNNN.parquet   solo se agregan partes, nunca se reescriben
+  pendientes.parquet            se reescribe entero (solo pendientes)
+  marcas.json                   marcas de agua y códigos en la marca exacta
+
+Así el costo de cada corrida depende del volumen nuevo y de los pendientes,
+no de la historia.
+
+Uso:
+    python incremental.py legaltech_pset_solicitudes.xlsx
+    df = cargar_resultados("fases_incremental")
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from analisis1_tiempos import calcular_tiempos
+from calculador1 import calcular_fases, fecha_corte_de
+from combinador import combinar
+from datos import cargar, cargar_tablas, guardar, tipar
+
+DIRECTORIO_ALMACEN = "fases_incremental"
+
+# Fechas que marcan un cambio de estado del expediente
+FECHAS_CAMBIO = ["fecha_evaluacion", "fecha_registro", "fecha_informacion", "fecha_email"]
+
+PENDIENTE = "pendiente_al_corte"
+
+
+# ==============================
+# MARCAS DE AGUA
+# ==============================
+def leer_marcas(directorio: str) -> dict:
+    ruta = os.path.join(directorio, "marcas.json")
+    if not os.path.exists(ruta):
+        return {"presentacion": None, "codigos_en_marca": [], "cambio": None, "partes": 0}
+    with open(ruta) as f:
+        return json.load(f)
+
+def _escribir_marcas(directorio: str, marcas: dict):
+    ruta = os.path.join(directorio, "marcas.json")
+    tmp = ruta + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(marcas, f, indent=2)
+    os.replace(tmp, ruta)
+
+def _ts(valor):
+    return None if valor is None else pd.Timestamp(valor)
+
+def _max_fecha(*series):
+    """Máximo de varias columnas de fechas (NaT si todas vacías)."""
+    maximos = [s.max() for s in series if len(s)]
+    maximos = [m for m in maximos if pd.notna(m)]
+    return max(maximos) if maximos else pd.NaT
+
+
+# ==============================
+# SELECCIÓN
+# ==============================
+def codigos_a_recalcular(solicitudes: pd.DataFrame, tramite: pd.DataFrame,
+                         marcas: dict, pendientes) -> np.ndarray:
+    """
+    Códigos de solicitud nuevos, con cambio de estado o pendientes. Solo
+    compara columnas de fechas contra las marcas (vectorizado); no combina
+    ni calcula nada sobre la historia.
+    """
+    marca_pres, marca_cambio = _ts(marcas["presentacion"]), _ts(marcas["cambio"])
+    fecha_pres = solicitudes["fecha_presentacion"]
+
+    if marca_pres is None:
+        nuevas = np.ones(len(solicitudes), dtype=bool)
+    else:
+        # misma marca exacta: solo los códigos que aún no se vieron
+        nuevas = (fecha_pres > marca_pres).to_numpy(dtype=bool, na_value=True)
+        en_marca = (fecha_pres == marca_pres).to_numpy(dtype=bool, na_value=False)
+        nuevas = nuevas | en_marca & ~np.isin(solicitudes["codigo_solicitud"], marcas["codigos_en_marca"])
+    partes = [solicitudes["codigo_solicitud"].to_numpy()[nuevas], np.asarray(pendientes)]
+
+    if marca_cambio is not None:
+        for tabla in (solicitudes, tramite):
+            cambio = np.zeros(len(tabla), dtype=bool)
+            for col in FECHAS_CAMBIO:
+                if col in tabla.columns:
+                    cambio |= (tabla[col] > marca_cambio).to_numpy(dtype=bool, na_value=False)
+            partes.append(tabla["codigo_solicitud"].to_numpy()[cambio])
+    return np.unique(np.concatenate(partes).astype(np.int64))
+
+
+# ==============================
+# ACTUALIZACIÓN
+# ==============================
+def calcular_filas(solicitantes, solicitudes, tramite, codigos, fecha_corte) -> pd.DataFrame:
+    """Vista combinada + fases + tiempos solo para los códigos dados."""
+    filas = solicitudes[np.isin(solicitudes["codigo_solicitud"], codigos)]
+    df = combinar(solicitantes, filas, tramite)
+    return calcular_tiempos(calcular_fases(df, fecha_corte))
+
+def actualizar(tablas: dict, directorio: str = DIRECTORIO_ALMACEN, fecha_corte: pd.Timestamp = None) -> dict:
+    """
+    Recalcula solo lo nuevo/pendiente y lo agrega al almacén. Devuelve
+    conteos de la corrida (recalculadas, nuevas_cerradas, pendientes).
+    Sin fecha_corte se usa la última fecha de evento de las tablas
+    completas (no solo de las filas recalculadas).
+    """
+    solicitantes = tablas["Solicitantes"]
+    solicitudes = tablas["SolicitudesRecibidas"]
+    tramite = tablas["TramiteSolicitudes"]
+    if fecha_corte is None:
+        fecha_corte = fecha_corte_de([solicitudes, tramite])
+
+    os.makedirs(os.path.join(directorio, "cerrados"), exist_ok=True)
+    marcas = leer_marcas(directorio)
+    ruta_pend = os.path.join(directorio, "pendientes.parquet")
+    pendientes_prev = cargar(ruta_pend) if os.path.exists(ruta_pend) else None
+    codigos_pend = [] if pendientes_prev is None else pendientes_prev["codigo_solicitud"].to_numpy()
+
+    codigos = codigos_a_recalcular(solicitudes, tramite, marcas, codigos_pend)
+    df = calcular_filas(solicitantes, solicitudes, tramite, codigos, fecha_corte)
+
+    pendiente = (df["estado_cierre"] == PENDIENTE).to_numpy()
+    cerrados = df[~pendiente]
+    if len(cerrados):
+        guardar(cerrados, os.path.join(directorio, "cerrados", f"part-{marcas['partes']:05d}.parquet"))
+        marcas["partes"] += 1
+    guardar(df[pendiente], ruta_pend)
+
+    # marcas: última presentación vista (y sus códigos, por empates) y último cambio
+    if len(df):
+        marca_pres = df["fecha_presentacion"].max()
+        previa = _ts(marcas["presentacion"])
+        if previa is None or marca_pres > previa:
+            en_marca = df.loc[df["fecha_presentacion"] == marca_pres, "codigo_solicitud"]
+            marcas["presentacion"] = str(marca_pres)
+            marcas["codigos_en_marca"] = sorted(int(c) for c in en_marca)
+        elif marca_pres == previa:
+            en_marca = df.loc[df["fecha_presentacion"] == marca_pres, "codigo_solicitud"]
+            marcas["codigos_en_marca"] = sorted(set(marcas["codigos_en_marca"]) | {int(c) for c in en_marca})
+        cambio = _max_fecha(*(df[c] for c in FECHAS_CAMBIO if c in df.columns))
+        if pd.notna(cambio) and (marcas["cambio"] is None or cambio > _ts(marcas["cambio"])):
+            marcas["cambio"] = str(cambio)
+    marcas["fecha_corte"] = str(fecha_corte)
+    _escribir_marcas(directorio, marcas)
+
+    return {"recalculadas": len(df), "nuevas_cerradas": len(cerrados), "pendientes": int(pendiente.sum())}
+
+def cargar_resultados(directorio: str = DIRECTORIO_ALMACEN) -> pd.DataFrame:
+    """Resultado completo del almacén (cerrados + pendientes), ordenado por código."""
+    carpeta = os.path.join(directorio, "cerrados")
+    partes = [cargar(os.path.join(carpeta, p)) for p in sorted(os.listdir(carpeta))]
+    ruta_pend = os.path.join(directorio, "pendientes.parquet")
+    if os.path.exists(ruta_pend):
+        partes.append(cargar(ruta_pend))
+    df = tipar(pd.concat(partes, ignore_index=True))
+    return df.sort_values("codigo_solicitud", ignore_index=True)
+
+
+if __name__ == "__main__":
+    origen = sys.argv[1] if len(sys.argv) > 1 else "legaltech_pset_solicitudes.xlsx"
+    directorio = sys.argv[2] if len(sys.argv) > 2 else DIRECTORIO_ALMACEN
+    conteos = actualizar(cargar_tablas(origen), directorio)
+    print(f"Almacén incremental actualizado: {directorio}")
+    for k, v in conteos.items():
+        print(f"  {k}: {v}")
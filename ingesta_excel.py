@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Ingesta de .xlsx por streaming (openpyxl read-only) y en paralelo
+
+pd.read_excel reabre y reparsea el zip en cada llamada y arma la hoja
+entera antes de devolver nada. Aquí:
+  - el libro se abre una vez (read_only, data_only) y sus hojas se leen
+    de ese mismo objeto
+  - las filas se recorren en streaming y se juntan en bloques de `filas`;
+    cada bloque se transpone a columnas (solo las pedidas) y sale tipado
+    (esquema.tipar), así que quien consume procesa bloque a bloque sin
+    esperar a que termine el parseo
+  - los tipos se fijan con el primer bloque y todos los demás se llevan a
+    ellos: un bloque con vacíos no cambia la unidad de las fechas ni
+    vuelve object una columna numérica
+  - a pedido (workers > 1), hojas o archivos independientes se parsean en
+    un pool de procesos (openpyxl es Python puro: con hilos no habría
+    paralelismo). Por defecto todo corre en el proceso actual: el pool
+    solo compensa con varios núcleos y, en plataformas con spawn, exige
+    que el script que lo pide esté protegido con `if __name__ == "__main__"`
+
+datos.cargar_tablas e iterar_bloques usan este módulo para los .xlsx.
+
+Uso:
+    for bloque in iterar_hoja("merge_con_tiempos_seg_corte.xlsx", filas=100_000):
+        parcial = calcular_fases(bloque)
+    tablas = leer_hojas("legaltech_pset_solicitudes.xlsx", workers=3)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from esquema import CLAVES, tipar, utc_heredado
+from instrumentacion import etapa
+
+# Filas por bloque en iterar_hoja
+TAM_BLOQUE_EXCEL = 100_000
+
+
+def abrir_libro(ruta: str):
+    """Libro openpyxl en modo streaming (read_only) con valores, no fórmulas."""
+    import openpyxl
+    return openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+
+def _hoja(libro, hoja):
+    return libro.worksheets[hoja] if isinstance(hoja, int) else libro[hoja]
+
+
+# ==============================
+# STREAMING POR BLOQUES
+# ==============================
+def _tipos_bloque(df: pd.DataFrame) -> dict:
+    """
+    Tipos fijos para todos los bloques, tomados del primero: fechas en
+    datetime64[us] (como pd.read_excel), claves con el tipo que les dio
+    tipar, otras columnas numéricas en float64 (un bloque con vacíos no
+    alterna int/float ni pasa a object) y el resto object. Las categóricas
+    no se fijan: tipar ya les da las categorías del esquema.
+    """
+    tipos = {}
+    for col, tipo in df.dtypes.items():
+        if isinstance(tipo, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_datetime64_dtype(tipo):
+            tipos[col] = np.dtype("datetime64[us]")
+        elif col in CLAVES:
+            tipos[col] = tipo
+        elif pd.api.types.is_numeric_dtype(tipo):
+            tipos[col] = np.dtype(np.float64)
+        else:
+            tipos[col] = np.dtype(object)
+    return tipos
+
+def _fijar_tipos(df: pd.DataFrame, tipos: dict) -> pd.DataFrame:
+    for col, tipo in tipos.items():
+        if df[col].dtype != tipo:
+            try:
+                df[col] = df[col].astype(tipo)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Columna {col}: el bloque no se puede llevar al tipo {tipo} "
+                                 f"fijado por el primer bloque") from e
+    return df
+
+def firma_tipos(df: pd.DataFrame) -> list:
+    """Tipo de cada columna para comparar bloques (las categóricas cuentan como "category")."""
+    return [(col, "category" if isinstance(t, pd.CategoricalDtype) else str(t))
+            for col, t in df.dtypes.items()]
+
+def _a_columnas(filas: list, nombres: list, indices: list, utc: bool = None, tipos: dict = None):
+    """
+    Bloque de filas -> (DataFrame tipado, utc, tipos); transpone solo las
+    columnas pedidas. utc/tipos en None se deciden con este bloque (el
+    primero) y se devuelven para aplicarlos igual a los siguientes.
+    """
+    if not filas:
+        crudo = pd.DataFrame({c: pd.Series(dtype=object) for c in nombres})
+    else:
+        ancho = max(indices) + 1
+        filas = [f if len(f) >= ancho else f + (None,) * (ancho - len(f)) for f in filas]
+        if len(indices) == 1:
+            columnas = [[f[indices[0]] for f in filas]]
+        else:
+            columnas = zip(*map(itemgetter(*indices), filas))
+        # pandas infiere el tipo de cada columna (datetime, float, texto) y tipar aplica el esquema
+        crudo = pd.DataFrame({c: list(v) for c, v in zip(nombres, columnas)})
+    df = tipar(crudo, utc=False)
+    if utc is None:
+        utc = utc_heredado(df)
+    if utc:
+        df = tipar(df, utc=True)
+    if tipos is None:
+        tipos = _tipos_bloque(df)
+    return _fijar_tipos(df, tipos), utc, tipos
+
+def iterar_hoja(origen, hoja=0, filas: int = TAM_BLOQUE_EXCEL, columnas=None):
+    """
+    Bloques tipados de una hoja a medida que se leen. origen: ruta o libro
+    ya abierto (abrir_libro) para no reabrir el zip entre hojas. La primera
+    fila es el encabezado; columnas proyecta (las demás no se materializan).
+    """
+    libro = abrir_libro(origen) if isinstance(origen, (str, os.PathLike)) else origen
+    try:
+        filas_hoja = _hoja(libro, hoja).iter_rows(values_only=True)
+        encabezado = next(filas_hoja, None)
+        if encabezado is None:
+            return
+        encabezado = [str(c) for c in encabezado]
+        nombres = encabezado if columnas is None else list(columnas)
+        faltan = [c for c in nombres if c not in encabezado]
+        if faltan:
+            raise KeyError(f"Columnas no encontradas en la hoja {hoja}: {faltan}")
+        indices = [encabezado.index(c) for c in nombres]
+
+        buffer, emitidas = [], 0
+        utc = tipos = firma = None
+        for fila in filas_hoja:
+            if not any(v is not None for v in fila):
+                continue  # filas vacías al final de la hoja
+            buffer.append(fila)
+            if len(buffer) >= filas:
+                with etapa("ingesta_excel.bloque", filas=len(buffer), hoja=str(hoja)):
+                    df, utc, tipos = _a_columnas(buffer, nombres, indices, utc, tipos)
+                if firma is None:
+                    firma = firma_tipos(df)
+                elif firma_tipos(df) != firma:
+                    raise ValueError(f"Hoja {hoja}: el bloque desde la fila {emitidas} cambió de tipos")
+                df.index = pd.RangeIndex(emitidas, emitidas + len(df))
+                emitidas += len(df)
+                buffer = []
+                yield df
+        if buffer or emitidas == 0:
+            df, _, _ = _a_columnas(buffer, nombres, indices, utc, tipos)
+            if firma is not None and firma_tipos(df) != firma:
+                raise ValueError(f"Hoja {hoja}: el bloque desde la fila {emitidas} cambió de tipos")
+            df.index = pd.RangeIndex(emitidas, emitidas + len(df))
+            yield df
+    finally:
+        if libro is not origen:
+            libro.close()
+
+
+# ==============================
+# HOJAS Y ARCHIVOS COMPLETOS
+# ==============================
+def _concatenar(bloques) -> pd.DataFrame:
+    bloques = list(bloques)
+    if not bloques:  # hoja sin encabezado
+        return pd.DataFrame()
+    # mismos tipos en todos los bloques; tipar solo une las categorías
+    return bloques[0] if len(bloques) == 1 else tipar(pd.concat(bloques, ignore_index=True), utc=False)
+
+def leer_hoja(ruta: str, hoja=0, columnas=None) -> pd.DataFrame:
+    """Hoja completa (los bloques de iterar_hoja concatenados)."""
+    with etapa("ingesta_excel.leer_hoja", ruta=str(ruta), hoja=str(hoja)) as m:
+        df = _concatenar(iterar_hoja(ruta, hoja, columnas=columnas))
+        m.filas = len(df)
+    return df
+
+def _workers(workers, tareas: int) -> int:
+    """Procesos a usar: workers=None -> uno por núcleo; nunca más que tareas."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, tareas))
+
+def leer_hojas(ruta: str, hojas=None, workers: int = 1) -> dict:
+    """
+    {hoja: DataFrame} de un libro. Con un worker el libro se abre una sola
+    vez para todas las hojas; con varios, cada proceso parsea una hoja
+    (el modo read_only solo lee del zip la hoja pedida).
+    """
+    if hojas is None:
+        libro = abrir_libro(ruta)
+        hojas = libro.sheetnames
+        libro.close()
+    hojas = list(hojas)
+    workers = _workers(workers, len(hojas))
+    if workers == 1:
+        libro = abrir_libro(ruta)
+        try:
+            return {h: _concatenar(iterar_hoja(libro, h)) for h in hojas}
+        finally:
+            libro.close()
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return dict(zip(hojas, ex.map(leer_hoja, [ruta] * len(hojas), hojas)))
+
+def leer_archivos(rutas, hoja=0, workers: int = 1) -> dict:
+    """{ruta: DataFrame} de una hoja de varios archivos (en paralelo si workers > 1)."""
+    rutas = list(rutas)
+    workers = _workers(workers, len(rutas))
+    if workers == 1:
+        return {r: leer_hoja(r, hoja) for r in rutas}
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return dict(zip(rutas, ex.map(leer_hoja, rutas, [hoja] * len(rutas))))
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    ruta = sys.argv[1] if len(sys.argv) > 1 else "legaltech_pset_solicitudes.xlsx"
+    t0 = time.perf_counter()
+    tablas = leer_hojas(ruta)
+    print(f"{ruta}: {', '.join(f'{h} ({len(df)} filas)' for h, df in tablas.items())} "
+          f"en {time.perf_counter() - t0:.2f} s")
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentación opcional por etapa (tiempo, filas, memoria)
+
+Apagada por defecto: etapa() devuelve un contexto vacío compartido y el
+costo es una comparación por llamada. Se activa con:
+  - la variable de entorno LEGALTECH_TRAZA=<archivo.jsonl>, o
+  - activar(ruta=..., callback=...) desde código
+
+Cada etapa emite un evento (dict) al cerrarse:
+    {"etapa": "calculador1.fases.registro_a_informacion", "padre": "...",
+     "segundos": 0.012, "filas": 100000, "rss_mb": 412.3, "delta_rss_mb": 3.1,
+     "inicio": 1718000000.123, "error": null}
+que se agrega como línea JSON al archivo y/o se pasa al callback.
+
+Uso:
+    from instrumentacion import etapa
+    with etapa("combinador.merge", filas=len(df)) as m:
+        ...
+        m.filas = len(resultado)  # se puede fijar al final
+"""
+
+import json
+import os
+import threading
+import time
+
+_ESTADO = {"activa": False, "ruta": None, "callback": None}
+_LOCK = threading.Lock()
+_PILA = threading.local()
+
+try:
+    _PAGINA = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGINA = 4096
+
+
+def rss_mb():
+    """RSS actual del proceso en MB (Linux, /proc); None si no se puede leer."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGINA / (1 << 20)
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+# ==============================
+# ACTIVACIÓN
+# ==============================
+def activar(ruta: str = None, callback=None):
+    """Activa la traza: JSON Lines en ruta y/o callback(evento)."""
+    _ESTADO.update(activa=bool(ruta or callback), ruta=ruta, callback=callback)
+
+def desactivar():
+    _ESTADO.update(activa=False, ruta=None, callback=None)
+
+def activa() -> bool:
+    return _ESTADO["activa"]
+
+if os.environ.get("LEGALTECH_TRAZA"):
+    activar(os.environ["LEGALTECH_TRAZA"])
+
+
+# ==============================
+# ETAPAS
+# ==============================
+class _Nula:
+    """Contexto vacío cuando la instrumentación está apagada."""
+    filas = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, nombre, valor):
+        pass  # m.filas = ... no tiene efecto
+
+_NULA = _Nula()
+
+
+class _Etapa:
+    def __init__(self, nombre: str, filas, extra: dict):
+        self.nombre = nombre
+        self.filas = filas
+        self.extra = extra
+
+    def __enter__(self):
+        pila = getattr(_PILA, "nombres", None)
+        if pila is None:
+            pila = _PILA.nombres = []
+        self.padre = pila[-1] if pila else None
+        pila.append(self.nombre)
+        self.inicio = time.time()
+        self.rss_inicio = rss_mb()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        segundos = time.perf_counter() - self.t0
+        _PILA.nombres.pop()
+        rss = rss_mb()
+        evento = {
+            "etapa": self.nombre,
+            "padre": self.padre,
+            "segundos": round(segundos, 6),
+            "filas": None if self.filas is None else int(self.filas),
+            "rss_mb": None if rss is None else round(rss, 1),
+            "delta_rss_mb": None if rss is None or self.rss_inicio is None else round(rss - self.rss_inicio, 1),
+            "inicio": round(self.inicio, 3),
+            "pid": os.getpid(),
+            "error": None if tipo is None else tipo.__name__,
+        }
+        evento.update(self.extra)
+        emitir(evento)
+        return False
+
+
+def etapa(nombre: str, filas=None, **extra):
+    """Contexto que mide una etapa; no hace nada si la instrumentación está apagada."""
+    if not _ESTADO["activa"]:
+        return _NULA
+    return _Etapa(nombre, filas, extra)
+
+def emitir(evento: dict):
+    ruta, callback = _ESTADO["ruta"], _ESTADO["callback"]
+    if ruta:
+        linea = json.dumps(evento, ensure_ascii=False, default=str)
+        with _LOCK, open(ruta, "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+    if callback:
+        callback(evento)
+
+def leer_traza(ruta: str):
+    """Eventos de un archivo de traza (lista de dicts)."""
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
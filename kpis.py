@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Agregador de KPIs por bloques (mergeable)
+
+Para cada columna de tiempos mantiene:
+  - Momentos: cantidad, media, varianza (fórmula de Chan por lotes), min, max
+  - BocetoCuantiles: buckets logarítmicos (estilo DDSketch) con error
+    relativo alfa: cualquier cuantil estimado q̂ cumple |q̂ - q| <= alfa·|q|
+
+Los dos se actualizan con lotes de filas (vectorizado, np.bincount) y se
+combinan sumando: resultados parciales de distintos archivos o procesos
+dan el mismo resumen que una sola pasada. a_dict()/desde_dict() permiten
+guardarlos en JSON para combinarlos después.
+
+Uso:
+    agg = AgregadorKPI(["tiempo_total"], alfa=0.01)
+    for bloque in iterar_bloques("merge_total.parquet"):
+        agg.consumir(calcular_tiempos(bloque))
+    print(agg.resumen())
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+ALFA = 0.01  # error relativo de los cuantiles
+CUANTILES = (0.5, 0.9, 0.99)
+
+
+# ==============================
+# MOMENTOS
+# ==============================
+class Momentos:
+    """
+    Cantidad, media, M2 (suma de cuadrados centrada), mínimo y máximo, y si
+    todos los valores vistos son enteros (p. ej. días con .dt.days).
+    """
+
+    def __init__(self, n: int = 0, media: float = 0.0, m2: float = 0.0,
+                 minimo: float = math.inf, maximo: float = -math.inf, enteros: bool = True):
+        self.n, self.media, self.m2 = n, media, m2
+        self.minimo, self.maximo = minimo, maximo
+        self.enteros = enteros
+
+    def agregar(self, valores):
+        x = np.asarray(valores, dtype=np.float64)
+        x = x[~np.isnan(x)]
+        if len(x):
+            lote = Momentos(len(x), float(x.mean()), float(((x - x.mean()) ** 2).sum()),
+                            float(x.min()), float(x.max()), bool((x == np.round(x)).all()))
+            self.combinar(lote)
+        return self
+
+    def combinar(self, otro: "Momentos"):
+        """Chan et al.: media y M2 de la unión a partir de las de cada parte."""
+        if otro.n == 0:
+            return self
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        self.media += delta * otro.n / n
+        self.m2 += otro.m2 + delta * delta * self.n * otro.n / n
+        self.n = n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self.enteros = self.enteros and otro.enteros
+        return self
+
+    @property
+    def varianza(self) -> float:
+        """Varianza muestral (ddof=1, como pandas)."""
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    def a_dict(self) -> dict:
+        return {"n": self.n, "media": self.media, "m2": self.m2,
+                "minimo": self.minimo, "maximo": self.maximo, "enteros": self.enteros}
+
+    @classmethod
+    def desde_dict(cls, d: dict) -> "Momentos":
+        # los guardados antes de registrar "enteros" no se redondean
+        return cls(d["n"], d["media"], d["m2"], d["minimo"], d["maximo"], d.get("enteros", False))
+
+
+# ==============================
+# BUCKETS LOGARÍTMICOS
+# ==============================
+# Esquema compartido con cubo.py: x > 0 cae en el bucket ceil(log_gamma(x)),
+# cuyo representante está a error relativo <= alfa de todo valor del bucket.
+def gamma_de(alfa: float) -> float:
+    if not 0 < alfa < 1:
+        raise ValueError(f"alfa debe estar en (0, 1): {alfa}")
+    return (1 + alfa) / (1 - alfa)
+
+def indice_bucket(x, gamma: float) -> np.ndarray:
+    """Bucket de cada x > 0."""
+    return np.ceil(np.log(np.asarray(x, dtype=np.float64)) / math.log(gamma)).astype(np.int64)
+
+def valor_bucket(i, gamma: float) -> np.ndarray:
+    """Representante del bucket i (media armónica de sus bordes)."""
+    return 2 * gamma ** np.asarray(i, dtype=np.float64) / (gamma + 1)
+
+def posicion_cuantil(acumulado, base, total, q: float, ultimo) -> np.ndarray:
+    """
+    Posición del bucket con el cuantil q en conteos ordenados por valor
+    (acumulado = su suma acumulada). Vectorizado por grupos contiguos:
+    base = acumulado antes del grupo, total = conteo del grupo, ultimo =
+    última posición del grupo. Convención de rango de numpy/pandas
+    (q·(n-1)), redondeada al bucket.
+    """
+    objetivo = np.asarray(base) + q * (np.asarray(total) - 1)
+    return np.minimum(np.searchsorted(acumulado, objetivo, side="right"), ultimo)
+
+def acotar(valores, minimo, maximo):
+    """Cuantiles estimados llevados a [mínimo, máximo] observados (NaN queda NaN)."""
+    valores = np.asarray(valores, dtype=np.float64)
+    return np.where(np.isnan(valores), valores, np.fmin(np.fmax(valores, minimo), maximo))
+
+
+# ==============================
+# BOCETO DE CUANTILES
+# ==============================
+class _Buckets:
+    """Conteos densos por índice de bucket, con desplazamiento que crece según haga falta."""
+
+    def __init__(self, inicio: int = 0, conteos=None):
+        self.inicio = inicio
+        self.conteos = np.zeros(0, dtype=np.int64) if conteos is None else np.asarray(conteos, dtype=np.int64)
+
+    def sumar(self, inicio: int, conteos: np.ndarray):
+        if len(conteos) == 0:
+            return
+        if len(self.conteos) == 0:
+            self.inicio, self.conteos = inicio, conteos.astype(np.int64).copy()
+            return
+        lo = min(self.inicio, inicio)
+        hi = max(self.inicio + len(self.conteos), inicio + len(conteos))
+        if lo != self.inicio or hi != self.inicio + len(self.conteos):
+            nuevo = np.zeros(hi - lo, dtype=np.int64)
+            nuevo[self.inicio - lo:self.inicio - lo + len(self.conteos)] = self.conteos
+            self.inicio, self.conteos = lo, nuevo
+        self.conteos[inicio - lo:inicio - lo + len(conteos)] += conteos
+
+    def agregar_indices(self, idx: np.ndarray):
+        if len(idx):
+            lo = int(idx.min())
+            self.sumar(lo, np.bincount(idx - lo))
+
+
+class BocetoCuantiles:
+    """
+    Buckets logarítmicos: x > 0 cae en ceil(log_gamma(x)), con
+    gamma = (1 + alfa) / (1 - alfa); el representante de cada bucket está a
+    error relativo <= alfa de todo valor del bucket. Negativos en un juego
+    de buckets aparte (sobre |x|) y ceros contados por separado.
+    """
+
+    def __init__(self, alfa: float = ALFA):
+        self.alfa = alfa
+        self.gamma = gamma_de(alfa)
+        self.positivos, self.negativos = _Buckets(), _Buckets()
+        self.ceros = 0
+
+    @property
+    def n(self) -> int:
+        return int(self.positivos.conteos.sum() + self.negativos.conteos.sum() + self.ceros)
+
+    def _indices(self, x: np.ndarray) -> np.ndarray:
+        return indice_bucket(x, self.gamma)
+
+    def agregar(self, valores):
+        x = np.asarray(valores, dtype=np.float64)
+        x = x[~np.isnan(x)]
+        self.positivos.agregar_indices(self._indices(x[x > 0]))
+        self.negativos.agregar_indices(self._indices(-x[x < 0]))
+        self.ceros += int((x == 0).sum())
+        return self
+
+    def combinar(self, otro: "BocetoCuantiles"):
+        if otro.alfa != self.alfa:
+            raise ValueError("Solo se combinan bocetos con el mismo alfa")
+        self.positivos.sumar(otro.positivos.inicio, otro.positivos.conteos)
+        self.negativos.sumar(otro.negativos.inicio, otro.negativos.conteos)
+        self.ceros += otro.ceros
+        return self
+
+    def cuantil(self, q: float) -> float:
+        """Cuantil q (0..1) con la convención de rango de numpy/pandas (lineal redondeada al bucket)."""
+        n = self.n
+        if n == 0:
+            return math.nan
+        # orden creciente: negativos (de mayor |x| a menor), ceros, positivos
+        neg, pos = self.negativos, self.positivos
+        i_neg = neg.inicio + np.arange(len(neg.conteos))[::-1]
+        valores = np.concatenate([-valor_bucket(i_neg, self.gamma), [0.0],
+                                  valor_bucket(pos.inicio + np.arange(len(pos.conteos)), self.gamma)])
+        acumulado = np.cumsum(np.concatenate([neg.conteos[::-1], [self.ceros], pos.conteos]))
+        return float(valores[posicion_cuantil(acumulado, 0, n, q, len(acumulado) - 1)])
+
+    def a_dict(self) -> dict:
+        return {"alfa": self.alfa, "ceros": self.ceros,
+                "positivos": [self.positivos.inicio, self.positivos.conteos.tolist()],
+                "negativos": [self.negativos.inicio, self.negativos.conteos.tolist()]}
+
+    @classmethod
+    def desde_dict(cls, d: dict) -> "BocetoCuantiles":
+        b = cls(d["alfa"])
+        b.ceros = d["ceros"]
+        b.positivos = _Buckets(*d["positivos"])
+        b.negativos = _Buckets(*d["negativos"])
+        return b
+
+
+# ==============================
+# AGREGADOR POR COLUMNA
+# ==============================
+class AgregadorKPI:
+    """Momentos + boceto por columna; consumir() por bloques y combinar() entre partes."""
+
+    def __init__(self, columnas, alfa: float = ALFA):
+        self.columnas = list(columnas)
+        self.alfa = alfa
+        self.momentos = {c: Momentos() for c in self.columnas}
+        self.bocetos = {c: BocetoCuantiles(alfa) for c in self.columnas}
+
+    def consumir(self, df: pd.DataFrame):
+        for c in self.columnas:
+            if c in df.columns:
+                valores = df[c].to_numpy(dtype=np.float64, na_value=np.nan)
+                self.momentos[c].agregar(valores)
+                self.bocetos[c].agregar(valores)
+        return self
+
+    def combinar(self, otro: "AgregadorKPI"):
+        for c in otro.columnas:
+            if c not in self.momentos:
+                self.columnas.append(c)
+                self.momentos[c], self.bocetos[c] = Momentos(), BocetoCuantiles(self.alfa)
+            self.momentos[c].combinar(otro.momentos[c])
+            self.bocetos[c].combinar(otro.bocetos[c])
+        return self
+
+    def cuantil(self, columna: str, q: float) -> float:
+        """
+        Cuantil q de columna acotado al rango observado: el representante del
+        bucket puede caer fuera de [mínimo, máximo] (p. ej. p100 > max). Si
+        todos los valores son enteros se redondea, para que una mediana de
+        días no salga como 29.08.
+        """
+        m = self.momentos[columna]
+        valor = self.bocetos[columna].cuantil(q)
+        if m.n == 0:
+            return valor
+        valor = float(acotar(valor, m.minimo, m.maximo))
+        return float(round(valor)) if m.enteros else valor
+
+    def resumen(self, cuantiles=CUANTILES) -> pd.DataFrame:
+        """Como describe(): filas count/mean/std/min/pNN/max, una columna por tiempo."""
+        filas = {}
+        for c in self.columnas:
+            m = self.momentos[c]
+            vacio = m.n == 0
+            fila = {"count": m.n, "mean": math.nan if vacio else m.media,
+                    "std": math.sqrt(m.varianza) if m.n > 1 else math.nan,
+                    "min": math.nan if vacio else m.minimo}
+            for q in cuantiles:
+                fila[f"p{q * 100:g}"] = self.cuantil(c, q)
+            fila["max"] = math.nan if vacio else m.maximo
+            filas[c] = fila
+        return pd.DataFrame(filas)
+
+    def a_dict(self) -> dict:
+        return {"alfa": self.alfa, "columnas": self.columnas,
+                "momentos": {c: self.momentos[c].a_dict() for c in self.columnas},
+                "bocetos": {c: self.bocetos[c].a_dict() for c in self.columnas}}
+
+    @classmethod
+    def desde_dict(cls, d: dict) -> "AgregadorKPI":
+        agg = cls(d["columnas"], d["alfa"])
+        agg.momentos = {c: Momentos.desde_dict(v) for c, v in d["momentos"].items()}
+        agg.bocetos = {c: BocetoCuantiles.desde_dict(v) for c, v in d["bocetos"].items()}
+        return agg
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline en memoria: generar -> combinar -> clasificar -> fases -> resumen
+
+Cada etapa recibe los DataFrames de la anterior sin pasar por disco y solo
+se persiste lo que se pida (--persistir). Cada etapa tiene una huella
+(sha256 de sus parámetros, del código de su módulo y de todos los módulos
+del repositorio que importa, y de las huellas de sus entradas); si la huella no cambió, la etapa se salta:
+  - dentro del proceso, reutilizando el resultado en memoria
+  - entre corridas, recargando lo persistido en la carpeta de salida
+    (<etapa>.parquet o carpeta de tablas + <etapa>.huella)
+
+Uso:
+    python pipeline.py --solicitudes 100000 --persistir fases
+    python pipeline.py --origen legaltech_pset_solicitudes.xlsx --persistir todo
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+from datetime import date
+
+import pandas as pd
+
+from datos import HOJAS, cargar, cargar_tablas, guardar, tipar
+
+ETAPAS = ["generar", "combinar", "clasificar", "fases", "resumen"]
+
+# Módulo de cada etapa: su código y el de todo lo que importa del
+# repositorio (transitivamente) entra en la huella
+MODULOS = {
+    "generar": "generador",
+    "combinar": "combinador",
+    "clasificar": "estados",
+    "fases": "calculador1",
+    "resumen": "analisis1_tiempos",
+}
+# con --origen las tablas se cargan en vez de generarse
+MODULO_ORIGEN = "datos"
+
+_BASE = os.path.dirname(os.path.abspath(__file__))
+
+# Nombre de lo persistido por etapa (generar es una carpeta con una tabla por hoja)
+SALIDAS = {
+    "generar": "tablas",
+    "combinar": "merge_total.parquet",
+    "clasificar": "merge_clasificado.parquet",
+    "fases": "merge_con_fases_tiempo_seg.parquet",
+    "resumen": "merge_con_tiempos.parquet",
+}
+
+DIRECTORIO_SALIDA = "pipeline_salida"
+
+
+# ==============================
+# HUELLAS
+# ==============================
+def _importados(nombre: str) -> set:
+    """Módulos del repositorio que importa nombre.py (también los imports dentro de funciones)."""
+    with open(os.path.join(_BASE, nombre + ".py"), "rb") as f:
+        arbol = ast.parse(f.read())
+    nombres = set()
+    for nodo in ast.walk(arbol):
+        if isinstance(nodo, ast.Import):
+            nombres.update(a.name.split(".")[0] for a in nodo.names)
+        elif isinstance(nodo, ast.ImportFrom) and nodo.module and not nodo.level:
+            nombres.add(nodo.module.split(".")[0])
+    return {n for n in nombres if os.path.isfile(os.path.join(_BASE, n + ".py"))}
+
+def modulos_locales(raiz: str) -> list:
+    """raiz y todos los módulos del repositorio que alcanza por imports, ordenados."""
+    vistos, pendientes = set(), [raiz]
+    while pendientes:
+        nombre = pendientes.pop()
+        if nombre not in vistos:
+            vistos.add(nombre)
+            pendientes.extend(_importados(nombre) - vistos)
+    return sorted(vistos)
+
+def _huella_codigo(raiz: str) -> str:
+    """sha256 del código de raiz y de sus imports locales (nombre + contenido de cada archivo)."""
+    h = hashlib.sha256()
+    for nombre in modulos_locales(raiz):
+        h.update(nombre.encode("utf-8") + b"\0")
+        with open(os.path.join(_BASE, nombre + ".py"), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def _huella_origen(origen: str) -> str:
+    """Huella de un archivo o carpeta de entrada por (ruta, tamaño, mtime)."""
+    rutas = [origen]
+    if os.path.isdir(origen):
+        rutas = sorted(os.path.join(d, f) for d, _, fs in os.walk(origen) for f in fs)
+    partes = []
+    for r in rutas:
+        st = os.stat(r)
+        partes.append(f"{os.path.abspath(r)}|{st.st_size}|{st.st_mtime_ns}")
+    return hashlib.sha256("\n".join(partes).encode("utf-8")).hexdigest()
+
+def huella(etapa: str, parametros: dict, entradas=(), modulo: str = None) -> str:
+    codigo = _huella_codigo(modulo or MODULOS[etapa])
+    datos = json.dumps({"etapa": etapa, "parametros": parametros, "entradas": list(entradas),
+                        "codigo": codigo}, sort_keys=True, default=str)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+# ==============================
+# ETAPAS
+# ==============================
+# Todas son funciones puras: no modifican sus entradas (copias superficiales)
+
+def etapa_generar(parametros: dict) -> dict:
+    if parametros.get("origen"):
+        return cargar_tablas(parametros["origen"])
+    from generador import generar_dataset
+    df_solicitantes, df_solicitudes, df_tramite, _ = generar_dataset(
+        parametros["seed"], parametros["n_solicitantes"], parametros["n_solicitudes"],
+        parametros["desde"], parametros["hasta"], workers=parametros["workers"])
+    # mismo esquema que al recargar las tablas desde disco (fechas locales sin tz)
+    return {hoja: tipar(df) for hoja, df in zip(HOJAS, (df_solicitantes, df_solicitudes, df_tramite))}
+
+def etapa_combinar(tablas: dict) -> pd.DataFrame:
+    from combinador import combinar
+    return combinar(tablas["Solicitantes"], tablas["SolicitudesRecibidas"], tablas["TramiteSolicitudes"])
+
+def etapa_clasificar(df: pd.DataFrame) -> pd.DataFrame:
+    from estados import clasificar_estado
+    return df.assign(estado_proceso=clasificar_estado(df))
+
+def etapa_fases(df: pd.DataFrame) -> pd.DataFrame:
+    from calculador1 import calcular_fases
+    return calcular_fases(df.copy(deep=False))
+
+def etapa_resumen(df: pd.DataFrame) -> pd.DataFrame:
+    from analisis1_tiempos import analizar_tiempos_tramite
+    return analizar_tiempos_tramite(df.copy(deep=False))
+
+FUNCIONES = {
+    "generar": etapa_generar,
+    "combinar": etapa_combinar,
+    "clasificar": etapa_clasificar,
+    "fases": etapa_fases,
+    "resumen": etapa_resumen,
+}
+
+
+# ==============================
+# PERSISTENCIA
+# ==============================
+def _guardar_etapa(etapa: str, resultado, directorio: str, h: str):
+    ruta = os.path.join(directorio, SALIDAS[etapa])
+    os.makedirs(directorio, exist_ok=True)
+    if etapa == "generar":
+        os.makedirs(ruta, exist_ok=True)
+        for hoja, df in resultado.items():
+            guardar(df, os.path.join(ruta, hoja + ".parquet"))
+    else:
+        guardar(resultado, ruta)
+    # la huella se escribe al final: si falta, lo persistido no vale
+    with open(os.path.join(directorio, etapa + ".huella"), "w") as f:
+        f.write(h)
+
+def _leer_huella(directorio: str, etapa: str):
+    ruta = os.path.join(directorio, etapa + ".huella")
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta) as f:
+        return f.read().strip()
+
+def _cargar_etapa(etapa: str, directorio: str, h: str):
+    """Lo persistido si su huella coincide con h; None si no."""
+    if _leer_huella(directorio, etapa) != h:
+        return None
+    ruta = os.path.join(directorio, SALIDAS[etapa])
+    if not os.path.exists(ruta):
+        return None
+    if etapa == "generar":
+        return cargar_tablas(ruta)
+    return cargar(ruta)
+
+
+# ==============================
+# PIPELINE
+# ==============================
+class Pipeline:
+    """
+    Corre las etapas en orden pasando los resultados en memoria. Se puede
+    llamar a ejecutar() varias veces (p. ej. tras cambiar el origen o el
+    código de una etapa): solo se recalcula desde la primera etapa cuya
+    huella cambió.
+    """
+
+    def __init__(self, origen: str = None, seed: int = None, n_solicitantes: int = None,
+                 n_solicitudes: int = None, desde: date = None, hasta: date = None,
+                 workers: int = 1, directorio: str = DIRECTORIO_SALIDA, persistir=()):
+        if seed is None:
+            from generador import SEED
+            seed = SEED
+        if origen is None and desde is None:
+            from generador import default_span
+            desde, hasta = default_span()
+        self.parametros = {"origen": origen, "seed": seed, "n_solicitantes": n_solicitantes,
+                           "n_solicitudes": n_solicitudes, "desde": desde, "hasta": hasta,
+                           "workers": workers}
+        self.directorio = directorio
+        self.persistir = set(ETAPAS if "todo" in persistir else persistir)
+        self.resultados = {}  # etapa -> (huella, resultado)
+        self.registro = []    # (etapa, "calculada" | "en memoria" | "desde disco") de la última corrida
+
+    def _huella_generar(self) -> str:
+        p = dict(self.parametros)
+        if p["origen"]:
+            # con origen, el resto de parámetros no aplica; cuenta el código de carga
+            return huella("generar", {"origen": _huella_origen(p["origen"])}, modulo=MODULO_ORIGEN)
+        p.pop("workers")  # no cambia el resultado
+        return huella("generar", p)
+
+    def huellas(self, hasta_etapa: str = "resumen") -> dict:
+        """Huella de cada etapa hasta hasta_etapa; no necesita los datos."""
+        hs, h = {}, None
+        for etapa in ETAPAS[:ETAPAS.index(hasta_etapa) + 1]:
+            h = self._huella_generar() if etapa == "generar" else huella(etapa, {}, [h])
+            hs[etapa] = h
+        return hs
+
+    def _disponible(self, etapa: str, h: str):
+        """Resultado ya disponible (en memoria o en disco) y de dónde vino; (None, None) si no."""
+        previo = self.resultados.get(etapa)
+        if previo is not None and previo[0] == h:
+            return previo[1], "en memoria"
+        resultado = _cargar_etapa(etapa, self.directorio, h)
+        if resultado is not None:
+            self.resultados[etapa] = (h, resultado)
+            return resultado, "desde disco"
+        return None, None
+
+    def ejecutar(self, hasta_etapa: str = "resumen"):
+        """
+        Corre hasta hasta_etapa (inclusive) y devuelve su resultado. Parte
+        de la última etapa vigente (en memoria o persistida); las
+        anteriores ni se cargan, salvo que se pida persistir alguna que
+        todavía no esté en disco.
+        """
+        hs = self.huellas(hasta_etapa)
+        etapas = list(hs)
+        faltan = [e for e in etapas if e in self.persistir
+                  and _leer_huella(self.directorio, e) != hs[e]]
+        limite = etapas.index(faltan[0]) if faltan else len(etapas) - 1
+
+        self.registro = []
+        inicio, resultado = 0, None
+        for i in range(limite, -1, -1):
+            resultado, origen = self._disponible(etapas[i], hs[etapas[i]])
+            if resultado is not None:
+                self.registro.append((etapas[i], origen))
+                inicio = i + 1
+                break
+
+        for etapa in etapas[inicio:]:
+            entrada = self.parametros if etapa == "generar" else resultado
+            resultado = FUNCIONES[etapa](entrada)
+            self.resultados[etapa] = (hs[etapa], resultado)
+            if etapa in self.persistir:
+                _guardar_etapa(etapa, resultado, self.directorio, hs[etapa])
+            self.registro.append((etapa, "calculada"))
+        return resultado
+
+
+# ==============================
+# CLI
+# ==============================
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Pipeline en memoria LegalTech PSET - Solicitudes")
+    p.add_argument("--origen", default=None,
+                   help="xlsx o carpeta con las tablas; si se omite, se generan con generador.py")
+    p.add_argument("--solicitantes", type=int, default=None)
+    p.add_argument("--solicitudes", type=int, default=None)
+    p.add_argument("--desde", type=date.fromisoformat, default=None)
+    p.add_argument("--hasta", type=date.fromisoformat, default=None)
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--hasta-etapa", choices=ETAPAS, default="resumen")
+    p.add_argument("--persistir", nargs="*", choices=ETAPAS + ["todo"], default=[],
+                   help="etapas a guardar en --salida (también habilita saltarlas en la próxima corrida)")
+    p.add_argument("--salida", default=DIRECTORIO_SALIDA)
+    args = p.parse_args(argv)
+    if (args.desde is None) != (args.hasta is None):
+        p.error("--desde y --hasta van juntos")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    pipeline = Pipeline(args.origen, args.seed, args.solicitantes, args.solicitudes,
+                        args.desde, args.hasta, args.workers, args.salida, args.persistir)
+    pipeline.ejecutar(args.hasta_etapa)
+    print()
+    for etapa, origen in pipeline.registro:
+        print(f"{etapa:<12}{origen}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
-import pandas as pd
+from datos import cargar, guardar
+from estados import clasificar_estado
+from instrumentacion import etapa
 
-# Ruta del archivo Excel
+# Ruta del archivo (xlsx, parquet o feather)
 ruta_excel = "dataset.xlsx"  # cámbiala por la ubicación real
 
-# Leer la hoja 'TramiteSolicitudes'
-df = pd.read_excel(ruta_excel, sheet_name="TramiteSolicitudes")
+RUTA_SALIDA = "TramiteSolicitudes_actualizado.parquet"
+RUTA_EXCEL = None  # p. ej. "TramiteSolicitudes_actualizado.xlsx"
 
 # Definir la función equivalente a la fórmula de Excel
+# (referencia fila a fila; el script usa estados.clasificar_estado)
 def calcular_estado_total(row):
     if row["estado_registro"] == "pendiente":
         return "en proceso en registro"
@@ -17,12 +20,19 @@ def calcular_estado_total(row):
     else:
         return "finalizado"
 
-# Crear nueva columna aplicando la lógica
-df["estado_total_calculado"] = df.apply(calcular_estado_total, axis=1)
 
-# Mostrar los primeros registros para verificar
-print(df.head())
+if __name__ == "__main__":
+    # Leer la hoja 'TramiteSolicitudes'
+    df = cargar(ruta_excel, hoja="TramiteSolicitudes")
 
-# (Opcional) Guardar el resultado en un nuevo archivo
-df.to_excel("TramiteSolicitudes_actualizado.xlsx", index=False)
+    # Crear nueva columna aplicando la lógica (vectorizada, sin df.apply)
+    with etapa("prueba.clasificar_estado", filas=len(df)):
+        df["estado_total_calculado"] = clasificar_estado(df)
 
+    # Mostrar los primeros registros para verificar
+    print(df.head())
+
+    # Guardar el resultado (Parquet; Excel opcional)
+    guardar(df, RUTA_SALIDA)
+    if RUTA_EXCEL:
+        guardar(df, RUTA_EXCEL)
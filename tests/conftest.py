@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Fixtures compartidas: un dataset chico del generador, tipado como al recargarlo."""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from combinador import combinar  # noqa: E402
+from esquema import HOJAS, tipar  # noqa: E402
+from generador import generar_dataset  # noqa: E402
+
+SEED = 7
+PARAMETROS = dict(n_solicitantes=150, n_solicitudes=400, desde=date(2024, 1, 1), hasta=date(2024, 6, 30),
+                  dias_por_bloque=20)
+
+
+@pytest.fixture(scope="session")
+def tablas():
+    generadas = generar_dataset(SEED, workers=1, **PARAMETROS)[:3]
+    return {hoja: tipar(df) for hoja, df in zip(HOJAS, generadas)}
+
+
+@pytest.fixture(scope="session")
+def merge(tablas):
+    return combinar(tablas["Solicitantes"], tablas["SolicitudesRecibidas"], tablas["TramiteSolicitudes"])
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from calendario import BUSINESS_END, BUSINESS_START, business_seconds, fixed_holidays_peru
+
+
+def _segundos_habiles(inicio: datetime, fin: datetime) -> float:
+    """Referencia: recorre día por día sumando el solape con la jornada."""
+    signo = 1
+    if fin < inicio:
+        inicio, fin, signo = fin, inicio, -1
+    total, dia = 0.0, inicio.date()
+    while dia <= fin.date():
+        if dia.weekday() < 5 and dia not in fixed_holidays_peru(dia.year):
+            desde = max(inicio, datetime.combine(dia, BUSINESS_START))
+            hasta = min(fin, datetime.combine(dia, BUSINESS_END))
+            total += max((hasta - desde).total_seconds(), 0)
+        dia += timedelta(days=1)
+    return signo * total
+
+
+def test_business_seconds_contra_fuerza_bruta():
+    rng = np.random.default_rng(0)
+    base = pd.Timestamp("2023-12-20").value // 10**9
+    inicio = pd.to_datetime(base + rng.integers(0, 40 * 86400, 400), unit="s")
+    fin = inicio + pd.to_timedelta(rng.integers(-5 * 86400, 30 * 86400, 400), unit="s")
+    obtenido = business_seconds(inicio.to_numpy(), fin.to_numpy())
+    esperado = [_segundos_habiles(a.to_pydatetime(), b.to_pydatetime()) for a, b in zip(inicio, fin)]
+    np.testing.assert_array_equal(obtenido, esperado)
+
+
+def test_bordes_de_jornada_y_feriados():
+    t = pd.to_datetime(["2024-07-26 07:00", "2024-07-26 18:00", "2024-07-30 08:30",
+                        "2024-07-26 12:00", "2024-07-26 12:00"])
+    f = pd.to_datetime(["2024-07-26 08:00", "2024-07-29 10:00", "2024-07-30 17:30",
+                        "2024-07-26 12:00", "2024-07-30 12:00"])
+    # 28 y 29 de julio son feriados: del viernes 18:00 al lunes 29 no hay jornada
+    np.testing.assert_array_equal(business_seconds(t.to_numpy(), f.to_numpy()),
+                                  [0, 0, 9 * 3600, 0, (5.5 + 3.5) * 3600])
+
+
+def test_nat_da_nan():
+    t = np.array(["2024-03-01T10:00", "NaT"], dtype="datetime64[s]")
+    f = np.array(["NaT", "2024-03-01T12:00"], dtype="datetime64[s]")
+    assert np.isnan(business_seconds(t, f)).all()
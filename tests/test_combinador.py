@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from combinador import buscar_posiciones, combinar, iter_combinado
+
+
+def _referencia(solicitantes, solicitudes, tramite) -> pd.DataFrame:
+    return (solicitudes
+            .merge(solicitantes, on="codigo_solicitante", how="left")
+            .merge(tramite, on="codigo_solicitud", how="left"))
+
+
+def _comparar(resultado, esperado):
+    pd.testing.assert_frame_equal(resultado, esperado[list(resultado.columns)], check_dtype=False,
+                                  check_categorical=False)
+
+
+def test_join_posicional_igual_a_merge(tablas):
+    partes = tablas["Solicitantes"], tablas["SolicitudesRecibidas"], tablas["TramiteSolicitudes"]
+    _comparar(combinar(*partes), _referencia(*partes))
+
+
+def test_claves_desordenadas_y_faltantes(tablas):
+    rng = np.random.default_rng(0)
+    solicitantes = tablas["Solicitantes"].sample(frac=0.8, random_state=1)  # faltan solicitantes
+    tramite = tablas["TramiteSolicitudes"].sample(frac=0.5, random_state=2)
+    solicitudes = tablas["SolicitudesRecibidas"].iloc[rng.permutation(len(tablas["SolicitudesRecibidas"]))]
+    _comparar(combinar(solicitantes, solicitudes, tramite).reset_index(drop=True),
+              _referencia(solicitantes, solicitudes, tramite))
+
+
+def test_por_bloques_igual_a_una_pasada(tablas):
+    partes = tablas["Solicitantes"], tablas["SolicitudesRecibidas"], tablas["TramiteSolicitudes"]
+    bloques = list(iter_combinado(*partes, tam_bloque=37))
+    assert len(bloques) > 1
+    pd.testing.assert_frame_equal(pd.concat(bloques, ignore_index=True), combinar(*partes))
+
+
+def test_buscar_posiciones_dispersas_y_duplicadas():
+    claves = pd.Series([10_000_000, 5, 7], dtype="int32")
+    assert buscar_posiciones(claves, pd.Series([7, 3, 10_000_000])).tolist() == [2, -1, 0]
+    with pytest.raises(ValueError):
+        buscar_posiciones(pd.Series([5, 5]), pd.Series([5]))
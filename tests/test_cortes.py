@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from backlog import ETAPAS_COLA, backlog
+from cortes import EVENTOS, FASES_CORTE, fases_en_cortes, resumen_cortes
+
+
+@pytest.fixture(scope="module")
+def cortes(merge):
+    inicio = merge["fecha_presentacion"].min().normalize() - pd.Timedelta(days=3)
+    return pd.date_range(inicio, periods=40, freq="5D") + pd.Timedelta(hours=23, minutes=59, seconds=59)
+
+
+def _fase(fila, corte):
+    """Referencia por fila: eventos ocurridos al corte, en orden y sin saltar faltantes."""
+    entrada = None
+    k = 0
+    for col in EVENTOS:
+        t = fila[col]
+        if pd.isna(t):
+            break
+        t = t if entrada is None else max(entrada, t)
+        if t > corte:
+            break
+        entrada, k = t, k + 1
+    if k == 2 and fila["resultado_evaluacion"] == "no_cumple":
+        return "cerrado_en_evaluacion", (corte - entrada).total_seconds()
+    if k == 0:
+        return FASES_CORTE[0], np.nan
+    return FASES_CORTE[k], (corte - entrada).total_seconds()
+
+
+def test_fases_en_cortes_contra_fuerza_bruta(merge, cortes):
+    largo = fases_en_cortes(merge, cortes)
+    esperado = [_fase(fila, c) for _, fila in merge.iterrows() for c in cortes]
+    assert largo["fase"].astype(str).tolist() == [f for f, _ in esperado]
+    np.testing.assert_allclose(largo["edad_fase_seg"], [e for _, e in esperado])
+
+
+def test_resumen_cortes_igual_a_agrupar_la_tabla_larga(merge, cortes):
+    largo = fases_en_cortes(merge, cortes)
+    esperado = largo.groupby(["corte", "fase"], observed=False).agg(
+        expedientes=("codigo_solicitud", "size"), edad_media_fase_seg=("edad_fase_seg", "mean")).reset_index()
+    resumen = resumen_cortes(merge, cortes)
+    assert resumen["expedientes"].tolist() == esperado["expedientes"].tolist()
+    np.testing.assert_allclose(resumen["edad_media_fase_seg"], esperado["edad_media_fase_seg"], rtol=1e-9)
+
+
+def test_backlog_en_cola_igual_a_fases_al_cierre_del_dia(merge):
+    serie = backlog(merge, resolucion="D")
+    dias = pd.DatetimeIndex(serie["periodo"].unique())
+    cierres = dias + pd.Timedelta(days=1) - pd.Timedelta(nanoseconds=1)
+    largo = fases_en_cortes(merge, cierres)
+    conteo = largo.groupby(["corte", "fase"], observed=False).size()
+    for etapa in ETAPAS_COLA:
+        en_cola = serie.loc[serie["etapa"] == etapa, "en_cola"].to_numpy()
+        assert en_cola.tolist() == [conteo[(c, etapa)] for c in cierres]
+
+
+def test_backlog_llegadas_y_salidas_contra_fuerza_bruta(merge):
+    serie = backlog(merge, resolucion="D").set_index(["periodo", "etapa"])
+    llegadas = dict.fromkeys(serie.index, 0)
+    salidas = dict.fromkeys(serie.index, 0)
+    for _, fila in merge.iterrows():
+        # el evento j (con su fecha llevada al máximo acumulado) pasa de la fase j a la j+1
+        fases = list(FASES_CORTE[:len(EVENTOS) + 1])
+        if fila["resultado_evaluacion"] == "no_cumple":
+            fases[2] = "cerrado_en_evaluacion"
+        entrada = None
+        for j, col in enumerate(EVENTOS):
+            if pd.isna(fila[col]):
+                break
+            entrada = fila[col] if entrada is None else max(entrada, fila[col])
+            dia = entrada.normalize()
+            if fases[j] in ETAPAS_COLA:
+                salidas[(dia, fases[j])] += 1
+            if fases[j + 1] in ETAPAS_COLA:
+                llegadas[(dia, fases[j + 1])] += 1
+    assert serie["llegadas"].to_dict() == llegadas
+    assert serie["salidas"].to_dict() == salidas
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from calculador1 import calcular_fases
+from cubo import ALFA_CUBO, CuboKPI
+
+MEDIDA = "tiempo_total_tramite_seg"
+
+
+@pytest.fixture(scope="module")
+def fases(merge):
+    return calcular_fases(merge.copy())
+
+
+def test_cuantiles_del_cubo_contra_fuerza_bruta(fases):
+    cubo = CuboKPI.construir(fases)
+    tabla = cubo.consulta(por=["sexo"], cuantiles=(0, 0.5, 0.9, 1))
+    for _, fila in tabla.iterrows():
+        x = fases.loc[fases["sexo"].astype(str) == fila["sexo"], MEDIDA].dropna().to_numpy()
+        assert fila["solicitudes"] == (fases["sexo"].astype(str) == fila["sexo"]).sum()
+        assert fila[f"media_{MEDIDA}"] == pytest.approx(x.mean())
+        for q in (0, 0.5, 0.9, 1):
+            estimado = fila[f"p{q * 100:g}_{MEDIDA}"]
+            exacto = np.quantile(x, q, method="lower")
+            assert abs(estimado - exacto) <= ALFA_CUBO * abs(exacto) + 1e-6
+            assert x.min() <= estimado <= x.max()
+
+
+def test_roll_up_total_igual_a_suma_de_grupos(fases):
+    cubo = CuboKPI.construir(fases)
+    total = cubo.consulta(cuantiles=())
+    por_mes = cubo.consulta(por=["mes"], cuantiles=())
+    assert total["solicitudes"].iloc[0] == por_mes["solicitudes"].sum() == len(fases)
+    assert total["si_cumple"].iloc[0] == por_mes["si_cumple"].sum()
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from conftest import PARAMETROS, SEED
+from generador import generar_dataset
+
+
+def test_mismo_resultado_con_cualquier_cantidad_de_workers():
+    uno = generar_dataset(SEED, workers=1, **PARAMETROS)
+    varios = generar_dataset(SEED, workers=2, **PARAMETROS)
+    for a, b in zip(uno[:3], varios[:3]):
+        pd.testing.assert_frame_equal(a, b)
+    assert uno[3] == varios[3]
+
+
+def test_otra_semilla_cambia_los_datos():
+    a = generar_dataset(SEED, workers=1, **PARAMETROS)[1]
+    b = generar_dataset(SEED + 1, workers=1, **PARAMETROS)[1]
+    assert not a.equals(b)
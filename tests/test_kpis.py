@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from kpis import AgregadorKPI, BocetoCuantiles
+
+CUANTILES = [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1]
+
+
+def _valores(seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.concatenate([rng.lognormal(3, 2, 4000), -rng.lognormal(1, 1, 300), np.zeros(40)])
+
+
+@pytest.mark.parametrize("alfa", [0.01, 0.05])
+def test_error_relativo_acotado_por_alfa(alfa):
+    x = _valores()
+    boceto = BocetoCuantiles(alfa).agregar(x)
+    for q in CUANTILES:
+        exacto = np.quantile(x, q, method="lower")  # mismo rango q·(n-1)
+        assert abs(boceto.cuantil(q) - exacto) <= alfa * abs(exacto) + 1e-9
+
+
+def test_combinar_partes_igual_a_una_pasada():
+    x = _valores(1)
+    entero = BocetoCuantiles().agregar(x)
+    partes = [BocetoCuantiles().agregar(p) for p in np.array_split(x, 7)]
+    combinado = partes[0]
+    for p in partes[1:]:
+        combinado.combinar(p)
+    assert combinado.n == entero.n
+    for q in CUANTILES:
+        assert combinado.cuantil(q) == entero.cuantil(q)
+
+
+def test_agregador_por_bloques_y_dict():
+    df = pd.DataFrame({"t": _valores(2)})
+    entero = AgregadorKPI(["t"]).consumir(df)
+    por_bloques = AgregadorKPI(["t"])
+    for ini in range(0, len(df), 500):
+        por_bloques.combinar(AgregadorKPI.desde_dict(AgregadorKPI(["t"]).consumir(df.iloc[ini:ini + 500]).a_dict()))
+    pd.testing.assert_frame_equal(por_bloques.resumen(), entero.resumen(), rtol=1e-9)
+    m = entero.momentos["t"]
+    assert m.varianza == pytest.approx(df["t"].var(), rel=1e-9)
+
+
+def test_cuantiles_dentro_del_rango_observado():
+    agg = AgregadorKPI(["t"]).consumir(pd.DataFrame({"t": [3.3, 3.31, 3.32]}))
+    for q in CUANTILES:
+        assert 3.3 <= agg.cuantil("t", q) <= 3.32
+
+
+def test_columna_entera_da_cuantiles_enteros():
+    dias = pd.Series(np.random.default_rng(3).integers(10, 50, 999), dtype="float64")
+    agg = AgregadorKPI(["dias"]).consumir(pd.DataFrame({"dias": dias}))
+    for q in CUANTILES:
+        assert agg.cuantil("dias", q) == round(agg.cuantil("dias", q))
+    assert agg.cuantil("dias", 0.5) == dias.median()
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+Validación de integridad de las tres tablas (reglas de generador.py)
+
+Comprueba con operaciones de arreglo sobre las tablas completas, sin
+bucles por fila:
+  - claves únicas y referencias (solicitud -> solicitante, trámite -> solicitud)
+  - cobertura: todo solicitante aparece al menos una vez
+  - presentación en día hábil y dentro de la jornada 08:30–17:30
+  - gaps en días hábiles: evaluación 1–3 y registro 1–5 tras la
+    presentación, información 3–10 tras el registro, email 7–15 tras la
+    información (todos en día hábil y en jornada)
+  - estados coherentes con las fechas (evaluado <-> fecha y resultado, etc.)
+  - última semana del rango (desde 25/12 si termina el 31/12) => pendiente
+  - orden cronológico que asumen calculador1/cortes
+  - porcentajes objetivo (advertencia: el generador los respeta "en lo posible")
+
+Los gaps se miden con el ordinal hábil del calendario (tabla por día,
+BusinessCalendar.day_index): gap = ordinal(destino) - ordinal(base).
+Las fechas se toman como hora local de Lima: esquema.tipar pasa a hora
+local los libros heredados con horas UTC sin tz (como los .xlsx del
+repositorio), que si no correrían la jornada 5 h y dispararían
+presentacion_no_habil y los *_gap en masa.
+
+Cada regla tiene nivel "error" o "advertencia"; validar() devuelve el
+conteo de violaciones por regla y los códigos infractores (codigo_solicitud;
+codigo_solicitante en las reglas de Solicitantes).
+
+Uso:
+    python validacion.py legaltech_pset_solicitudes.xlsx --hasta 2025-12-31
+    res = validar(cargar_tablas("dataset_200k"))
+    print(res.resumen); assert res.ok
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from calendario import INICIO_JORNADA_SEG, JORNADA_SEG, get_calendar
+from datos import cargar_tablas
+from esquema import tipar
+from instrumentacion import etapa
+
+RUTA_ENTRADA = "legaltech_pset_solicitudes.xlsx"
+
+# regla -> (nivel, descripción)
+REGLAS = {
+    "solicitante_duplicado":        ("error", "codigo_solicitante repetido en Solicitantes"),
+    "solicitante_sin_solicitudes":  ("error", "solicitante que no aparece en SolicitudesRecibidas"),
+    "solicitud_duplicada":          ("error", "codigo_solicitud repetido en SolicitudesRecibidas"),
+    "solicitante_inexistente":      ("error", "solicitud de un codigo_solicitante que no está en Solicitantes"),
+    "presentacion_fuera_de_rango":  ("error", "fecha_presentacion fuera de [desde, hasta]"),
+    "presentacion_no_habil":        ("error", "presentación nula, en día no hábil o fuera de 08:30–17:30"),
+    "estado_inconsistente":         ("error", "estado/resultado no coinciden con fecha_evaluacion"),
+    "evaluacion_gap":               ("error", "evaluación fuera de 1–3 días hábiles tras la presentación"),
+    "pendiente_ultima_semana":      ("error", "solicitud de la última semana del rango que no quedó pendiente"),
+    "tramite_duplicado":            ("error", "codigo_solicitud repetido en TramiteSolicitudes"),
+    "tramite_sin_si_cumple":        ("error", "trámite de una solicitud inexistente o que no es sí_cumple"),
+    "si_cumple_sin_tramite":        ("error", "solicitud sí_cumple sin fila en TramiteSolicitudes"),
+    "tramite_estado_inconsistente": ("error", "estados de registro/información/email no coinciden con sus fechas"),
+    "registro_gap":                 ("error", "registro fuera de 1–5 días hábiles tras la presentación"),
+    "informacion_gap":              ("error", "información fuera de 3–10 días hábiles tras el registro"),
+    "email_gap":                    ("error", "email fuera de 7–15 días hábiles tras la información"),
+    "orden_cronologico":            ("error", "un evento anterior al que lo precede en la cadena"),
+    "registro_antes_de_evaluacion": ("advertencia", "registro anterior a la evaluación (el generador lo fecha desde la presentación)"),
+}
+
+# porcentaje -> (mínimo, máximo), sobre (numerador, denominador) de contar_estados
+PORCENTAJES = {
+    "porcentaje_evaluado":     (0.75, 0.90, "evaluadas", "solicitudes"),
+    "porcentaje_si_cumple":    (0.45, 0.75, "si_cumple", "evaluadas"),
+    "porcentaje_registrado":   (0.90, 0.95, "registradas", "si_cumple"),
+    "porcentaje_informacion":  (0.70, 0.90, "informacion", "registradas"),
+    "porcentaje_email":        (0.75, 0.90, "email", "informacion"),
+}
+
+# (evento, base, mínimo, máximo) en días hábiles
+GAPS = {
+    "evaluacion_gap":  ("fecha_evaluacion", "fecha_presentacion", 1, 3),
+    "registro_gap":    ("fecha_registro", "fecha_presentacion", 1, 5),
+    "informacion_gap": ("fecha_informacion", "fecha_registro", 3, 10),
+    "email_gap":       ("fecha_email", "fecha_informacion", 7, 15),
+}
+
+_NAT = np.iinfo(np.int64).min
+_FIN_JORNADA = INICIO_JORNADA_SEG + JORNADA_SEG
+_NS_DIA = 86_400 * 1_000_000_000
+
+
+# ==============================
+# RESULTADO
+# ==============================
+class ResultadoValidacion:
+    """resumen: una fila por regla; infractores: regla -> códigos (ordenados, únicos)."""
+
+    def __init__(self, resumen: pd.DataFrame, infractores: dict):
+        self.resumen = resumen
+        self.infractores = infractores
+
+    @property
+    def ok(self) -> bool:
+        """Sin violaciones de nivel error (las advertencias no bloquean)."""
+        errores = self.resumen[self.resumen["nivel"] == "error"]
+        return bool((errores["violaciones"] == 0).all())
+
+    def tabla_infractores(self) -> pd.DataFrame:
+        """Forma larga (regla, codigo) para guardar o cruzar con las tablas."""
+        reglas = [r for r, c in self.infractores.items() if len(c)]
+        return pd.DataFrame({
+            "regla": pd.Categorical(np.repeat(reglas, [len(self.infractores[r]) for r in reglas]),
+                                    categories=list(REGLAS)),
+            "codigo": np.concatenate([self.infractores[r] for r in reglas]) if reglas
+                      else np.zeros(0, dtype=np.int32),
+        })
+
+
+# ==============================
+# AUXILIARES
+# ==============================
+def _claves(serie: pd.Series) -> np.ndarray:
+    """Claves como int64 (-1 = nula)."""
+    return serie.to_numpy(dtype=np.float64, na_value=-1).astype(np.int64) if serie.hasnans \
+        else serie.to_numpy(dtype=np.int64)
+
+def _repetidas(claves: np.ndarray) -> np.ndarray:
+    """Máscara de las filas cuya clave aparece más de una vez."""
+    if len(claves) == 0:
+        return np.zeros(0, dtype=bool)
+    lo, hi = int(claves.min()), int(claves.max())
+    if hi - lo <= 4 * len(claves) + 1024:  # claves densas: bincount en vez de ordenar
+        rel = claves - lo
+        return np.bincount(rel)[rel] > 1
+    return pd.Series(claves).duplicated(keep=False).to_numpy()
+
+def _posiciones(universo: np.ndarray, claves: np.ndarray) -> np.ndarray:
+    """Primera fila de universo con cada clave (-1 si no está)."""
+    if len(universo) == 0:
+        return np.full(len(claves), -1, dtype=np.int64)
+    lo, hi = int(universo.min()), int(universo.max())
+    if hi - lo <= 4 * len(universo) + 1024:  # como combinador.indice_posicional, tolerando repetidas
+        pos = np.full(hi - lo + 1, -1, dtype=np.int64)
+        pos[(universo - lo)[::-1]] = np.arange(len(universo) - 1, -1, -1)
+        rel = claves - lo
+        dentro = (rel >= 0) & (rel <= hi - lo)
+        return np.where(dentro, pos[np.where(dentro, rel, 0)], -1)
+    primeras = pd.Series(np.arange(len(universo)), index=universo).groupby(level=0).first()
+    return primeras.reindex(claves).fillna(-1).to_numpy(dtype=np.int64)
+
+def _presentes(claves: np.ndarray, universo: np.ndarray) -> np.ndarray:
+    """Máscara: cada clave está en universo."""
+    if len(universo) == 0:
+        return np.zeros(len(claves), dtype=bool)
+    lo, hi = int(universo.min()), int(universo.max())
+    if hi - lo <= 4 * len(universo) + 1024:
+        marca = np.zeros(hi - lo + 1, dtype=bool)
+        marca[universo - lo] = True
+        rel = claves - lo
+        dentro = (rel >= 0) & (rel <= hi - lo)
+        return dentro & marca[np.where(dentro, rel, 0)]
+    return np.isin(claves, universo)
+
+def _unicas(codigos: np.ndarray) -> np.ndarray:
+    """Códigos ordenados sin repetir (ordenar y comparar vecinos; más rápido que np.unique)."""
+    c = np.sort(codigos)
+    return c[np.concatenate([[True], c[1:] != c[:-1]])] if len(c) else c
+
+def _ns(df: pd.DataFrame, col: str, n: int) -> np.ndarray:
+    """Fecha como int64 ns (NaT = mínimo int64); columna ausente -> todo NaT."""
+    if col not in df.columns:
+        return np.full(n, _NAT, dtype=np.int64)
+    return df[col].to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+def _calendario(*fechas):
+    """Calendario que cubre los años de todas las fechas (sin copiar los arreglos)."""
+    tope = np.iinfo(np.int64).max
+    lo = min(int(f.min(initial=tope, where=f != _NAT)) for f in fechas)
+    hi = max(int(f.max(initial=_NAT)) for f in fechas)
+    if hi == _NAT:
+        return get_calendar(date.today().year)
+    anios = np.array([lo, hi], dtype="datetime64[ns]").astype("datetime64[Y]").astype(np.int64) + 1970
+    return get_calendar(int(anios[0]), int(anios[1]))
+
+def _en_jornada(cal, t: np.ndarray):
+    """(ordinal hábil del día, día hábil y hora en 08:30–17:30); NaT -> (-1, False)."""
+    dias, resto = np.divmod(t, _NS_DIA)  # enteros: sin pasar por datetime64
+    ordinal, habil = cal.day_index(dias.view("datetime64[D]"))
+    segundo = resto // 1_000_000_000
+    return ordinal, habil & (segundo >= INICIO_JORNADA_SEG) & (segundo <= _FIN_JORNADA)
+
+def _fuera_de_gap(evento, base, minimo: int, maximo: int) -> np.ndarray:
+    """
+    evento/base: (ordinal, en_jornada) de _en_jornada. Evento presente cuya
+    base falta, o que no cae a minimo..maximo hábiles o fuera de jornada.
+    """
+    (ord_ev, ok_ev), (ord_base, _) = evento, base
+    presente = ord_ev >= 0
+    gap = ord_ev - ord_base
+    return presente & ((ord_base < 0) | ~ok_ev | (gap < minimo) | (gap > maximo))
+
+def contar_estados(solicitudes: pd.DataFrame, tramite: pd.DataFrame) -> dict:
+    """Totales de cada estado alcanzado (base de los porcentajes objetivo)."""
+    def cuenta(df, col, valor):
+        return int((df[col] == valor).sum()) if col in df.columns else 0
+    return {
+        "solicitudes": len(solicitudes),
+        "evaluadas": cuenta(solicitudes, "estado", "evaluado"),
+        "si_cumple": cuenta(solicitudes, "resultado_evaluacion", "sí_cumple"),
+        "registradas": cuenta(tramite, "estado_registro", "registrado"),
+        "informacion": cuenta(tramite, "estado_informacion", "recibida"),
+        "email": cuenta(tramite, "estado_email", "enviado"),
+    }
+
+
+# ==============================
+# VALIDACIÓN
+# ==============================
+def validar(tablas: dict, desde: date = None, hasta: date = None) -> ResultadoValidacion:
+    """
+    tablas: {hoja: DataFrame} como en datos.cargar_tablas.
+    desde/hasta: rango de presentación con que se generó. Sin desde no se
+    controla el inicio; sin hasta se asume el 31/12 del año de la última
+    presentación (el rango por defecto del generador), que nunca marca de
+    más: si el rango real terminó antes, la última semana queda sin datos.
+    """
+    solicitantes = tablas["Solicitantes"]
+    solicitudes = tipar(tablas["SolicitudesRecibidas"])
+    tramite = tipar(tablas["TramiteSolicitudes"])
+    n, m = len(solicitudes), len(tramite)
+
+    with etapa("validacion.validar", filas=n + m):
+        violaciones = {}
+        cod_p = _claves(tipar(solicitantes[["codigo_solicitante"]])["codigo_solicitante"])
+        cod_s = _claves(solicitudes["codigo_solicitud"])
+        cod_sp = _claves(solicitudes["codigo_solicitante"])
+        cod_t = _claves(tramite["codigo_solicitud"])
+
+        # --- claves y referencias
+        violaciones["solicitante_duplicado"] = cod_p[_repetidas(cod_p)]
+        violaciones["solicitante_sin_solicitudes"] = cod_p[~_presentes(cod_p, cod_sp[cod_sp >= 0])]
+        violaciones["solicitud_duplicada"] = cod_s[_repetidas(cod_s)]
+        violaciones["solicitante_inexistente"] = cod_s[~_presentes(cod_sp, cod_p)]
+
+        # --- solicitudes
+        pres = _ns(solicitudes, "fecha_presentacion", n)
+        feval = _ns(solicitudes, "fecha_evaluacion", n)
+        freg = _ns(tramite, "fecha_registro", m)
+        finfo = _ns(tramite, "fecha_informacion", m)
+        femail = _ns(tramite, "fecha_email", m)
+        cal = _calendario(pres, feval, freg, finfo, femail)
+
+        # (ordinal hábil, en jornada) de cada fecha, una vez por columna
+        jornada = {"fecha_presentacion": _en_jornada(cal, pres), "fecha_evaluacion": _en_jornada(cal, feval),
+                   "fecha_registro": _en_jornada(cal, freg), "fecha_informacion": _en_jornada(cal, finfo),
+                   "fecha_email": _en_jornada(cal, femail)}
+        violaciones["presentacion_no_habil"] = cod_s[~jornada["fecha_presentacion"][1]]
+
+        if hasta is None and pres.max(initial=_NAT) != _NAT:
+            hasta = date(pd.Timestamp(int(pres.max())).year, 12, 31)
+        fuera = np.zeros(n, dtype=bool)
+        if desde is not None:
+            fuera |= (pres != _NAT) & (pres < pd.Timestamp(desde).value)
+        if hasta is not None:
+            fuera |= pres >= pd.Timestamp(hasta + timedelta(days=1)).value
+        violaciones["presentacion_fuera_de_rango"] = cod_s[fuera]
+
+        evaluado = (solicitudes["estado"] == "evaluado").to_numpy(dtype=bool, na_value=False)
+        pendiente = (solicitudes["estado"] == "pendiente").to_numpy(dtype=bool, na_value=False)
+        resultado = solicitudes["resultado_evaluacion"].notna().to_numpy()
+        con_fecha = feval != _NAT
+        inconsistente = ~(evaluado | pendiente) | (evaluado != con_fecha) | (evaluado != resultado)
+        violaciones["estado_inconsistente"] = cod_s[inconsistente]
+        violaciones["evaluacion_gap"] = cod_s[_fuera_de_gap(jornada["fecha_evaluacion"],
+                                                             jornada["fecha_presentacion"],
+                                                             *GAPS["evaluacion_gap"][2:])]
+
+        ultima_semana = np.zeros(n, dtype=bool)
+        if hasta is not None:
+            ultima_semana = pres >= pd.Timestamp(hasta - timedelta(days=6)).value
+        violaciones["pendiente_ultima_semana"] = cod_s[ultima_semana & ~pendiente]
+
+        # --- trámite (alineado con solicitudes por posición)
+        violaciones["tramite_duplicado"] = cod_t[_repetidas(cod_t)]
+        si_cumple = (solicitudes["resultado_evaluacion"] == "sí_cumple").to_numpy(dtype=bool, na_value=False)
+        violaciones["tramite_sin_si_cumple"] = cod_t[~_presentes(cod_t, cod_s[si_cumple])]
+        violaciones["si_cumple_sin_tramite"] = cod_s[si_cumple & ~_presentes(cod_s, cod_t)]
+
+        estados = {}
+        for col, hecho in (("estado_registro", "registrado"), ("estado_informacion", "recibida"),
+                           ("estado_email", "enviado")):
+            s = tramite[col] if col in tramite.columns else pd.Series(index=tramite.index, dtype=object)
+            estados[col] = ((s == hecho).to_numpy(dtype=bool, na_value=False),
+                            (s == "pendiente").to_numpy(dtype=bool, na_value=False))
+        reg, reg_pend = estados["estado_registro"]
+        info, info_pend = estados["estado_informacion"]
+        email, email_pend = estados["estado_email"]
+        # cada etapa: hecho <-> fecha; pendiente solo si la anterior está hecha; vacío si no
+        inconsistente = (
+            ~(reg | reg_pend) | (reg != (freg != _NAT))
+            | (info != (finfo != _NAT)) | ((info | info_pend) != reg)
+            | (email != (femail != _NAT)) | ((email | email_pend) != info)
+        )
+        violaciones["tramite_estado_inconsistente"] = cod_t[inconsistente]
+
+        pos = _posiciones(cod_s, cod_t)
+        def en_tramite(valores, nulo):
+            return np.where(pos >= 0, valores[np.maximum(pos, 0)], nulo) if n else np.full(m, nulo)
+        pres_t, eval_t = en_tramite(pres, _NAT), en_tramite(feval, _NAT)
+        ord_pres, _ = jornada["fecha_presentacion"]
+        bases = dict(jornada, fecha_presentacion=(en_tramite(ord_pres, -1), None))
+        for regla in ("registro_gap", "informacion_gap", "email_gap"):
+            evento, base, minimo, maximo = GAPS[regla]
+            violaciones[regla] = cod_t[_fuera_de_gap(jornada[evento], bases[base], minimo, maximo)]
+
+        # --- orden: cada evento presente posterior al anterior presente de la cadena
+        desorden_s = (con_fecha & (pres != _NAT) & (feval <= pres))
+        desorden_t = np.zeros(m, dtype=bool)
+        previo = pres_t.copy()
+        for t in (freg, finfo, femail):
+            ok = t != _NAT
+            desorden_t |= ok & (previo != _NAT) & (t <= previo)
+            previo = np.where(ok, t, previo)
+        violaciones["orden_cronologico"] = np.concatenate([cod_s[desorden_s], cod_t[desorden_t]])
+        violaciones["registro_antes_de_evaluacion"] = cod_t[(freg != _NAT) & (eval_t != _NAT) & (freg < eval_t)]
+
+        # --- resumen
+        infractores = {r: _unicas(violaciones[r]).astype(np.int32) for r in REGLAS}
+        filas = [{"regla": r, "nivel": REGLAS[r][0], "violaciones": int(violaciones[r].size),
+                  "valor": np.nan, "descripcion": REGLAS[r][1]} for r in REGLAS]
+        totales = contar_estados(solicitudes, tramite)
+        for nombre, (minimo, maximo, num, den) in PORCENTAJES.items():
+            valor = totales[num] / totales[den] if totales[den] else np.nan
+            tolerancia = 0.5 / totales[den] if totales[den] else 0.0  # redondeo de choose_mask
+            fuera = bool(valor < minimo - tolerancia or valor > maximo + tolerancia)
+            filas.append({"regla": nombre, "nivel": "advertencia", "violaciones": int(fuera), "valor": valor,
+                          "descripcion": f"{num}/{den} fuera de {minimo:.0%}–{maximo:.0%}"})
+        return ResultadoValidacion(pd.DataFrame(filas), infractores)
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Valida las tablas del dataset LegalTech PSET")
+    ap.add_argument("origen", nargs="?", default=RUTA_ENTRADA,
+                    help="xlsx del generador o carpeta con las tablas en parquet/csv")
+    ap.add_argument("--desde", type=date.fromisoformat, default=None, help="inicio del rango (YYYY-MM-DD)")
+    ap.add_argument("--hasta", type=date.fromisoformat, default=None, help="fin del rango (YYYY-MM-DD)")
+    ap.add_argument("--infractores", default=None, help="guarda (regla, codigo) en este parquet/csv")
+    return ap.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    res = validar(cargar_tablas(args.origen), args.desde, args.hasta)
+    with pd.option_context("display.max_colwidth", 80, "display.width", 200):
+        print(res.resumen.to_string(index=False))
+    if args.infractores:
+        from datos import guardar
+        guardar(res.tabla_infractores(), args.infractores)
+    print("\nOK" if res.ok else "\nHay violaciones de nivel error")
+    sys.exit(0 if res.ok else 1)